@@ -1,5 +1,4 @@
 import argparse
-import hashlib
 import os
 import os.path
 import re
@@ -22,7 +21,7 @@ from pullrequest import prartifact
 from reporegex import matchers
 from report import report_info, verifier_report
 from signedchart import signedchart
-from tools import gitutils
+from tools import gitutils, package_digest
 
 
 def write_error_log(directory, *msg):
@@ -457,9 +456,8 @@ def verify_package_digest(url, report):
     target_digest = None
     pkg_digest = None
 
-    response = requests.get(url, allow_redirects=True)
-    if response.status_code == 200:
-        target_digest = hashlib.sha256(response.content).hexdigest()
+    # The package is hosted by the partner: always check its current content
+    target_digest = package_digest.get_package_digest(url, use_cache=False)
 
     found, report_data = verifier_report.get_report_data(report)
     if found:
@@ -21,24 +21,25 @@ update occurs in a later step.
 
 import argparse
 import base64
+import concurrent.futures
 import json
 import os
 import re
 import shutil
 import subprocess
 import sys
-import tempfile
 import time
 import urllib.parse
+from dataclasses import dataclass
 
 import yaml
 from environs import Env
+from marshmallow import ValidationError, fields
 
 try:
-    from yaml import CDumper as Dumper
     from yaml import CSafeLoader as SafeLoader
 except ImportError:
-    from yaml import Dumper, SafeLoader
+    from yaml import SafeLoader
 
 sys.path.append("../")
 from chartrepomanager import indexannotations
@@ -46,7 +47,14 @@ from pullrequest import prartifact
 from reporegex import matchers
 from report import report_info
 from signedchart import signedchart
-from tools import gitutils
+from tools import chart_archive, gitutils, package_cache
+
+# Set to true to build reproducible packages from the chart sources
+NORMALIZE_PACKAGES_ENV = "NORMALIZE_PACKAGES"
+# Directories of the release assets. In batch mode, each release gets its own
+# subdirectory, named after its release tag.
+PACKAGES_DIR = ".cr-release-packages"
+REPORTS_DIR = ".cr-release-reports"
 
 
 def _encode_chart_entry(chart_entry):
@@ -67,7 +75,7 @@ def _encode_chart_entry(chart_entry):
     return base64.b64encode(chart_entry_bytes).decode()
 
 
-def get_modified_charts(api_url):
+def find_modified_chart(api_url):
     """Get the category, organization, chart name, and new version corresponding to
     the chart being added or modified by this PR.
 
@@ -76,7 +84,8 @@ def get_modified_charts(api_url):
 
     Returns:
         (str, str, str, str): category, organization, chart, and version (e.g. partner,
-                              hashicorp, vault, 1.4.0)
+                              hashicorp, vault, 1.4.0), or None if the PR doesn't
+                              modify any chart.
     """
     files = prartifact.get_modified_files(api_url)
     pattern = re.compile(
@@ -87,6 +96,25 @@ def get_modified_charts(api_url):
         if m:
             category, organization, chart, version = m.groups()
             return category, organization, chart, version
+    return None
+
+
+def get_modified_charts(api_url):
+    """Get the category, organization, chart name, and new version corresponding to
+    the chart being added or modified by this PR.
+
+    Exits if the PR doesn't modify any chart.
+
+    Args:
+        api_url (str): URL of the GitHub PR
+
+    Returns:
+        (str, str, str, str): category, organization, chart, and version (e.g. partner,
+                              hashicorp, vault, 1.4.0)
+    """
+    modified_chart = find_modified_chart(api_url)
+    if modified_chart:
+        return modified_chart
 
     print("No modified files found.")
     sys.exit(0)
@@ -137,58 +165,97 @@ def check_report_exists(category, organization, chart, version):
     return os.path.exists(report_path), report_path
 
 
-def generate_report():
+def generate_report(report_content, report_path=None):
     """Creates report file using the content generated by chart-pr-review
 
+    Args:
+        report_content (str): URL-encoded content of the report.
+        report_path (str): Path to the report file to create. Defaults to report.yaml
+                           in the current directory.
+
     Returns:
         str: Path to the report.yaml file.
     """
-    cwd = os.getcwd()
-    report_content = urllib.parse.unquote(os.environ.get("REPORT_CONTENT"))
+    report_content = urllib.parse.unquote(report_content)
     print("[INFO] Report content:")
     print(report_content)
-    report_path = os.path.join(cwd, "report.yaml")
+    if report_path is None:
+        report_path = os.path.join(os.getcwd(), "report.yaml")
     with open(report_path, "w") as fd:
         fd.write(report_content)
     return report_path
 
 
-def prepare_chart_source_for_release(category, organization, chart, version):
+def _get_helm_version():
+    """Get the version of helm, used to tell packages built by different versions."""
+    out = subprocess.run(["helm", "version", "--short"], capture_output=True)
+    return out.stdout.decode("utf-8").strip()
+
+
+def prepare_chart_source_for_release(
+    category, organization, chart, version, normalize=None, package_dir=PACKAGES_DIR
+):
     """Create an archive file of the Chart for the GitHub release.
 
     When the PR contains the chart's source, we package it using "helm package" and
-    place the archive file in the ".cr-release-packages" directory. This directory will
-    contain all assets that should be uploaded as a GitHub Release.
+    place the archive file in package_dir, the ".cr-release-packages" directory by
+    default. This directory will contain all assets that should be uploaded as a
+    GitHub Release.
+
+    The archive is cached by the content of the source (see tools/package_cache.py),
+    and reused if the release is prepared again. If normalize is set, the archive is
+    also normalized (see chart_archive.normalize_archive), so that packaging the same
+    source always yields the same archive.
 
     Args:
         category (str): Type of profile (community, partners, or redhat)
         organization (str): Name of the organization (ex: hashicorp)
         chart (str): Name of the chart (ex: vault)
         version (str): The version of the chart (ex: 1.4.0)
+        normalize (bool): Whether to normalize the archive. Defaults to the
+                          NORMALIZE_PACKAGES environment variable.
+        package_dir (str): Directory to place the archive in.
     """
     print(
         "[INFO] prepare chart source for release. %s, %s, %s, %s"
         % (category, organization, chart, version)
     )
     path = os.path.join("charts", category, organization, chart, version, "src")
-    out = subprocess.run(["helm", "package", path], capture_output=True)
+    chart_file_name = f"{chart}-{version}.tgz"
+    chart_package = os.path.join(package_dir, chart_file_name)
+    os.makedirs(package_dir, exist_ok=True)
+
+    if normalize is None:
+        normalize = Env().bool(NORMALIZE_PACKAGES_ENV, False)
+
+    # Normalized and plain packages of the same source differ
+    salt = _get_helm_version() + (" normalized" if normalize else "")
+    key = package_cache.get_package_key(path, salt=salt)
+    digest = package_cache.restore_package(key, chart_package)
+    if digest:
+        print(f"[INFO] Reusing cached package {chart_file_name}, sha256: {digest}")
+        return
+
+    out = subprocess.run(
+        ["helm", "package", path, "--destination", package_dir], capture_output=True
+    )
     print(out.stdout.decode("utf-8"))
     print(out.stderr.decode("utf-8"))
-    chart_file_name = f"{chart}-{version}.tgz"
-    try:
-        os.remove(os.path.join(".cr-release-packages", chart_file_name))
-    except FileNotFoundError:
-        pass
-    shutil.copy(f"{chart}-{version}.tgz", f".cr-release-packages/{chart_file_name}")
+    if normalize:
+        archive = chart_archive.normalize_archive(chart_package, chart_package)
+        package_cache.store_package(key, chart_package, archive.sha256)
+    else:
+        package_cache.store_package(key, chart_package)
 
 
 def prepare_chart_tarball_for_release(
-    category, organization, chart, version, signed_chart
+    category, organization, chart, version, signed_chart, package_dir=PACKAGES_DIR
 ):
     """Move the provided tarball (and signing key if needed) to the release directory
 
-    The tarball is moved to the ".cr-release-packages" directory. If the archive has
-    been signed with "helm package --sign", the provenance file is also included.
+    The tarball is moved to package_dir, the ".cr-release-packages" directory by
+    default. If the archive has been signed with "helm package --sign", the provenance
+    file and the public key are also included.
 
     Args:
         category (str): Type of profile (community, partners, or redhat)
@@ -196,6 +263,7 @@ def prepare_chart_tarball_for_release(
         chart (str): Name of the chart (ex: vault)
         version (str): The version of the chart (ex: 1.4.0)
         signed_chart (bool): Set to True if the tarball chart is signed.
+        package_dir (str): Directory to place the tarball in.
 
     Returns:
         str: Path to the public key file used to sign the tarball
@@ -209,12 +277,12 @@ def prepare_chart_tarball_for_release(
     path = os.path.join(
         "charts", category, organization, chart, version, chart_file_name
     )
+    os.makedirs(package_dir, exist_ok=True)
     try:
-        os.remove(os.path.join(".cr-release-packages", chart_file_name))
+        os.remove(os.path.join(package_dir, chart_file_name))
     except FileNotFoundError:
         pass
-    shutil.copy(path, f".cr-release-packages/{chart_file_name}")
-    shutil.copy(path, chart_file_name)
+    shutil.copy(path, os.path.join(package_dir, chart_file_name))
 
     if signed_chart:
         print("[INFO] Signed chart - include PROV file")
@@ -223,31 +291,28 @@ def prepare_chart_tarball_for_release(
             "charts", category, organization, chart, version, prov_file_name
         )
         try:
-            os.remove(os.path.join(".cr-release-packages", prov_file_name))
+            os.remove(os.path.join(package_dir, prov_file_name))
         except FileNotFoundError:
             pass
-        shutil.copy(path, f".cr-release-packages/{prov_file_name}")
-        shutil.copy(path, prov_file_name)
-        gitutils.add_output(
-            "prov_file_name",
-            os.path.join(os.getcwd(), ".cr-release-packages", prov_file_name),
-        )
-        return get_key_file(category, organization, chart, version)
+        shutil.copy(path, os.path.join(package_dir, prov_file_name))
+        return get_key_file(category, organization, chart, version, package_dir)
     return ""
 
 
-def get_key_file(category, organization, chart, version):
+def get_key_file(category, organization, chart, version, key_dir="."):
     owners_path = os.path.join("charts", category, organization, chart, "OWNERS")
     key_in_owners = signedchart.get_pgp_key_from_owners(owners_path)
     if key_in_owners:
         key_file_name = f"{chart}-{version}.tgz.key"
         print(f"[INFO] Signed chart - add public key file : {key_file_name}")
-        signedchart.create_public_key_file(key_in_owners, key_file_name)
-        return key_file_name
+        os.makedirs(key_dir, exist_ok=True)
+        key_file = os.path.join(key_dir, key_file_name)
+        signedchart.create_public_key_file(key_in_owners, key_file)
+        return key_file
     return ""
 
 
-def create_index_from_chart(chart_file_name):
+def create_index_from_chart(chart_file_name, archive=None, package_dir=PACKAGES_DIR):
     """Prepare the index entry for this chart
 
     Given that a chart tarball could be created (i.e. the user provided either the
@@ -255,28 +320,26 @@ def create_index_from_chart(chart_file_name):
 
     Args:
         chart_file_name (str): Name of the chart's archive
+        archive (chart_archive.ChartArchive): Content of the chart's archive, if
+            already read.
+        package_dir (str): Directory of the chart's archive.
 
     Returns:
         dict: content of Chart.yaml, to be used as index entry.
     """
     print("[INFO] create index from chart. %s" % (chart_file_name))
-    out = subprocess.run(
-        [
-            "helm",
-            "show",
-            "chart",
-            os.path.join(".cr-release-packages", chart_file_name),
-        ],
-        capture_output=True,
-    )
-    p = out.stdout.decode("utf-8")
-    print(p)
-    print(out.stderr.decode("utf-8"))
-    crt = yaml.load(p, Loader=SafeLoader)
+    if archive is None:
+        archive = chart_archive.read_chart_archive(
+            os.path.join(package_dir, chart_file_name)
+        )
+    crt = archive.get_chart_metadata()
+    print(crt)
     return crt
 
 
-def create_index_from_report(category, ocp_version_range, report_path):
+def create_index_from_report(
+    category, ocp_version_range, report_path, redhat_to_community=None
+):
     """Prepare the index entry for this chart.
 
     In the case only a report was provided by the user, we need to craft an index entry
@@ -297,6 +360,9 @@ def create_index_from_report(category, ocp_version_range, report_path):
         category (str): Type of profile (community, partners, or redhat)
         ocp_version_range (str): Range of supported OCP versions
         report_path (str): Path to the report.yaml file
+        redhat_to_community (bool): Whether a redhat chart is released as a community
+                                    chart. Defaults to the REDHAT_TO_COMMUNITY
+                                    environment variable.
 
     Returns:
         dict: Index entry for this chart
@@ -310,7 +376,8 @@ def create_index_from_report(category, ocp_version_range, report_path):
     annotations = indexannotations.getIndexAnnotations(ocp_version_range, report_path)
 
     print("category:", category)
-    redhat_to_community = bool(os.environ.get("REDHAT_TO_COMMUNITY"))
+    if redhat_to_community is None:
+        redhat_to_community = bool(os.environ.get("REDHAT_TO_COMMUNITY"))
     if category == "partners":
         annotations["charts.openshift.io/providerType"] = "partner"
     elif category == "redhat" and redhat_to_community:
@@ -332,10 +399,17 @@ def create_index_from_report(category, ocp_version_range, report_path):
 
 
 def update_chart_annotation(
-    category, organization, chart_file_name, chart, ocp_version_range, report_path
+    category,
+    organization,
+    chart_file_name,
+    chart,
+    ocp_version_range,
+    report_path,
+    redhat_to_community=None,
+    package_dir=PACKAGES_DIR,
 ):
-    """Untar the helm release that was placed under .cr-release-packages, update the
-    chart's annotations, and repackage the Helm release.
+    """Update the annotations in the Chart.yaml of the helm release that was placed
+    under package_dir, .cr-release-packages by default.
 
     In particular, following manipulations are performed on annotations:
     * Gets the dict of annotations from the report file.
@@ -353,17 +427,23 @@ def update_chart_annotation(
         chart (str): Name of the chart (ex: vault)
         ocp_version_range (str): Range of supported OCP versions
         report_path (str): Path to the report.yaml file
+        redhat_to_community (bool): Whether a redhat chart is released as a community
+                                    chart. Defaults to the REDHAT_TO_COMMUNITY
+                                    environment variable.
+        package_dir (str): Directory of the chart's archive.
+
+    Returns:
+        chart_archive.ChartArchive: Content of the updated chart's archive.
     """
     print(
         "[INFO] Update chart annotation. %s, %s, %s, %s, %s"
         % (category, organization, chart_file_name, chart, ocp_version_range)
     )
-    dr = tempfile.mkdtemp(prefix="annotations-")
-
     annotations = indexannotations.getIndexAnnotations(ocp_version_range, report_path)
 
     print("category:", category)
-    redhat_to_community = bool(os.environ.get("REDHAT_TO_COMMUNITY"))
+    if redhat_to_community is None:
+        redhat_to_community = bool(os.environ.get("REDHAT_TO_COMMUNITY"))
     if category == "partners":
         annotations["charts.openshift.io/providerType"] = "partner"
     elif category == "redhat" and redhat_to_community:
@@ -379,95 +459,130 @@ def update_chart_annotation(
         vendor_name = out["vendor"]["name"]
         annotations["charts.openshift.io/provider"] = vendor_name
 
-    out = subprocess.run(
-        [
-            "tar",
-            "zxvf",
-            os.path.join(".cr-release-packages", f"{chart_file_name}"),
-            "-C",
-            dr,
-        ],
-        capture_output=True,
+    chart_package = os.path.join(package_dir, chart_file_name)
+    return chart_archive.rewrite_annotations(
+        chart_package, chart_package, chart, annotations
     )
-    print(out.stdout.decode("utf-8"))
-    print(out.stderr.decode("utf-8"))
 
-    fd = open(os.path.join(dr, chart, "Chart.yaml"))
-    data = yaml.load(fd, Loader=SafeLoader)
 
-    if "annotations" not in data:
-        data["annotations"] = annotations
-    else:
-        # merge the existing annotations with our new ones, overwriting
-        # values for overlapping keys with our own.
-        # Overwriting is important because the chart may contain values that we
-        # must override, such as the providerType which changes in redhat-to-community cases.
-        # |= syntax requires py3.9
-        data["annotations"] |= annotations
-    out = yaml.dump(data, Dumper=Dumper)
-    with open(os.path.join(dr, chart, "Chart.yaml"), "w") as fd:
-        fd.write(out)
+class ReleaseRequestError(Exception):
+    """This exception is raised when a release request lacks information"""
 
-    out = subprocess.run(
-        ["helm", "package", os.path.join(dr, chart)], capture_output=True
-    )
-    print(out.stdout.decode("utf-8"))
-    print(out.stderr.decode("utf-8"))
 
-    try:
-        os.remove(os.path.join(".cr-release-packages", chart_file_name))
-    except FileNotFoundError:
-        pass
-
-    shutil.move(chart_file_name, ".cr-release-packages")
+@dataclass
+class ReleaseRequest:
+    """A merged PR for which to prepare a release.
 
+    The attributes other than api_url are outputs of the chart-verifier job of the PR.
+    """
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "-r",
-        "--repository",
-        dest="repository",
-        type=str,
-        required=True,
-        help="Git Repository",
-    )
-    parser.add_argument(
-        "-u",
-        "--api-url",
-        dest="api_url",
-        type=str,
-        required=True,
-        help="API URL for the pull request",
+    # Attributes that must be set for each PR in a manifest. report_content is only
+    # required for the PRs that don't include a report.
+    REQUIRED_ATTRIBUTES = (
+        "web_catalog_only",
+        "ocp_version_range",
+        "redhat_to_community",
     )
-    args = parser.parse_args()
-    category, organization, chart, version = get_modified_charts(args.api_url)
+    # Attributes parsed as booleans, as the environment variables of the single mode
+    # are by Env.bool: the workflow outputs them as "True" or "False".
+    BOOLEAN_ATTRIBUTES = ("web_catalog_only", "redhat_to_community")
+
+    # URL of the GitHub PR
+    api_url: str
+    # Content of the report generated by chart-verifier, URL-encoded
+    report_content: str = None
+    # Whether the provider has chosen the Web Catalog Only option
+    web_catalog_only: bool = False
+    # Range of supported OCP versions
+    ocp_version_range: str = "N/A"
+    # Whether a redhat chart is released as a community chart
+    redhat_to_community: bool = False
+
+
+@dataclass
+class ChartRelease:
+    """Release assets and index entry prepared for a chart version"""
+
+    category: str
+    organization: str
+    chart: str
+    version: str
+    web_catalog_only: bool = False
+    chart_entry: dict = None
+    chart_url: str = None
+    # Absolute paths to the release assets
+    report_file: str = None
+    public_key_file: str = None
+    path_to_chart_tarball: str = None
+    prov_file_name: str = None
+
+    def get_release_tag(self) -> str:
+        return f"{self.organization}-{self.chart}-{self.version}"
+
+    def get_assets(self) -> list[str]:
+        """Files to upload to the GitHub release, none if the chart is Web Catalog Only"""
+        if self.web_catalog_only:
+            return []
+        assets = [
+            self.report_file,
+            self.public_key_file,
+            self.path_to_chart_tarball,
+            self.prov_file_name,
+        ]
+        return [asset for asset in assets if asset]
+
+
+def prepare_release(
+    repository,
+    request,
+    modified_chart,
+    report_file="report.yaml",
+    package_dir=PACKAGES_DIR,
+):
+    """Prepare the release assets and the index entry of the chart modified by a PR.
+
+    Args:
+        repository (str): Name of the git Repository
+        request (ReleaseRequest): The PR to prepare the release for
+        modified_chart (tuple): category, organization, chart and version modified by
+                                the PR, see find_modified_chart
+        report_file (str): Path to the report.yaml to include in the release
+        package_dir (str): Directory to place the chart's archive, provenance file and
+                           public key in
+
+    Returns:
+        ChartRelease: The prepared release.
+    """
+    category, organization, chart, version = modified_chart
     chart_source_exists, chart_tarball_exists = check_chart_source_or_tarball_exists(
         category, organization, chart, version
     )
+    release = ChartRelease(
+        category, organization, chart, version, request.web_catalog_only
+    )
+    current_dir = os.getcwd()
 
-    env = Env()
-    web_catalog_only = env.bool("WEB_CATALOG_ONLY", False)
-    ocp_version_range = os.environ.get("OCP_VERSION_RANGE", "N/A")
-
-    print(f"[INFO] webCatalogOnly/providerDelivery is {web_catalog_only}")
-
-    public_key_file = ""
-    print("[INFO] Report Content : ", os.environ.get("REPORT_CONTENT"))
     if chart_source_exists or chart_tarball_exists:
         if chart_source_exists:
-            prepare_chart_source_for_release(category, organization, chart, version)
+            prepare_chart_source_for_release(
+                category, organization, chart, version, package_dir=package_dir
+            )
         if chart_tarball_exists:
-            signed_chart = signedchart.is_chart_signed(args.api_url, "")
+            signed_chart = signedchart.is_chart_signed(request.api_url, "")
             public_key_file = prepare_chart_tarball_for_release(
-                category, organization, chart, version, signed_chart
+                category, organization, chart, version, signed_chart, package_dir
             )
+            if public_key_file:
+                release.public_key_file = os.path.join(current_dir, public_key_file)
+            if signed_chart:
+                release.prov_file_name = os.path.join(
+                    current_dir, package_dir, f"{chart}-{version}.tgz.prov"
+                )
 
         chart_file_name = f"{chart}-{version}.tgz"
-        tarball_path = os.path.join(
-            os.getcwd(), ".cr-release-packages", chart_file_name
+        release.path_to_chart_tarball = os.path.join(
+            current_dir, package_dir, chart_file_name
         )
-        gitutils.add_output("path_to_chart_tarball", tarball_path)
 
         print("[INFO] Check if report exist as part of the commit")
         report_exists, report_path = check_report_exists(
@@ -475,45 +590,315 @@ def main():
         )
 
         if report_exists:
-            shutil.copy(report_path, "report.yaml")
+            shutil.copy(report_path, report_file)
+        elif request.report_content is None:
+            raise ReleaseRequestError(
+                f"No report in {request.api_url} and no report content generated for it"
+            )
         else:
             print("[INFO] Generate report")
-            report_path = generate_report()
+            report_path = generate_report(request.report_content, report_file)
 
         print("[INFO] Updating chart annotation")
-        update_chart_annotation(
+        archive = update_chart_annotation(
             category,
             organization,
             chart_file_name,
             chart,
-            ocp_version_range,
+            request.ocp_version_range,
             report_path,
+            request.redhat_to_community,
+            package_dir,
         )
-        chart_url = f"https://github.com/{args.repository}/releases/download/{organization}-{chart}-{version}/{chart_file_name}"
+        release.chart_url = f"https://github.com/{repository}/releases/download/{release.get_release_tag()}/{chart_file_name}"
         print("[INFO] Creating index from chart")
-        chart_entry = create_index_from_chart(chart_file_name)
+        release.chart_entry = create_index_from_chart(
+            chart_file_name, archive, package_dir
+        )
     else:
         report_path = os.path.join(
             "charts", category, organization, chart, version, "report.yaml"
         )
         print(f"[INFO] Report only PR: {report_path}")
-        shutil.copy(report_path, "report.yaml")
+        shutil.copy(report_path, report_file)
         if signedchart.check_report_for_signed_chart(report_path):
-            public_key_file = get_key_file(category, organization, chart, version)
+            public_key_file = get_key_file(
+                category, organization, chart, version, package_dir
+            )
+            if public_key_file:
+                release.public_key_file = os.path.join(current_dir, public_key_file)
         print("[INFO] Creating index from report")
-        chart_url = report_info.get_report_chart_url(report_path)
-        chart_entry = create_index_from_report(category, ocp_version_range, report_path)
-
-    if not web_catalog_only:
-        current_dir = os.getcwd()
-        gitutils.add_output("report_file", f"{current_dir}/report.yaml")
-        if public_key_file:
-            print(f"[INFO] Add key file for release : {current_dir}/{public_key_file}")
-            gitutils.add_output("public_key_file", f"{current_dir}/{public_key_file}")
-
-    gitutils.add_output("chart_entry", _encode_chart_entry(chart_entry))
-    gitutils.add_output("chart_url", chart_url)
-    gitutils.add_output("version", version)
+        release.chart_url = report_info.get_report_chart_url(report_path)
+        release.chart_entry = create_index_from_report(
+            category,
+            request.ocp_version_range,
+            report_path,
+            request.redhat_to_community,
+        )
+
+    release.report_file = os.path.join(current_dir, report_file)
+    return release
+
+
+def prepare_releases(repository, requests, jobs=4):
+    """Prepare the releases of the charts modified by several merged PRs.
+
+    Releases of different charts are prepared in parallel, while the versions of a
+    same chart are prepared one after the other. Each release gets its own report.yaml,
+    under .cr-release-reports/<release tag>/, and its own chart archive, provenance
+    file and public key, under .cr-release-packages/<release tag>/: charts of
+    different organizations may share a name and version.
+
+    Args:
+        repository (str): Name of the git Repository
+        requests (list[ReleaseRequest]): The merged PRs
+        jobs (int): Maximum number of releases prepared in parallel
+
+    Returns:
+        (list[ChartRelease], list[str]): The prepared releases, in the order of the
+                                         requests, and the errors encountered.
+    """
+    errors = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        modified_charts = list(
+            executor.map(
+                _run_for_request,
+                [find_modified_chart] * len(requests),
+                [request.api_url for request in requests],
+            )
+        )
+
+        # Group the requests by chart, so that versions of a chart are not prepared
+        # concurrently
+        groups = {}
+        for request, (modified_chart, error) in zip(requests, modified_charts):
+            if error:
+                errors.append(f"{request.api_url}: {error}")
+                continue
+            if not modified_chart:
+                print(f"[INFO] No modified chart in {request.api_url}")
+                continue
+            category, organization, chart, _ = modified_chart
+            groups.setdefault((category, organization, chart), []).append(
+                (request, modified_chart)
+            )
+
+        futures = [
+            executor.submit(_prepare_group, repository, group)
+            for group in groups.values()
+        ]
+        results = {}
+        for future in futures:
+            for request, release, error in future.result():
+                if error:
+                    errors.append(f"{request.api_url}: {error}")
+                else:
+                    results[request.api_url] = release
+
+    releases = [results[r.api_url] for r in requests if r.api_url in results]
+    return releases, errors
+
+
+def _run_for_request(function, *args):
+    """Run function, returning its result and the error that occurred, if any."""
+    try:
+        return function(*args), None
+    except (Exception, SystemExit) as e:
+        return None, repr(e)
+
+
+def _prepare_group(repository, group):
+    results = []
+    for request, modified_chart in group:
+        _, organization, chart, version = modified_chart
+        release_tag = f"{organization}-{chart}-{version}"
+        report_dir = os.path.join(REPORTS_DIR, release_tag)
+        os.makedirs(report_dir, exist_ok=True)
+        release, error = _run_for_request(
+            prepare_release,
+            repository,
+            request,
+            modified_chart,
+            os.path.join(report_dir, "report.yaml"),
+            os.path.join(PACKAGES_DIR, release_tag),
+        )
+        results.append((request, release, error))
+    return results
+
+
+def read_release_requests(manifest_path):
+    """Read the merged PRs to release from a manifest file.
+
+    The manifest contains one JSON object per line, with the attributes of a
+    ReleaseRequest, e.g. {"api_url": "https://api.github.com/repos/o/r/pulls/1",
+    "web_catalog_only": false, "ocp_version_range": ">=4.12",
+    "redhat_to_community": false, "report_content": "..."}. These values are
+    specific to each PR: lines missing one of ReleaseRequest.REQUIRED_ATTRIBUTES, or
+    with a ReleaseRequest.BOOLEAN_ATTRIBUTES that is not a boolean (e.g. true or
+    "False"), are skipped and reported as errors.
+
+    Args:
+        manifest_path (str): Path to the manifest file
+
+    Returns:
+        (list[ReleaseRequest], list[str]): The merged PRs, and the errors
+                                           encountered.
+    """
+    requests = []
+    errors = []
+    with open(manifest_path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                attributes = json.loads(line)
+            except ValueError as e:
+                errors.append(f"{manifest_path}:{line_number}: {e}")
+                continue
+            missing = [
+                attribute
+                for attribute in ReleaseRequest.REQUIRED_ATTRIBUTES
+                if attribute not in attributes
+            ]
+            if missing:
+                errors.append(
+                    f"{attributes.get('api_url', f'{manifest_path}:{line_number}')}: "
+                    f"missing {', '.join(missing)} in the manifest"
+                )
+                continue
+            try:
+                for attribute in ReleaseRequest.BOOLEAN_ATTRIBUTES:
+                    attributes[attribute] = fields.Boolean().deserialize(
+                        attributes[attribute]
+                    )
+            except ValidationError as e:
+                errors.append(
+                    f"{attributes.get('api_url', f'{manifest_path}:{line_number}')}: "
+                    f"invalid {attribute} in the manifest: {e.messages[0]}"
+                )
+                continue
+            try:
+                requests.append(ReleaseRequest(**attributes))
+            except TypeError as e:
+                errors.append(f"{manifest_path}:{line_number}: {e}")
+    return requests, errors
+
+
+def write_releases(releases, path):
+    """Write the prepared releases, one JSON object per line.
+
+    Each line holds the index entry to add and its chart URL, version and entry name,
+    along with the release tag and the release assets.
+
+    Args:
+        releases (list[ChartRelease]): The prepared releases
+        path (str): Path to the file to write
+    """
+    with open(path, "w") as f:
+        for release in releases:
+            record = {
+                "chart_entry_name": release.chart,
+                "version": release.version,
+                "chart_url": release.chart_url,
+                "chart_entry": release.chart_entry,
+                "web_catalog_only": release.web_catalog_only,
+                "release_tag": release.get_release_tag(),
+                "assets": release.get_assets(),
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-r",
+        "--repository",
+        dest="repository",
+        type=str,
+        required=True,
+        help="Git Repository",
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument(
+        "-u",
+        "--api-url",
+        dest="api_url",
+        type=str,
+        help="API URL for the pull request",
+    )
+    mode.add_argument(
+        "-m",
+        "--manifest",
+        "--batch",
+        dest="manifest",
+        type=str,
+        help="JSON lines file describing the merged pull requests to release together, "
+        "with the chart-verifier outputs of each of them (see read_release_requests)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        type=str,
+        default="releases.jsonl",
+        help="in batch mode, JSON lines file to write the prepared releases to",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=4,
+        help="in batch mode, maximum number of releases prepared in parallel",
+    )
+    args = parser.parse_args()
+
+    if args.api_url:
+        # The chart-verifier outputs of the PR are passed in the environment
+        env = Env()
+        web_catalog_only = env.bool("WEB_CATALOG_ONLY", False)
+        ocp_version_range = os.environ.get("OCP_VERSION_RANGE", "N/A")
+        redhat_to_community = bool(os.environ.get("REDHAT_TO_COMMUNITY"))
+
+        modified_chart = get_modified_charts(args.api_url)
+        request = ReleaseRequest(
+            args.api_url,
+            report_content=os.environ.get("REPORT_CONTENT"),
+            web_catalog_only=web_catalog_only,
+            ocp_version_range=ocp_version_range,
+            redhat_to_community=redhat_to_community,
+        )
+        print(f"[INFO] webCatalogOnly/providerDelivery is {web_catalog_only}")
+        print("[INFO] Report Content : ", os.environ.get("REPORT_CONTENT"))
+        release = prepare_release(args.repository, request, modified_chart)
+
+        if release.path_to_chart_tarball:
+            gitutils.add_output("path_to_chart_tarball", release.path_to_chart_tarball)
+        if release.prov_file_name:
+            gitutils.add_output("prov_file_name", release.prov_file_name)
+        if not web_catalog_only:
+            gitutils.add_output("report_file", release.report_file)
+            if release.public_key_file:
+                print(f"[INFO] Add key file for release : {release.public_key_file}")
+                gitutils.add_output("public_key_file", release.public_key_file)
+
+        gitutils.add_output("chart_entry", _encode_chart_entry(release.chart_entry))
+        gitutils.add_output("chart_url", release.chart_url)
+        gitutils.add_output("version", release.version)
+    else:
+        requests, errors = read_release_requests(args.manifest)
+        print(f"[INFO] Preparing the releases of {len(requests)} pull requests")
+        releases, release_errors = prepare_releases(
+            args.repository, requests, args.jobs
+        )
+        errors.extend(release_errors)
+        write_releases(releases, args.output)
+        gitutils.add_output("releases_file", os.path.abspath(args.output))
+        gitutils.add_output("release_count", len(releases))
+        if errors:
+            for error in errors:
+                print(f"[ERROR] Failed to prepare release for {error}")
+            sys.exit(1)
 
     print("Sleeping for 10 seconds")
     time.sleep(10)
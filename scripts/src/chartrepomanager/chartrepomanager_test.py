@@ -0,0 +1,268 @@
+import io
+import json
+import subprocess
+import tarfile
+import threading
+import time
+
+import pytest
+
+from chartrepomanager import chartrepomanager
+from tools import package_cache
+
+modified_charts = {
+    "https://api.github.com/repos/o/r/pulls/1": (
+        "partners",
+        "acme",
+        "awesome",
+        "1.0.0",
+    ),
+    "https://api.github.com/repos/o/r/pulls/2": ("partners", "acme", "other", "0.1.0"),
+    "https://api.github.com/repos/o/r/pulls/3": (
+        "partners",
+        "acme",
+        "awesome",
+        "1.1.0",
+    ),
+    "https://api.github.com/repos/o/r/pulls/4": None,
+    "https://api.github.com/repos/o/r/pulls/5": ("partners", "acme", "broken", "1.0.0"),
+}
+
+
+def test_prepare_releases(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(chartrepomanager, "find_modified_chart", modified_charts.get)
+
+    lock = threading.Lock()
+    running = set()
+    overlaps = []
+
+    def prepare_release(repository, request, modified_chart, report_file, package_dir):
+        category, organization, chart, version = modified_chart
+        if chart == "broken":
+            raise FileNotFoundError("charts/partners/acme/broken/1.0.0/report.yaml")
+        with lock:
+            if chart in running:
+                overlaps.append(chart)
+            running.add(chart)
+        time.sleep(0.05)
+        with lock:
+            running.remove(chart)
+        return chartrepomanager.ChartRelease(
+            category,
+            organization,
+            chart,
+            version,
+            chart_entry={"name": chart, "version": version},
+            chart_url=f"https://example.com/{chart}-{version}.tgz",
+            report_file=str(tmp_path / report_file),
+        )
+
+    monkeypatch.setattr(chartrepomanager, "prepare_release", prepare_release)
+
+    requests = [chartrepomanager.ReleaseRequest(url) for url in modified_charts]
+    releases, errors = chartrepomanager.prepare_releases("o/r", requests, jobs=4)
+
+    # Versions of the same chart are never prepared concurrently
+    assert not overlaps
+    assert [r.get_release_tag() for r in releases] == [
+        "acme-awesome-1.0.0",
+        "acme-other-0.1.0",
+        "acme-awesome-1.1.0",
+    ]
+    assert releases[0].report_file == str(
+        tmp_path / ".cr-release-reports" / "acme-awesome-1.0.0" / "report.yaml"
+    )
+    assert len(errors) == 1
+    assert errors[0].startswith("https://api.github.com/repos/o/r/pulls/5: ")
+
+    output = tmp_path / "releases.jsonl"
+    chartrepomanager.write_releases(releases, output)
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert records[0] == {
+        "chart_entry_name": "awesome",
+        "version": "1.0.0",
+        "chart_url": "https://example.com/awesome-1.0.0.tgz",
+        "chart_entry": {"name": "awesome", "version": "1.0.0"},
+        "web_catalog_only": False,
+        "release_tag": "acme-awesome-1.0.0",
+        "assets": [releases[0].report_file],
+    }
+
+
+def test_read_release_requests(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        '{"api_url": "https://api.github.com/repos/o/r/pulls/1", '
+        '"web_catalog_only": false, "ocp_version_range": "N/A", '
+        '"redhat_to_community": false, "report_content": "kind%3A%20verify-report"}\n'
+        "\n"
+        '{"api_url": "https://api.github.com/repos/o/r/pulls/2", '
+        '"web_catalog_only": true, "ocp_version_range": ">=4.12", '
+        '"redhat_to_community": true}\n'
+        '{"api_url": "https://api.github.com/repos/o/r/pulls/3", '
+        '"ocp_version_range": ">=4.12"}\n'
+        "not json\n"
+        '{"api_url": "https://api.github.com/repos/o/r/pulls/4", '
+        '"web_catalog_only": "False", "ocp_version_range": ">=4.12", '
+        '"redhat_to_community": "True"}\n'
+        '{"api_url": "https://api.github.com/repos/o/r/pulls/5", '
+        '"web_catalog_only": "maybe", "ocp_version_range": ">=4.12", '
+        '"redhat_to_community": false}\n'
+    )
+
+    requests, errors = chartrepomanager.read_release_requests(manifest)
+
+    assert requests == [
+        chartrepomanager.ReleaseRequest(
+            "https://api.github.com/repos/o/r/pulls/1",
+            report_content="kind%3A%20verify-report",
+        ),
+        chartrepomanager.ReleaseRequest(
+            "https://api.github.com/repos/o/r/pulls/2",
+            web_catalog_only=True,
+            ocp_version_range=">=4.12",
+            redhat_to_community=True,
+        ),
+        # The outputs of the workflow are strings
+        chartrepomanager.ReleaseRequest(
+            "https://api.github.com/repos/o/r/pulls/4",
+            web_catalog_only=False,
+            ocp_version_range=">=4.12",
+            redhat_to_community=True,
+        ),
+    ]
+    assert errors[0] == (
+        "https://api.github.com/repos/o/r/pulls/3: missing web_catalog_only, "
+        "redhat_to_community in the manifest"
+    )
+    assert errors[1].startswith(f"{manifest}:5: ")
+    assert errors[2] == (
+        "https://api.github.com/repos/o/r/pulls/5: invalid web_catalog_only in the "
+        "manifest: Not a valid boolean."
+    )
+
+
+def test_prepare_release_without_report_content(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("REPORT_CONTENT", "kind%3A%20verify-report")
+    version_dir = tmp_path / "charts" / "partners" / "acme" / "awesome" / "1.0.0"
+    (version_dir / "src").mkdir(parents=True)
+    monkeypatch.setattr(
+        chartrepomanager,
+        "prepare_chart_source_for_release",
+        lambda *args, **kwargs: None,
+    )
+
+    request = chartrepomanager.ReleaseRequest(
+        "https://api.github.com/repos/o/r/pulls/1", ocp_version_range=">=4.12"
+    )
+    # The report content of another PR, from the environment, is not used
+    with pytest.raises(chartrepomanager.ReleaseRequestError, match="no report content"):
+        chartrepomanager.prepare_release(
+            "o/r", request, ("partners", "acme", "awesome", "1.0.0")
+        )
+    assert not (tmp_path / "report.yaml").exists()
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+def test_prepare_chart_source_for_release(tmp_path, monkeypatch, normalize):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(package_cache.CACHE_DIR_ENV, str(tmp_path / "cache"))
+    monkeypatch.setenv(chartrepomanager.NORMALIZE_PACKAGES_ENV, str(normalize))
+    monkeypatch.setattr(chartrepomanager, "_get_helm_version", lambda: "v3.15.0")
+    src = tmp_path / "charts" / "partners" / "acme" / "awesome" / "1.0.0" / "src"
+    src.mkdir(parents=True)
+    (src / "Chart.yaml").write_text("apiVersion: v2\nname: awesome\nversion: 1.0.0\n")
+    packaged = []
+
+    def helm_package(args, **kwargs):
+        # The mtime of the members changes with every build
+        packaged.append(args)
+        destination = args[args.index("--destination") + 1]
+        with tarfile.open(f"{destination}/awesome-1.0.0.tgz", "w:gz") as tar:
+            info = tarfile.TarInfo("awesome/Chart.yaml")
+            content = (src / "Chart.yaml").read_bytes()
+            info.size, info.mtime = len(content), 1_000_000 + len(packaged)
+            tar.addfile(info, io.BytesIO(content))
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(chartrepomanager.subprocess, "run", helm_package)
+    package = tmp_path / ".cr-release-packages" / "awesome-1.0.0.tgz"
+
+    chartrepomanager.prepare_chart_source_for_release(
+        "partners", "acme", "awesome", "1.0.0"
+    )
+    first = package.read_bytes()
+    with tarfile.open(package) as tar:
+        assert (tar.getmember("awesome/Chart.yaml").mtime == 0) == normalize
+
+    # The cached package is reused
+    chartrepomanager.prepare_chart_source_for_release(
+        "partners", "acme", "awesome", "1.0.0"
+    )
+    assert len(packaged) == 1
+    assert package.read_bytes() == first
+
+    # Normalized packages don't depend on the build
+    (tmp_path / "cache").rename(tmp_path / "old-cache")
+    chartrepomanager.prepare_chart_source_for_release(
+        "partners", "acme", "awesome", "1.0.0"
+    )
+    assert len(packaged) == 2
+    assert (package.read_bytes() == first) == normalize
+    assert not (tmp_path / "awesome-1.0.0.tgz").exists()
+
+
+def test_prepare_releases_same_chart_name(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modified_charts = {
+        "https://api.github.com/repos/o/r/pulls/1": (
+            "partners",
+            "acme",
+            "awesome",
+            "1.0.0",
+        ),
+        "https://api.github.com/repos/o/r/pulls/2": (
+            "partners",
+            "other",
+            "awesome",
+            "1.0.0",
+        ),
+    }
+    monkeypatch.setattr(chartrepomanager, "find_modified_chart", modified_charts.get)
+    monkeypatch.setattr(chartrepomanager, "_get_helm_version", lambda: "v3.15.0")
+    monkeypatch.setattr(chartrepomanager, "update_chart_annotation", lambda *args: None)
+    monkeypatch.setattr(
+        chartrepomanager, "create_index_from_chart", lambda *args: {"name": "awesome"}
+    )
+    for _, organization, chart, version in modified_charts.values():
+        version_dir = tmp_path / "charts" / "partners" / organization / chart / version
+        version_dir.mkdir(parents=True)
+        (version_dir / "src").mkdir()
+        (version_dir / "report.yaml").write_text(f"organization: {organization}\n")
+
+    def helm_package(args, **kwargs):
+        organization = args[2].split("/")[2]
+        destination = args[args.index("--destination") + 1]
+        with open(f"{destination}/awesome-1.0.0.tgz", "w") as f:
+            f.write(organization)
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    monkeypatch.setattr(chartrepomanager.subprocess, "run", helm_package)
+
+    requests = [chartrepomanager.ReleaseRequest(url) for url in modified_charts]
+    releases, errors = chartrepomanager.prepare_releases("o/r", requests, jobs=2)
+
+    assert not errors
+    for release in releases:
+        assert release.path_to_chart_tarball == str(
+            tmp_path
+            / ".cr-release-packages"
+            / release.get_release_tag()
+            / "awesome-1.0.0.tgz"
+        )
+        with open(release.path_to_chart_tarball) as f:
+            assert f.read() == release.organization
+        with open(release.report_file) as f:
+            assert f.read() == f"organization: {release.organization}\n"
@@ -3,7 +3,8 @@ import os
 import sys
 import time
 
-import requests
+sys.path.append("../")
+from tools import github_client
 
 
 def ensure_pull_request_not_merged(api_url):
@@ -14,7 +15,7 @@ def ensure_pull_request_not_merged(api_url):
     }
     merged = False
     for i in range(20):
-        r = requests.get(api_url, headers=headers)
+        r = github_client.get_client().get(api_url, headers=headers)
         response_content = r.json()
         if "message" in response_content:
             print(f'[ERROR] merge status: {response_content["message"]}')
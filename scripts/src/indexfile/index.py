@@ -1,112 +1,143 @@
-import json
 import sys
 
-import requests
-import semantic_version
-import yaml
-
 sys.path.append("../")
+from indexfile import index_cache, index_lookup, index_variants
 
 INDEX_FILE = "https://charts.openshift.io/index.yaml"
 
 
-def _make_http_request(url, body=None, params={}, headers={}, verbose=False):
-    response = requests.get(url, params=params, headers=headers, json=body)
-    if verbose:
-        print(json.dumps(headers, indent=4, sort_keys=True))
-        print(json.dumps(body, indent=4, sort_keys=True))
-        print(json.dumps(params, indent=4, sort_keys=True))
-        print(response.text)
-    return response.text
-
-
-def _load_index_yaml():
-    yaml_text = _make_http_request(INDEX_FILE)
-    dct = yaml.safe_load(yaml_text)
-    return dct
+def _load_index():
+    """Load the lookup file of the index if available, as it holds all the fields used
+    here and is much faster to parse, or the index itself otherwise."""
+    try:
+        return index_lookup.get_lookup(INDEX_FILE)
+    except (index_cache.IndexDownloadError, index_lookup.LookupParseError) as e:
+        print(f"[INFO] index lookup not available, loading the index instead: {e}")
+        return index_cache.get_index(INDEX_FILE)
+
+
+def _get_chart_info(entry, chart):
+    chart_info = {}
+    chart_info["name"] = chart["name"]
+    chart_info["version"] = chart["version"]
+    chart_info["providerType"] = chart["annotations"][
+        "charts.openshift.io/providerType"
+    ]
+    chart_info["provider"] = entry.removesuffix(f'-{chart["name"]}')
+    if "charts.openshift.io/supportedOpenShiftVersions" in chart["annotations"]:
+        chart_info["supportedOCP"] = chart["annotations"][
+            "charts.openshift.io/supportedOpenShiftVersions"
+        ]
+    else:
+        chart_info["supportedOCP"] = ""
+    if "kubeVersion" in chart:
+        chart_info["kubeVersion"] = chart["kubeVersion"]
+    else:
+        chart_info["kubeVersion"] = ""
+    return chart_info
+
+
+class IndexView:
+    """Read-only queries over the content of a Helm repository index.
+
+    Releases are indexed by their "<entry>-<version>" name (i.e. the name of the
+    corresponding GitHub release), so that looking up a release does not require
+    scanning the whole index.
+
+    """
+
+    def __init__(self, index_dct):
+        self.index = index_dct
+        self.releases = {}
+        self.count = 0
+        for entry, charts in index_dct["entries"].items():
+            self.count += len(charts)
+            for chart in charts:
+                self.releases.setdefault(f"{entry}-{chart['version']}", chart)
+
+    def get_chart_info(self, tar_name):
+        """Get the provider type, provider, name and version of a release.
+
+        Args:
+            tar_name (str): Name of the release, as "<entry>-<version>".
+
+        Returns:
+            (str, str, str, str): The provider type, provider, chart name and version,
+                                  or empty strings if the release is not in the index.
+        """
+        chart = self.releases.get(tar_name)
+        if chart is None:
+            print(f"[INFO] match not found: {tar_name}")
+            return "", "", "", ""
+
+        print(f"[INFO] match found: {tar_name}")
+        providerType = chart["annotations"]["charts.openshift.io/providerType"]
+        provider = chart["annotations"]["charts.openshift.io/provider"]
+        return providerType, provider, chart["name"], chart["version"]
+
+    def get_charts_info(self):
+        """List the chart info (see _get_chart_info) of every release in the index."""
+        return [
+            _get_chart_info(entry, chart)
+            for entry, charts in self.index["entries"].items()
+            for chart in charts
+        ]
+
+    def get_latest_charts(self):
+        """List the chart info of the latest version of each chart in the index."""
+        latest_charts = []
+        for entry, charts in self.index["entries"].items():
+            latest = index_variants.get_latest_chart(charts)
+            if latest is not None:
+                latest_charts.append(_get_chart_info(entry, latest))
+        return latest_charts
+
+
+_view = None
+
+
+def get_index_view():
+    """Return the IndexView of the Helm repository index, built once per process."""
+    global _view
+    index_dct = _load_index()
+    if _view is None or _view.index is not index_dct:
+        _view = IndexView(index_dct)
+    return _view
 
 
 def get_chart_info(tar_name):
-    index_dct = _load_index_yaml()
-    for entry, charts in index_dct["entries"].items():
-        if tar_name.startswith(entry):
-            for chart in charts:
-                index_tar_name = f"{entry}-{chart['version']}"
-                if tar_name == index_tar_name:
-                    print(f"[INFO] match found: {tar_name}")
-                    providerType = chart["annotations"][
-                        "charts.openshift.io/providerType"
-                    ]
-                    provider = chart["annotations"]["charts.openshift.io/provider"]
-                    return providerType, provider, chart["name"], chart["version"]
-    print(f"[INFO] match not found: {tar_name}")
-    return "", "", "", ""
+    return get_index_view().get_chart_info(tar_name)
 
 
 def get_charts_info():
-    chart_info_list = []
-
-    index_dct = _load_index_yaml()
-    for entry, charts in index_dct["entries"].items():
-        for chart in charts:
-            chart_info = {}
-            chart_info["name"] = chart["name"]
-            chart_info["version"] = chart["version"]
-            chart_info["providerType"] = chart["annotations"][
-                "charts.openshift.io/providerType"
-            ]
-            chart_info["provider"] = entry.removesuffix(f'-{chart["name"]}')
-            # print(f'[INFO] found chart : {chart_info["provider"]} {chart["name"]} {chart["version"]} ')
-            if "charts.openshift.io/supportedOpenShiftVersions" in chart["annotations"]:
-                chart_info["supportedOCP"] = chart["annotations"][
-                    "charts.openshift.io/supportedOpenShiftVersions"
-                ]
-            else:
-                chart_info["supportedOCP"] = ""
-            if "kubeVersion" in chart:
-                chart_info["kubeVersion"] = chart["kubeVersion"]
-            else:
-                chart_info["kubeVersion"] = ""
-            chart_info_list.append(chart_info)
-
-    return chart_info_list
+    return get_index_view().get_charts_info()
 
 
 def get_latest_charts():
-    chart_list = get_charts_info()
-
-    print(f"{len(chart_list)} charts found in Index file")
-
-    chart_in_process = {"name": ""}
-    chart_latest_version = ""
-    latest_charts = []
-
-    for index, chart in enumerate(chart_list):
-        chart_name = chart["name"]
-        # print(f'[INFO] look for latest chart : {chart_name} {chart["version"]}')
-        if chart_name == chart_in_process["name"]:
-            new_version = semantic_version.Version.coerce(chart["version"])
-            # print(f'   [INFO] compare chart versions : {new_version}({chart["version"]}) : {chart_latest_version}')
-            if new_version > chart_latest_version:
-                # print(f'   [INFO] a new latest chart version : {new_version}')
-                chart_latest_version = new_version
-                chart_in_process = chart
-        else:
-            if chart_in_process["name"] != "":
-                # print(f'   [INFO] chart completed : {chart_in_process["name"]} {chart_in_process["version"]}')
-                latest_charts.append(chart_in_process)
-
-                # print(f'[INFO] new  chart found : {chart_name} {chart["version"]}')
-                chart_in_process = chart
-                chart_version = chart["version"]
-                if chart_version.startswith("v"):
-                    chart_version = chart_version[1:]
-                chart_latest_version = semantic_version.Version.coerce(chart_version)
-            else:
-                chart_in_process = chart
-
-        if index + 1 == len(chart_list):
-            # print(f'   [INFO] last chart completed : {chart_in_process["name"]} {chart_in_process["version"]}')
-            latest_charts.append(chart_in_process)
-
-    return latest_charts
+    # The latest-only index holds the latest version of each chart, if available
+    try:
+        latest_index = index_variants.get_latest_index(INDEX_FILE)
+    except (index_cache.IndexDownloadError, index_lookup.LookupParseError) as e:
+        print(f"[INFO] latest-only index not available, loading the index instead: {e}")
+    else:
+        return IndexView(latest_index).get_charts_info()
+
+    view = get_index_view()
+
+    print(f"{view.count} charts found in Index file")
+
+    return view.get_latest_charts()
+
+
+def get_ocp_compatibility():
+    """Get the compatibility of the latest charts with OpenShift minor versions.
+
+    Returns:
+        dict: The compatibility table, see index_variants.py. It is built from the
+              index if the precomputed table is not available.
+    """
+    try:
+        return index_variants.get_ocp_compatibility(INDEX_FILE)
+    except (index_cache.IndexDownloadError, index_lookup.LookupParseError) as e:
+        print(f"[INFO] compatibility table not available, building it instead: {e}")
+        return index_variants.build_ocp_compatibility(_load_index())
@@ -0,0 +1,212 @@
+"""Download and parse Helm repository index files, with caching.
+
+The index.yaml of the Helm repository is several megabytes. Instead of downloading and
+parsing it every time it is needed, get_index:
+
+* keeps the parsed index in memory for the rest of the process, so each index is
+  downloaded and parsed at most once per process.
+* if the INDEX_CACHE_DIR environment variable is set, stores the raw index on disk
+  along with its ETag and Last-Modified headers. Later processes (e.g. other jobs
+  restoring the same directory) revalidate it with a conditional GET, and only
+  download it again if it has changed.
+
+The number of bytes transferred and the time spent parsing are reported in the stats.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+CACHE_DIR_ENV = "INDEX_CACHE_DIR"
+REQUEST_TIMEOUT = 30
+
+
+class IndexDownloadError(Exception):
+    """This exception is raised when the index can't be downloaded"""
+
+
+class IndexParseError(Exception):
+    """This exception is raised when the index is not valid YAML"""
+
+
+class IndexStats:
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.memory_hits = 0
+        self.bytes_transferred = 0
+        self.parse_time = 0.0
+
+    def __str__(self):
+        return (
+            f"requests={self.requests}, not_modified={self.not_modified}, "
+            f"memory_hits={self.memory_hits}, bytes_transferred={self.bytes_transferred}, "
+            f"parse_time={self.parse_time:.3f}s"
+        )
+
+
+stats = IndexStats()
+
+# Parsed indexes, by URL
+_indexes = {}
+
+
+def _cache_paths(directory, url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return (
+        os.path.join(directory, f"{key}.yaml"),
+        os.path.join(directory, f"{key}.json"),
+    )
+
+
+def _atomic_write(path, content):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _load_cached(directory, url):
+    """Return the raw index stored on disk for url and its validators, if any."""
+    content_path, meta_path = _cache_paths(directory, url)
+    try:
+        with open(meta_path) as fd:
+            meta = json.load(fd)
+        with open(content_path, "rb") as fd:
+            content = fd.read()
+    except (OSError, ValueError):
+        return None, {}
+    return content, meta
+
+
+def _store_cached(directory, url, response):
+    os.makedirs(directory, exist_ok=True)
+    content_path, meta_path = _cache_paths(directory, url)
+    meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    _atomic_write(content_path, response.content)
+    _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+def _download(url, timeout):
+    """Download the raw index at url, revalidating the on-disk copy if there is one."""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    cached_content, meta = None, {}
+    if directory:
+        cached_content, meta = _load_cached(directory, url)
+
+    headers = {}
+    if cached_content is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = requests.get(url, headers=headers, timeout=timeout)
+    stats.requests += 1
+    stats.bytes_transferred += len(r.content)
+
+    if r.status_code == 304 and cached_content is not None:
+        stats.not_modified += 1
+        print(f"[INFO] index not modified, using cached copy: {url} ({stats})")
+        return cached_content
+
+    if r.status_code != 200:
+        raise IndexDownloadError(
+            f"Error retrieving index file at {url}: status code {r.status_code}"
+        )
+
+    if directory:
+        _store_cached(directory, url, r)
+    return r.content
+
+
+def get_index_content(url, timeout=REQUEST_TIMEOUT):
+    """Get the raw content of the Helm repository index at url, without parsing it.
+
+    Args:
+        url (str): URL of the index file.
+        timeout (int): Timeout of the HTTP request, in seconds.
+
+    Returns:
+        bytes: The content of the index file.
+
+    Raises:
+        IndexDownloadError: if the index can't be downloaded.
+    """
+    return _download(url, timeout)
+
+
+def get_index_tail(url, size, timeout=REQUEST_TIMEOUT):
+    """Get the last bytes of the Helm repository index at url, with a range request.
+
+    Args:
+        url (str): URL of the index file.
+        size (int): Number of bytes to get.
+        timeout (int): Timeout of the HTTP request, in seconds.
+
+    Returns:
+        bytes: At least the last size bytes of the index file, or the whole file if the
+               server doesn't support range requests.
+
+    Raises:
+        IndexDownloadError: if the index can't be downloaded.
+    """
+    r = requests.get(url, headers={"Range": f"bytes=-{size}"}, timeout=timeout)
+    stats.requests += 1
+    stats.bytes_transferred += len(r.content)
+    if r.status_code not in (200, 206):
+        raise IndexDownloadError(
+            f"Error retrieving index file at {url}: status code {r.status_code}"
+        )
+    return r.content
+
+
+def get_index(url, timeout=REQUEST_TIMEOUT, mutable=False):
+    """Get the parsed content of the Helm repository index at url.
+
+    Args:
+        url (str): URL of the index file.
+        timeout (int): Timeout of the HTTP request, in seconds.
+        mutable (bool): Set to True to get a copy of the index that the caller can
+            modify. Otherwise, the returned index is shared with the other callers in
+            the process and must not be modified.
+
+    Returns:
+        dict: The content of the index.
+
+    Raises:
+        IndexDownloadError: if the index can't be downloaded.
+        IndexParseError: if the index is not valid YAML.
+    """
+    if url in _indexes:
+        stats.memory_hits += 1
+    else:
+        content = _download(url, timeout)
+        start = time.perf_counter()
+        try:
+            _indexes[url] = yaml.load(content, Loader=SafeLoader)
+        except yaml.YAMLError as e:
+            raise IndexParseError(f"Error parsing index file at {url}") from e
+        finally:
+            stats.parse_time += time.perf_counter() - start
+        print(f"[INFO] index loaded: {url} ({stats})")
+
+    if mutable:
+        return copy.deepcopy(_indexes[url])
+    return _indexes[url]
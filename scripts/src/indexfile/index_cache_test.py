@@ -0,0 +1,79 @@
+import pytest
+import responses
+
+from indexfile import index_cache
+
+INDEX_URL = "https://example.com/index.yaml"
+INDEX_CONTENT = """\
+apiVersion: v1
+entries:
+  acme-awesome:
+  - name: awesome
+    version: 1.42.0
+"""
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(monkeypatch):
+    monkeypatch.setattr(index_cache, "_indexes", {})
+    monkeypatch.setattr(index_cache, "stats", index_cache.IndexStats())
+    monkeypatch.delenv(index_cache.CACHE_DIR_ENV, raising=False)
+
+
+@responses.activate
+def test_index_is_downloaded_once_per_process():
+    responses.get(INDEX_URL, body=INDEX_CONTENT)
+
+    index = index_cache.get_index(INDEX_URL)
+    assert index["entries"]["acme-awesome"][0]["version"] == "1.42.0"
+    assert index_cache.get_index(INDEX_URL) is index
+
+    assert len(responses.calls) == 1
+    assert index_cache.stats.memory_hits == 1
+    assert index_cache.stats.bytes_transferred == len(INDEX_CONTENT)
+
+
+@responses.activate
+def test_mutable_index_is_a_copy():
+    responses.get(INDEX_URL, body=INDEX_CONTENT)
+
+    index_cache.get_index(INDEX_URL, mutable=True)["entries"] = {}
+
+    assert index_cache.get_index(INDEX_URL)["entries"] != {}
+
+
+@responses.activate
+def test_index_is_revalidated_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setenv(index_cache.CACHE_DIR_ENV, str(tmp_path))
+    responses.get(INDEX_URL, body=INDEX_CONTENT, headers={"ETag": '"abc"'})
+    index_cache.get_index(INDEX_URL)
+
+    # Simulate a later job: nothing in memory, but the cache directory is restored.
+    monkeypatch.setattr(index_cache, "_indexes", {})
+    responses.replace(
+        responses.GET,
+        INDEX_URL,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"abc"'})],
+    )
+    index = index_cache.get_index(INDEX_URL)
+
+    assert index["entries"]["acme-awesome"][0]["name"] == "awesome"
+    assert index_cache.stats.not_modified == 1
+    assert index_cache.stats.bytes_transferred == len(INDEX_CONTENT)
+
+
+@responses.activate
+def test_download_error():
+    responses.get(INDEX_URL, status=404)
+
+    with pytest.raises(index_cache.IndexDownloadError):
+        index_cache.get_index(INDEX_URL)
+
+
+@responses.activate
+def test_parse_error():
+    responses.get(INDEX_URL, body="entries: [")
+
+    with pytest.raises(index_cache.IndexParseError):
+        index_cache.get_index(INDEX_URL)
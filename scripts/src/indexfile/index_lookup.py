@@ -0,0 +1,217 @@
+"""JSON twins of the Helm repository index, written next to the index file.
+
+Parsing the YAML index takes seconds, even with the C loader. Whenever the index is
+written, two JSON files are written next to it:
+
+* <index>.json: the same content as the index, e.g. index.json for index.yaml.
+* <index>-lookup.json: a compact view holding, for each chart entry, the name, version,
+  digest, kubeVersion and key annotations of each version. It is enough to check if a
+  version exists or to get the provider of a release, and is much smaller to download
+  and faster to parse.
+
+Consumers should prefer the lookup file with get_lookup, and fall back to the index
+itself if it is missing. The lookup file records the generation date of the index it
+was built from: get_lookup checks it against the date at the end of the index, which
+only takes a range request, so that a stale lookup file is never used.
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+from indexfile import index_cache
+
+# Annotations kept in the lookup file
+LOOKUP_ANNOTATIONS = [
+    "charts.openshift.io/name",
+    "charts.openshift.io/provider",
+    "charts.openshift.io/providerType",
+    "charts.openshift.io/supportedOpenShiftVersions",
+    "charts.openshift.io/testedOpenShiftVersion",
+]
+# Fields of the index entries kept in the lookup file
+LOOKUP_FIELDS = ["name", "version", "digest", "kubeVersion"]
+# Number of bytes read at the end of the index to get its generation date, which is
+# serialized last
+INDEX_TAIL_SIZE = 1024
+
+# Parsed lookup files, or the error raised when getting them, by URL
+_lookups = {}
+
+
+class LookupParseError(Exception):
+    """This exception is raised when the lookup file is not valid JSON"""
+
+
+class LookupMismatchError(LookupParseError):
+    """This exception is raised when the lookup file was not built from the index"""
+
+
+def get_sidecar_paths(index_path):
+    """Get the paths of the JSON twin and lookup files of an index file or URL.
+
+    Args:
+        index_path (str): Path or URL of the index file, e.g. "gh-pages/index.yaml".
+
+    Returns:
+        (str, str): The paths of the JSON twin and of the lookup file, e.g.
+                    "gh-pages/index.json" and "gh-pages/index-lookup.json".
+    """
+    base, _ = os.path.splitext(index_path)
+    return f"{base}.json", f"{base}-lookup.json"
+
+
+def build_lookup(index_data):
+    """Build the content of the lookup file of an index.
+
+    Args:
+        index_data (dict): Content of the Helm repo index
+
+    Returns:
+        dict: The lookup content, with the same apiVersion, entries and generated keys
+              as the index.
+    """
+    entries = {}
+    for entry_name, charts in index_data["entries"].items():
+        entries[entry_name] = []
+        for chart in charts or []:
+            item = {field: chart[field] for field in LOOKUP_FIELDS if field in chart}
+            annotations = chart.get("annotations") or {}
+            item["annotations"] = {
+                key: annotations[key]
+                for key in LOOKUP_ANNOTATIONS
+                if key in annotations
+            }
+            entries[entry_name].append(item)
+    return {
+        "apiVersion": index_data.get("apiVersion", "v1"),
+        "entries": entries,
+        "generated": index_data.get("generated"),
+    }
+
+
+def get_generated(content):
+    """Generation date of a serialized index, as written in its JSON twin and lookup.
+
+    Args:
+        content (str): The index, or its last lines.
+
+    Returns:
+        str: The generation date, or None if it is not found.
+    """
+    match = re.search(r"^generated:.*$", content, re.MULTILINE)
+    if not match:
+        return None
+    generated = yaml.load(match.group(), Loader=SafeLoader)["generated"]
+    return _to_json(generated) if hasattr(generated, "isoformat") else generated
+
+
+def _to_json(value):
+    # Dates parsed from the YAML index are written back in ISO 8601
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True, default=_to_json)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def write_sidecars(index_file, index_data):
+    """Write the JSON twin and the lookup file of an index, next to the index file.
+
+    Args:
+        index_file (str): Path to the index file
+        index_data (dict): Content of the Helm repo index
+    """
+    json_path, lookup_path = get_sidecar_paths(index_file)
+    _write_json(json_path, index_data)
+    _write_json(lookup_path, build_lookup(index_data))
+    print(f"[INFO] Wrote {json_path} and {lookup_path}")
+
+
+def check_generated(index_url, url, data, timeout=index_cache.REQUEST_TIMEOUT):
+    """Check that a file derived from the index was built from its current version.
+
+    The generation date recorded in the file is compared to the one at the end of the
+    index, which only takes a range request.
+
+    Args:
+        index_url (str): URL of the index file, e.g. ".../index.yaml".
+        url (str): URL of the derived file, for error messages.
+        data (dict): Parsed content of the derived file.
+        timeout (int): Timeout of the HTTP request, in seconds.
+
+    Raises:
+        IndexDownloadError: if the index can't be downloaded.
+        LookupMismatchError: if the file was not built from the current index.
+    """
+    tail = index_cache.get_index_tail(index_url, INDEX_TAIL_SIZE, timeout=timeout)
+    generated = get_generated(tail.decode("utf-8", errors="replace"))
+    if (
+        generated is None
+        or not isinstance(data, dict)
+        or data.get("generated") != generated
+    ):
+        raise LookupMismatchError(
+            f"File at {url} doesn't match the index generated at {generated}"
+        )
+
+
+def _load_lookup(index_url, url, timeout):
+    content = index_cache.get_index_content(url, timeout=timeout)
+    start = time.perf_counter()
+    try:
+        lookup = json.loads(content)
+    except ValueError as e:
+        raise LookupParseError(f"Error parsing lookup file at {url}") from e
+    finally:
+        index_cache.stats.parse_time += time.perf_counter() - start
+
+    check_generated(index_url, url, lookup, timeout=timeout)
+    print(f"[INFO] index lookup loaded: {url} ({index_cache.stats})")
+    return lookup
+
+
+def get_lookup(index_url, timeout=index_cache.REQUEST_TIMEOUT):
+    """Get the lookup file of the Helm repository index at index_url.
+
+    As with index_cache.get_index, the lookup is downloaded, parsed and checked against
+    the index once per process, and must not be modified by the caller. If that fails,
+    the same error is raised by the following calls, so that callers fall back to the
+    index without downloading the lookup again.
+
+    Args:
+        index_url (str): URL of the index file, e.g. ".../index.yaml".
+        timeout (int): Timeout of the HTTP requests, in seconds.
+
+    Returns:
+        dict: The content of the lookup file.
+
+    Raises:
+        IndexDownloadError: if the lookup file or the index can't be downloaded.
+        LookupParseError: if the lookup file is not valid JSON.
+        LookupMismatchError: if the lookup file was not built from the current index.
+    """
+    _, url = get_sidecar_paths(index_url)
+    if url not in _lookups:
+        try:
+            _lookups[url] = _load_lookup(index_url, url, timeout)
+        except (index_cache.IndexDownloadError, LookupParseError) as e:
+            _lookups[url] = e
+    if isinstance(_lookups[url], Exception):
+        raise _lookups[url]
+    return _lookups[url]
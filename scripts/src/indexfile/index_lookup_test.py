@@ -0,0 +1,151 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+import responses
+from responses import matchers
+
+from indexfile import index_cache, index_lookup
+
+INDEX_URL = "https://example.com/index.yaml"
+LOOKUP_URL = "https://example.com/index-lookup.json"
+
+index = {
+    "apiVersion": "v1",
+    "entries": {
+        "acme-awesome": [
+            {
+                "annotations": {
+                    "charts.openshift.io/name": "Awesome",
+                    "charts.openshift.io/provider": "Acme",
+                    "charts.openshift.io/digests": "ignored",
+                },
+                "created": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                "description": "An awesome chart",
+                "digest": "0123456789abcdef",
+                "kubeVersion": ">=1.25.0-0",
+                "name": "awesome",
+                "urls": ["https://example.com/awesome-1.0.0.tgz"],
+                "version": "1.0.0",
+            }
+        ],
+    },
+    "generated": datetime(2024, 5, 17, 9, 30, tzinfo=timezone.utc),
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(monkeypatch):
+    monkeypatch.setattr(index_lookup, "_lookups", {})
+    monkeypatch.setattr(index_cache, "_indexes", {})
+    monkeypatch.setattr(index_cache, "stats", index_cache.IndexStats())
+    monkeypatch.delenv(index_cache.CACHE_DIR_ENV, raising=False)
+
+
+def test_get_sidecar_paths():
+    assert index_lookup.get_sidecar_paths("gh-pages/index.yaml") == (
+        "gh-pages/index.json",
+        "gh-pages/index-lookup.json",
+    )
+    assert index_lookup.get_sidecar_paths(INDEX_URL)[1] == LOOKUP_URL
+
+
+def test_write_sidecars(tmp_path):
+    index_file = tmp_path / "index.yaml"
+    index_lookup.write_sidecars(str(index_file), index)
+
+    twin = json.loads((tmp_path / "index.json").read_text())
+    assert twin["generated"] == "2024-05-17T09:30:00+00:00"
+    assert twin["entries"]["acme-awesome"][0]["created"] == "2024-01-01T00:00:00+00:00"
+    assert twin["entries"]["acme-awesome"][0]["description"] == "An awesome chart"
+
+    lookup = json.loads((tmp_path / "index-lookup.json").read_text())
+    assert lookup["entries"] == {
+        "acme-awesome": [
+            {
+                "annotations": {
+                    "charts.openshift.io/name": "Awesome",
+                    "charts.openshift.io/provider": "Acme",
+                },
+                "digest": "0123456789abcdef",
+                "kubeVersion": ">=1.25.0-0",
+                "name": "awesome",
+                "version": "1.0.0",
+            }
+        ]
+    }
+
+
+def mock_index_tail(generated):
+    """Mock the range request of the end of the index."""
+    responses.get(
+        INDEX_URL,
+        status=206,
+        body=f'    version: 1.0.0\ngenerated: "{generated}"\n',
+        match=[
+            matchers.header_matcher({"Range": f"bytes=-{index_lookup.INDEX_TAIL_SIZE}"})
+        ],
+    )
+
+
+@responses.activate
+def test_lookup_is_downloaded_once_per_process(tmp_path):
+    index_lookup.write_sidecars(str(tmp_path / "index.yaml"), index)
+    responses.get(LOOKUP_URL, body=(tmp_path / "index-lookup.json").read_bytes())
+    mock_index_tail("2024-05-17T09:30:00+00:00")
+
+    lookup = index_lookup.get_lookup(INDEX_URL)
+    assert lookup["entries"]["acme-awesome"][0]["version"] == "1.0.0"
+    assert index_lookup.get_lookup(INDEX_URL) is lookup
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_lookup_out_of_date(tmp_path):
+    index_lookup.write_sidecars(str(tmp_path / "index.yaml"), index)
+    responses.get(LOOKUP_URL, body=(tmp_path / "index-lookup.json").read_bytes())
+    mock_index_tail("2024-05-18T10:00:00+00:00")
+
+    with pytest.raises(index_lookup.LookupMismatchError):
+        index_lookup.get_lookup(INDEX_URL)
+    # The lookup is not downloaded again
+    with pytest.raises(index_lookup.LookupMismatchError):
+        index_lookup.get_lookup(INDEX_URL)
+    assert len(responses.calls) == 2
+
+
+def test_get_generated():
+    assert index_lookup.get_generated("generated: 2024-05-17T09:30:00Z\n") == (
+        "2024-05-17T09:30:00+00:00"
+    )
+    assert (
+        index_lookup.get_generated('generated: "2024-05-17T09:30:00.1+00:00"\n')
+        == "2024-05-17T09:30:00.1+00:00"
+    )
+    assert index_lookup.get_generated("apiVersion: v1\n") is None
+
+
+@responses.activate
+def test_invalid_lookup():
+    responses.get(LOOKUP_URL, body="not json")
+
+    with pytest.raises(index_lookup.LookupParseError):
+        index_lookup.get_lookup(INDEX_URL)
+
+
+@responses.activate
+def test_missing_lookup():
+    responses.get(LOOKUP_URL, status=404)
+
+    with pytest.raises(index_cache.IndexDownloadError):
+        index_lookup.get_lookup(INDEX_URL)
+
+
+@responses.activate
+def test_missing_lookup_is_downloaded_once_per_process():
+    responses.get(LOOKUP_URL, status=404)
+
+    for _ in range(2):
+        with pytest.raises(index_cache.IndexDownloadError):
+            index_lookup.get_lookup(INDEX_URL)
+    assert len(responses.calls) == 1
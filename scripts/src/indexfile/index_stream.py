@@ -0,0 +1,251 @@
+"""Query the Helm repository index without loading it, using the YAML event API.
+
+Loading the index builds the whole tree of Python objects, while most callers only
+need the versions of a single chart. IndexReader walks the parser events instead
+(libyaml when available): the entries that aren't queried are skipped without being
+constructed, and parsing stops as soon as the queried entry has been read. At most
+the events of one chart version are kept in memory.
+
+    reader = IndexReader(content)
+    reader.has_version("redhat-awesome", "1.42.0")
+    reader.get_versions("redhat-awesome")
+    reader.get_entry("redhat-awesome", "1.42.0")
+
+Versions are compared as written in the index, i.e. as strings.
+"""
+
+import io
+
+import yaml
+from yaml.events import (
+    AliasEvent,
+    CollectionEndEvent,
+    CollectionStartEvent,
+    DocumentEndEvent,
+    DocumentStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+    StreamStartEvent,
+)
+
+try:
+    from yaml import CDumper as Dumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import Dumper, SafeLoader
+
+# Plain scalars resolved to None, e.g. for "entries:" with no value
+NULL_VALUES = ("", "~", "null", "Null", "NULL")
+
+
+class IndexStreamError(Exception):
+    """This exception is raised when the index doesn't have the expected structure"""
+
+
+def _next(events):
+    event = next(events, None)
+    if event is None:
+        raise IndexStreamError("Malformed index: unexpected end of stream")
+    return event
+
+
+def _expect(events, event_class):
+    event = _next(events)
+    if not isinstance(event, event_class):
+        raise IndexStreamError(
+            f"Malformed index: expected {event_class.__name__}, got {event}"
+        )
+    return event
+
+
+def _read_node(events, first):
+    """Yield the events of the node starting with first, consuming them."""
+    yield first
+    depth = 1 if isinstance(first, CollectionStartEvent) else 0
+    while depth:
+        event = _next(events)
+        if isinstance(event, CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, CollectionEndEvent):
+            depth -= 1
+        yield event
+
+
+def _skip_node(events, first):
+    for _ in _read_node(events, first):
+        pass
+
+
+def _is_null(event):
+    return (
+        isinstance(event, ScalarEvent)
+        and event.implicit[0]
+        and event.value in NULL_VALUES
+    )
+
+
+class IndexReader:
+    """Streaming queries over the content of a Helm repository index.
+
+    Each query parses the index again, from the start, until the queried entry.
+
+    Args:
+        content (bytes or str): Content of the index file.
+    """
+
+    def __init__(self, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self._open = lambda: io.BytesIO(content)
+
+    @classmethod
+    def from_file(cls, path):
+        """Create a reader over the index file at path, which is read for each query.
+
+        Args:
+            path (str): Path to the index file.
+
+        Returns:
+            IndexReader: The reader.
+        """
+        reader = cls.__new__(cls)
+        reader._open = lambda: open(path, "rb")
+        return reader
+
+    def _iter_chart_versions(self, entry_name):
+        """Yield the events of each chart version of an entry, as a list per version.
+
+        Raises:
+            IndexStreamError: if the index is not valid YAML or doesn't have the
+                expected structure.
+        """
+        with self._open() as stream:
+            events = yaml.parse(stream, Loader=SafeLoader)
+            try:
+                if self._find_entry(events, entry_name):
+                    yield from self._read_versions(events)
+            except yaml.YAMLError as e:
+                raise IndexStreamError(f"Error parsing index: {e}") from e
+            finally:
+                # Stop parsing, the rest of the index is not needed
+                events.close()
+
+    def _find_entry(self, events, entry_name):
+        """Consume the events up to the value of the entry, return False if missing."""
+        _expect(events, StreamStartEvent)
+        _expect(events, DocumentStartEvent)
+        _expect(events, MappingStartEvent)
+        while True:
+            key = _next(events)
+            if isinstance(key, MappingEndEvent):
+                raise IndexStreamError("Malformed index: no entries")
+            if isinstance(key, ScalarEvent) and key.value == "entries":
+                break
+            _skip_node(events, key)
+            _skip_node(events, _next(events))
+
+        entries = _next(events)
+        if _is_null(entries):
+            return False
+        if not isinstance(entries, MappingStartEvent):
+            raise IndexStreamError(f"Malformed index: invalid entries {entries}")
+        while True:
+            key = _next(events)
+            if isinstance(key, MappingEndEvent):
+                return False
+            if isinstance(key, ScalarEvent) and key.value == entry_name:
+                return True
+            _skip_node(events, key)
+            _skip_node(events, _next(events))
+
+    def _read_versions(self, events):
+        charts = _next(events)
+        if _is_null(charts):
+            return
+        if not isinstance(charts, SequenceStartEvent):
+            raise IndexStreamError(f"Malformed index: invalid chart list {charts}")
+        while not isinstance(event := _next(events), SequenceEndEvent):
+            yield list(_read_node(events, event))
+
+    @staticmethod
+    def _get_version(chart_events):
+        """Get the version of a chart from its events, without constructing it."""
+        if not isinstance(chart_events[0], MappingStartEvent):
+            raise IndexStreamError(f"Malformed index: invalid chart {chart_events[0]}")
+        events = iter(chart_events[1:-1])
+        for key in events:
+            _skip_node(events, key)
+            value = _next(events)
+            if isinstance(key, ScalarEvent) and key.value == "version":
+                return value.value if isinstance(value, ScalarEvent) else None
+            _skip_node(events, value)
+        return None
+
+    def get_versions(self, entry_name):
+        """Get the versions of a chart entry.
+
+        Args:
+            entry_name (str): Name of the chart entry, e.g. "redhat-awesome".
+
+        Returns:
+            list[str]: The versions, in the order of the index. Empty if the entry is
+                not in the index.
+
+        Raises:
+            IndexStreamError: if the index is malformed.
+        """
+        return [
+            self._get_version(chart_events)
+            for chart_events in self._iter_chart_versions(entry_name)
+        ]
+
+    def has_version(self, entry_name, version):
+        """Check if a version of a chart entry is in the index.
+
+        Args:
+            entry_name (str): Name of the chart entry, e.g. "redhat-awesome".
+            version (str): Version of the chart.
+
+        Returns:
+            bool: True if the version is in the index.
+
+        Raises:
+            IndexStreamError: if the index is malformed.
+        """
+        return any(
+            self._get_version(chart_events) == version
+            for chart_events in self._iter_chart_versions(entry_name)
+        )
+
+    def get_entry(self, entry_name, version):
+        """Get the index entry of a chart version.
+
+        Args:
+            entry_name (str): Name of the chart entry, e.g. "redhat-awesome".
+            version (str): Version of the chart.
+
+        Returns:
+            dict: The index entry, as loaded by yaml.safe_load, or None if the version
+                is not in the index.
+
+        Raises:
+            IndexStreamError: if the index is malformed.
+        """
+        for chart_events in self._iter_chart_versions(entry_name):
+            if self._get_version(chart_events) != version:
+                continue
+            if any(isinstance(event, AliasEvent) for event in chart_events):
+                raise IndexStreamError(f"Unsupported alias in {entry_name} {version}")
+            document = [
+                StreamStartEvent(),
+                DocumentStartEvent(),
+                *chart_events,
+                DocumentEndEvent(),
+                StreamEndEvent(),
+            ]
+            return yaml.load(yaml.emit(document, Dumper=Dumper), Loader=SafeLoader)
+        return None
@@ -0,0 +1,112 @@
+"""Compare loading the whole index with streaming queries over it.
+
+The benchmark generates a synthetic index with one version per chart entry, then
+checks if a chart version exists, either by loading the index with yaml.load (as
+index_cache.get_index does) or with an IndexReader, for entries at the start, in the
+middle and at the end of the index, and for a missing entry:
+
+    python index_stream_benchmark.py --entries 100000
+
+The peak memory is measured with tracemalloc, i.e. it only accounts for Python
+objects, and is measured in a separate run from the duration.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+sys.path.append("../")
+from indexfile import index_stream
+
+ENTRY_TEMPLATE = """\
+  {name}:
+  - annotations:
+      charts.openshift.io/name: {name}
+      charts.openshift.io/provider: Provider {n}
+      charts.openshift.io/providerType: partner
+      charts.openshift.io/supportedOpenShiftVersions: '>=4.12'
+    apiVersion: v2
+    created: '2024-01-01T00:00:00.000000+00:00'
+    description: A synthetic chart used to benchmark the index readers
+    digest: {digest:064x}
+    kubeVersion: '>=1.25.0-0'
+    name: {name}
+    urls:
+    - https://example.com/{name}-1.0.{n}.tgz
+    version: 1.0.{n}
+"""
+
+
+def make_index(entries):
+    """Generate the content of an index, as yaml.dump would write it."""
+    lines = ["apiVersion: v1\nentries:\n"]
+    for n in range(entries):
+        lines.append(ENTRY_TEMPLATE.format(name=f"chart-{n:06d}", n=n, digest=n))
+    lines.append("generated: '2024-01-01T00:00:00.000000+00:00'\n")
+    return "".join(lines).encode("utf-8")
+
+
+def load_has_version(content, entry_name, version):
+    index = yaml.load(content, Loader=SafeLoader)
+    charts = index["entries"].get(entry_name, [])
+    return any(chart["version"] == version for chart in charts)
+
+
+def stream_has_version(content, entry_name, version):
+    return index_stream.IndexReader(content).has_version(entry_name, version)
+
+
+def measure(func, content, entry_name, version, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(content, entry_name, version)
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(content, entry_name, version)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(durations), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--entries", type=int, default=100000, help="number of chart entries"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=3, help="number of runs of each query"
+    )
+    args = parser.parse_args()
+
+    content = make_index(args.entries)
+    print(f"index: {args.entries} entries, {len(content) / 2**20:.1f} MiB")
+
+    last = args.entries - 1
+    queries = [
+        ("first", "chart-000000", "1.0.0"),
+        ("middle", f"chart-{last // 2:06d}", f"1.0.{last // 2}"),
+        ("last", f"chart-{last:06d}", f"1.0.{last}"),
+        ("missing", "not-in-index", "1.0.0"),
+    ]
+    print(f"{'query':<10}{'reader':<10}{'duration (s)':>14}{'peak (MiB)':>14}")
+    # Loading the index doesn't depend on the queried entry
+    runs = [("any", "load", load_has_version, *queries[0][1:])]
+    runs += [(label, "stream", stream_has_version, *q) for label, *q in queries]
+    for label, reader, func, entry_name, version in runs:
+        duration, peak = measure(func, content, entry_name, version, args.iterations)
+        print(f"{label:<10}{reader:<10}{duration:>14.3f}{peak / 2**20:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import pytest
+import yaml
+
+from indexfile import index_stream
+from updateindex.updateindex_test import index
+
+content = yaml.safe_dump(index)
+
+
+@pytest.mark.parametrize("entry_name", list(index["entries"]) + ["not-in-index"])
+def test_get_versions(entry_name):
+    reader = index_stream.IndexReader(content)
+    expected = [chart["version"] for chart in index["entries"].get(entry_name, [])]
+    assert reader.get_versions(entry_name) == expected
+    for version in expected:
+        assert reader.has_version(entry_name, version)
+    assert not reader.has_version(entry_name, "9.9.9")
+
+
+@pytest.mark.parametrize(
+    "entry_name, version",
+    [("acme-awesome", "1.0.0"), ("acme-awesome", "1.1.0"), ("other-chart", "0.1.0")],
+)
+def test_get_entry(entry_name, version):
+    reader = index_stream.IndexReader(content)
+    expected = yaml.safe_load(content)["entries"][entry_name]
+    assert reader.get_entry(entry_name, version) in expected
+    assert reader.get_entry(entry_name, version)["version"] == version
+    assert reader.get_entry(entry_name, "9.9.9") is None
+
+
+def test_from_file(tmp_path):
+    index_file = tmp_path / "index.yaml"
+    index_file.write_text(content)
+    reader = index_stream.IndexReader.from_file(str(index_file))
+    assert reader.get_versions("acme-awesome") == ["1.0.0", "1.1.0"]
+
+
+def test_stops_after_entry():
+    # The content after the queried entry is not parsed
+    reader = index_stream.IndexReader(
+        content.replace("other-chart:", "other-chart: ][")
+    )
+    assert reader.has_version("acme-awesome", "1.1.0")
+    with pytest.raises(index_stream.IndexStreamError):
+        reader.has_version("zzz-last", "3.0.0")
+
+
+@pytest.mark.parametrize(
+    "malformed",
+    [
+        "apiVersion: v1\n",
+        "- a list\n",
+        "entries: a string\n",
+        "entries:\n  acme-awesome: a string\n",
+        "entries:\n  acme-awesome: [\n",
+    ],
+)
+def test_malformed_index(malformed):
+    reader = index_stream.IndexReader(malformed)
+    with pytest.raises(index_stream.IndexStreamError):
+        reader.get_versions("acme-awesome")
+
+
+def test_empty_entries():
+    reader = index_stream.IndexReader("apiVersion: v1\nentries:\n")
+    assert reader.get_versions("acme-awesome") == []
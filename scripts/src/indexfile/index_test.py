@@ -0,0 +1,74 @@
+from indexfile import index
+
+index_dct = {
+    "apiVersion": "v1",
+    "entries": {
+        "acme-awesome": [
+            {
+                "name": "awesome",
+                "version": "1.9.0",
+                "annotations": {
+                    "charts.openshift.io/provider": "Acme",
+                    "charts.openshift.io/providerType": "partner",
+                },
+            },
+            {
+                "name": "awesome",
+                "version": "1.10.0",
+                "kubeVersion": ">=1.25.0",
+                "annotations": {
+                    "charts.openshift.io/provider": "Acme",
+                    "charts.openshift.io/providerType": "partner",
+                    "charts.openshift.io/supportedOpenShiftVersions": ">=4.12",
+                },
+            },
+        ],
+        "redhat-awesome": [
+            {
+                "name": "awesome",
+                "version": "v0.1.0",
+                "annotations": {
+                    "charts.openshift.io/provider": "Red Hat",
+                    "charts.openshift.io/providerType": "redhat",
+                },
+            },
+        ],
+    },
+}
+
+
+def test_get_chart_info():
+    view = index.IndexView(index_dct)
+
+    assert view.get_chart_info("acme-awesome-1.10.0") == (
+        "partner",
+        "Acme",
+        "awesome",
+        "1.10.0",
+    )
+    assert view.get_chart_info("acme-awesome-2.0.0") == ("", "", "", "")
+
+
+def test_get_latest_charts():
+    view = index.IndexView(index_dct)
+
+    assert view.count == 3
+    assert len(view.get_charts_info()) == 3
+    assert view.get_latest_charts() == [
+        {
+            "name": "awesome",
+            "version": "1.10.0",
+            "providerType": "partner",
+            "provider": "acme",
+            "supportedOCP": ">=4.12",
+            "kubeVersion": ">=1.25.0",
+        },
+        {
+            "name": "awesome",
+            "version": "v0.1.0",
+            "providerType": "redhat",
+            "provider": "redhat",
+            "supportedOCP": "",
+            "kubeVersion": "",
+        },
+    ]
@@ -0,0 +1,246 @@
+"""Artifacts derived from the Helm repository index, written next to the index file.
+
+Whenever the index is written, along with its JSON twins (see index_lookup.py):
+
+* <index>-latest.json: a lookup file (same format as <index>-lookup.json) holding only
+  the latest version of each chart entry.
+* <index>-ocp.json: the compatibility of the latest version of each chart entry with
+  each OpenShift minor version, precomputed from its supportedOpenShiftVersions
+  annotation:
+
+    {
+      "generated": "...",
+      "ocpVersions": ["4.1", ..., "4.18"],
+      "charts": {
+        "acme-awesome": {
+          "name": "awesome",
+          "version": "1.10.0",
+          "supportedOCP": ">=4.12",
+          "kubeVersion": ">=1.25.0-0",
+          "ocpVersions": ["4.12", ..., "4.18"]
+        }
+      }
+    }
+
+  The table covers the OpenShift minor versions from 4.1 to LOOKAHEAD_MINORS minor
+  versions past the latest testedOpenShiftVersion of the index. ocpVersions is null
+  for a chart without a valid supportedOpenShiftVersions annotation.
+
+Consumers that only need the latest charts, e.g. release gating tests, load these few
+kilobytes instead of the whole index. As with the lookup file, their generation date is
+checked against the index, so that artifacts out of sync with it are never used.
+"""
+
+import json
+import os
+
+import semantic_version
+
+from indexfile import index_cache, index_lookup
+
+SUPPORTED_VERSIONS_ANNOTATION = "charts.openshift.io/supportedOpenShiftVersions"
+TESTED_VERSION_ANNOTATION = "charts.openshift.io/testedOpenShiftVersion"
+# First OpenShift minor version of the compatibility table
+FIRST_OCP_MINOR = (4, 1)
+# Number of minor versions past the latest tested one in the compatibility table
+LOOKAHEAD_MINORS = 2
+
+# Parsed artifacts, or the error raised when getting them, by URL
+_variants = {}
+
+
+def get_variant_paths(index_path):
+    """Get the paths of the latest-only index and compatibility table of an index.
+
+    Args:
+        index_path (str): Path or URL of the index file, e.g. "gh-pages/index.yaml".
+
+    Returns:
+        (str, str): The paths of the latest-only index and of the compatibility table,
+                    e.g. "gh-pages/index-latest.json" and "gh-pages/index-ocp.json".
+    """
+    base, _ = os.path.splitext(index_path)
+    return f"{base}-latest.json", f"{base}-ocp.json"
+
+
+def _coerce_version(version):
+    return semantic_version.Version.coerce(str(version).removeprefix("v"))
+
+
+def get_latest_chart(charts):
+    """Get the latest version of a chart entry, by semantic version.
+
+    Args:
+        charts (list[dict]): The index entries of the versions of a chart.
+
+    Returns:
+        dict: The index entry of the latest version, or None if there are none.
+    """
+    if not charts:
+        return None
+    return max(charts, key=lambda chart: _coerce_version(chart["version"]))
+
+
+def build_latest_index(index_data):
+    """Build an index holding only the latest version of each chart entry.
+
+    Args:
+        index_data (dict): Content of the Helm repo index, or of its lookup file
+
+    Returns:
+        dict: The latest-only index. Chart entries without versions are left out.
+    """
+    entries = {}
+    for entry_name, charts in index_data["entries"].items():
+        latest = get_latest_chart(charts)
+        if latest is not None:
+            entries[entry_name] = [latest]
+    return {
+        "apiVersion": index_data.get("apiVersion", "v1"),
+        "entries": entries,
+        "generated": index_data.get("generated"),
+    }
+
+
+def get_ocp_minors(index_data):
+    """List the OpenShift minor versions covered by the compatibility table.
+
+    Args:
+        index_data (dict): Content of the Helm repo index, or of its lookup file
+
+    Returns:
+        list[str]: The minor versions, e.g. ["4.1", ..., "4.18"].
+    """
+    last = FIRST_OCP_MINOR
+    for charts in index_data["entries"].values():
+        for chart in charts or []:
+            tested = (chart.get("annotations") or {}).get(TESTED_VERSION_ANNOTATION)
+            try:
+                version = _coerce_version(tested)
+            except ValueError:
+                continue
+            if version.major == FIRST_OCP_MINOR[0]:
+                last = max(last, (version.major, version.minor))
+    major = FIRST_OCP_MINOR[0]
+    return [
+        f"{major}.{minor}"
+        for minor in range(FIRST_OCP_MINOR[1], last[1] + LOOKAHEAD_MINORS + 1)
+    ]
+
+
+def build_ocp_compatibility(index_data, ocp_minors=None):
+    """Build the compatibility table of the latest charts with OpenShift minor versions.
+
+    Args:
+        index_data (dict): Content of the Helm repo index, or of its lookup file
+        ocp_minors (list[str]): The OpenShift minor versions of the table. Defaults to
+                                get_ocp_minors(index_data).
+
+    Returns:
+        dict: The compatibility table, see the module documentation.
+    """
+    if ocp_minors is None:
+        ocp_minors = get_ocp_minors(index_data)
+    ocp_versions = [(minor, _coerce_version(minor)) for minor in ocp_minors]
+
+    charts = {}
+    for entry_name, entry_charts in index_data["entries"].items():
+        latest = get_latest_chart(entry_charts)
+        if latest is None:
+            continue
+        supported = (latest.get("annotations") or {}).get(SUPPORTED_VERSIONS_ANNOTATION)
+        try:
+            spec = semantic_version.NpmSpec(supported) if supported else None
+        except ValueError:
+            spec = None
+        charts[entry_name] = {
+            "name": latest["name"],
+            "version": latest["version"],
+            "supportedOCP": supported,
+            "kubeVersion": latest.get("kubeVersion", ""),
+            "ocpVersions": (
+                [minor for minor, version in ocp_versions if version in spec]
+                if spec is not None
+                else None
+            ),
+        }
+    return {
+        "generated": index_data.get("generated"),
+        "ocpVersions": list(ocp_minors),
+        "charts": charts,
+    }
+
+
+def write_variants(index_file, index_data):
+    """Write the latest-only index and compatibility table, next to the index file.
+
+    Args:
+        index_file (str): Path to the index file
+        index_data (dict): Content of the Helm repo index
+    """
+    latest_path, ocp_path = get_variant_paths(index_file)
+    latest_index = build_latest_index(index_data)
+    index_lookup._write_json(latest_path, index_lookup.build_lookup(latest_index))
+    index_lookup._write_json(
+        ocp_path, build_ocp_compatibility(latest_index, get_ocp_minors(index_data))
+    )
+    print(f"[INFO] Wrote {latest_path} and {ocp_path}")
+
+
+def _load_variant(index_url, url, timeout):
+    content = index_cache.get_index_content(url, timeout=timeout)
+    try:
+        variant = json.loads(content)
+    except ValueError as e:
+        raise index_lookup.LookupParseError(f"Error parsing {url}") from e
+    index_lookup.check_generated(index_url, url, variant, timeout=timeout)
+    return variant
+
+
+def _get_variant(index_url, url, timeout):
+    # As with the lookup file, errors are cached so that callers fall back to the index
+    # without downloading the artifact again
+    if url not in _variants:
+        try:
+            _variants[url] = _load_variant(index_url, url, timeout)
+        except (index_cache.IndexDownloadError, index_lookup.LookupParseError) as e:
+            _variants[url] = e
+    if isinstance(_variants[url], Exception):
+        raise _variants[url]
+    return _variants[url]
+
+
+def get_latest_index(index_url, timeout=index_cache.REQUEST_TIMEOUT):
+    """Get the latest-only index of the Helm repository index at index_url.
+
+    Args:
+        index_url (str): URL of the index file, e.g. ".../index.yaml".
+        timeout (int): Timeout of the HTTP requests, in seconds.
+
+    Returns:
+        dict: The latest-only index, in the format of the lookup file.
+
+    Raises:
+        IndexDownloadError: if the file or the index can't be downloaded.
+        LookupParseError: if the file is not valid JSON.
+        LookupMismatchError: if the file was not built from the current index.
+    """
+    return _get_variant(index_url, get_variant_paths(index_url)[0], timeout)
+
+
+def get_ocp_compatibility(index_url, timeout=index_cache.REQUEST_TIMEOUT):
+    """Get the OpenShift compatibility table of the Helm repository index at index_url.
+
+    Args:
+        index_url (str): URL of the index file, e.g. ".../index.yaml".
+        timeout (int): Timeout of the HTTP requests, in seconds.
+
+    Returns:
+        dict: The compatibility table, see the module documentation.
+
+    Raises:
+        IndexDownloadError: if the file or the index can't be downloaded.
+        LookupParseError: if the file is not valid JSON.
+        LookupMismatchError: if the file was not built from the current index.
+    """
+    return _get_variant(index_url, get_variant_paths(index_url)[1], timeout)
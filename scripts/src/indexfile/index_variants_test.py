@@ -0,0 +1,135 @@
+import json
+
+import pytest
+import responses
+from responses import matchers
+
+from indexfile import index_cache, index_lookup, index_variants
+from indexfile.index_test import index_dct
+
+INDEX_URL = "https://example.com/index.yaml"
+GENERATED = "2024-05-17T09:30:00+00:00"
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(monkeypatch):
+    monkeypatch.setattr(index_variants, "_variants", {})
+    monkeypatch.setattr(index_cache, "stats", index_cache.IndexStats())
+    monkeypatch.delenv(index_cache.CACHE_DIR_ENV, raising=False)
+
+
+def test_build_latest_index():
+    latest_index = index_variants.build_latest_index(
+        {**index_dct, "entries": {**index_dct["entries"], "acme-empty": []}}
+    )
+    assert latest_index["entries"] == {
+        "acme-awesome": [index_dct["entries"]["acme-awesome"][1]],
+        "redhat-awesome": index_dct["entries"]["redhat-awesome"],
+    }
+
+
+def test_get_ocp_minors(monkeypatch):
+    assert index_variants.get_ocp_minors(index_dct) == ["4.1", "4.2", "4.3"]
+
+    monkeypatch.setitem(
+        index_dct["entries"]["redhat-awesome"][0]["annotations"],
+        index_variants.TESTED_VERSION_ANNOTATION,
+        "4.14",
+    )
+    assert index_variants.get_ocp_minors(index_dct)[-1] == "4.16"
+
+
+def test_build_ocp_compatibility():
+    table = index_variants.build_ocp_compatibility(index_dct, ["4.11", "4.12", "4.13"])
+    assert table["ocpVersions"] == ["4.11", "4.12", "4.13"]
+    assert table["charts"] == {
+        "acme-awesome": {
+            "name": "awesome",
+            "version": "1.10.0",
+            "supportedOCP": ">=4.12",
+            "kubeVersion": ">=1.25.0",
+            "ocpVersions": ["4.12", "4.13"],
+        },
+        "redhat-awesome": {
+            "name": "awesome",
+            "version": "v0.1.0",
+            "supportedOCP": None,
+            "kubeVersion": "",
+            "ocpVersions": None,
+        },
+    }
+
+
+def write_variants(tmp_path):
+    """Write the variants of the index and serve them next to INDEX_URL."""
+    index_file = tmp_path / "index.yaml"
+    index_variants.write_variants(
+        str(index_file), {**index_dct, "generated": GENERATED}
+    )
+    latest_path, ocp_path = index_variants.get_variant_paths(str(index_file))
+    for path in (latest_path, ocp_path):
+        responses.get(
+            f"https://example.com/{path.rsplit('/', 1)[1]}",
+            body=open(path, "rb").read(),
+        )
+
+
+def mock_index_tail(generated):
+    """Mock the range requests of the end of the index."""
+    responses.get(
+        INDEX_URL,
+        status=206,
+        body=f'    version: 1.0.0\ngenerated: "{generated}"\n',
+        match=[
+            matchers.header_matcher({"Range": f"bytes=-{index_lookup.INDEX_TAIL_SIZE}"})
+        ],
+    )
+
+
+@responses.activate
+def test_write_and_get_variants(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        index_dct["entries"]["acme-awesome"][1]["annotations"],
+        index_variants.TESTED_VERSION_ANNOTATION,
+        "4.12",
+    )
+    write_variants(tmp_path)
+    mock_index_tail(GENERATED)
+
+    latest_index = index_variants.get_latest_index(INDEX_URL)
+    assert latest_index == json.loads(
+        json.dumps(
+            index_lookup.build_lookup(
+                index_variants.build_latest_index({**index_dct, "generated": GENERATED})
+            )
+        )
+    )
+    table = index_variants.get_ocp_compatibility(INDEX_URL)
+    assert table["charts"]["acme-awesome"]["ocpVersions"] == ["4.12", "4.13", "4.14"]
+    assert index_variants.get_ocp_compatibility(INDEX_URL) is table
+    # Each variant and the end of the index, once
+    assert len(responses.calls) == 4
+
+
+@responses.activate
+def test_variants_out_of_date(tmp_path):
+    write_variants(tmp_path)
+    mock_index_tail("2024-05-18T10:00:00+00:00")
+
+    for _ in range(2):
+        with pytest.raises(index_lookup.LookupMismatchError):
+            index_variants.get_latest_index(INDEX_URL)
+        with pytest.raises(index_lookup.LookupMismatchError):
+            index_variants.get_ocp_compatibility(INDEX_URL)
+    # The variants are not downloaded again
+    assert len(responses.calls) == 4
+
+
+@responses.activate
+def test_missing_variants_are_downloaded_once_per_process():
+    responses.get("https://example.com/index-latest.json", status=404)
+
+    for _ in range(2):
+        with pytest.raises(index_cache.IndexDownloadError):
+            index_variants.get_latest_index(INDEX_URL)
+    assert len(responses.calls) == 1
@@ -1,19 +1,19 @@
 import argparse
-import itertools
 import os
 import re
 import sys
 
 import analytics
-import requests
 from github import Github
 
 sys.path.append("../")
 from collections import OrderedDict
 
 from indexfile import index
+from metrics import pr_collector
 from pullrequest import prepare_pr_comment as pr_comment
 from reporegex import matchers
+from tools import github_async
 
 file_pattern = re.compile(
     matchers.submission_path_matcher(strict_categories=False) + r"/.*"
@@ -33,8 +33,6 @@ pr_submission = "PR Submission v1.0"
 pr_merged = "PR Merged v1.0"
 pr_outcome = "PR Outcome v1.0"
 charts = "charts"
-xRateLimit = "X-RateLimit-Limit"
-xRateRemain = "X-RateLimit-Remaining"
 
 
 def parse_response(response):
@@ -52,37 +50,12 @@ def parse_response(response):
 
 
 def get_release_metrics():
-    result = []
-    for i in itertools.count(start=1):
-        request_headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f'Bearer {os.environ.get("BOT_TOKEN")}',
-        }
-        response = requests.get(
-            f"https://api.github.com/repos/openshift-helm-charts/charts/releases?per_page=100&page={i}",
-            headers=request_headers,
-        )
-
-        if not 200 <= response.status_code < 300:
-            print(
-                f"[ERROR] unexpected response getting release data : {response.status_code} : {response.reason}"
-            )
-            sys.exit(1)
-
-        response_json = response.json()
-        if xRateLimit in response.headers:
-            print(f"[DEBUG] {xRateLimit} : {response.headers[xRateLimit]}")
-        if xRateRemain in response.headers:
-            print(f"[DEBUG] {xRateRemain}  : {response.headers[xRateRemain]}")
-
-        if "message" in response_json:
-            print(f'[ERROR] getting pr files: {response_json["message"]}')
-            sys.exit(1)
-
-        if len(response_json) == 0:
-            break
-        result.extend(response_json)
-    return parse_response(result)
+    try:
+        releases = github_async.get_pages("repos/openshift-helm-charts/charts/releases")
+    except github_async.GitHubAPIError as e:
+        print(f"[ERROR] unexpected response getting release data : {e}")
+        sys.exit(1)
+    return parse_response(releases)
 
 
 def send_release_metrics(write_key, downloads, prefix):
@@ -163,9 +136,15 @@ def send_pull_request_metrics(write_key, g):
     charts_in_progress = 0
     abandoned = []
     repo = g.get_repo("openshift-helm-charts/charts")
-    pull_requests = repo.get_pulls(state="all")
+    try:
+        pull_requests = pr_collector.get_pull_requests(repo.full_name)
+    except pr_collector.PRCollectorError as e:
+        print(f"[ERROR] getting pull requests: {e}")
+        sys.exit(1)
     for pr in pull_requests:
-        pr_content, type, provider, chart, version = check_and_get_pr_content(pr, repo)
+        pr_content, type, provider, chart, version = check_and_get_pr_content(
+            pr, repo, pr.files
+        )
         if pr_content != "not-chart":
             chart_submissions += 1
             if pr.closed_at and not pr.merged_at:
@@ -182,8 +161,6 @@ def send_pull_request_metrics(write_key, g):
             else:
                 charts_in_progress += 1
 
-        check_rate_limit(g, False)
-
     print(f"[INFO] abandoned PRS: {abandoned}")
     send_summary_metric(
         write_key,
@@ -286,11 +263,16 @@ def process_report_fails(message_file):
 
 
 def process_comments(repo, pr):
-    issue = repo.get_issue(number=pr.number)
-    comments = issue.get_comments()
+    try:
+        comments = github_async.get_pages(
+            f"repos/{repo.full_name}/issues/{pr.number}/comments"
+        )
+    except github_async.GitHubAPIError as e:
+        print(f"[ERROR] getting pr comments: {e}")
+        sys.exit(1)
     num_builds = 0
     for comment in comments:
-        report_result = parse_message(comment.body, pr.number)
+        report_result = parse_message(comment["body"] or "", pr.number)
         if report_result != "not-found":
             num_builds += 1
 
@@ -320,9 +302,10 @@ def parse_message(message, pr_number):
     return report_result
 
 
-def get_pr_content(pr):
+def get_pr_content(pr, pr_chart_submission_files=None):
     pr_content = "not-chart"
-    pr_chart_submission_files = get_pr_files(pr)
+    if pr_chart_submission_files is None:
+        pr_chart_submission_files = get_pr_files(pr)
     if len(pr_chart_submission_files) > 0:
         match = file_pattern.match(pr_chart_submission_files[0])
         if match:
@@ -361,7 +344,7 @@ def get_pr_content(pr):
     return pr_content, "", "", "", ""
 
 
-def check_and_get_pr_content(pr, repo):
+def is_ignored_pr(pr, repo):
     repo_name = repo.full_name
     if (
         (pr.user.login in ignore_users and pr.user.login not in repo_name)
@@ -371,9 +354,15 @@ def check_and_get_pr_content(pr, repo):
         print(
             f"[INFO] Ignore pr, user: {pr.user.login}, draft: {pr.draft}, target_branch: {pr.base.ref}"
         )
+        return True
+    return False
+
+
+def check_and_get_pr_content(pr, repo, pr_chart_submission_files=None):
+    if is_ignored_pr(pr, repo):
         return "not-chart", "", "", "", ""
 
-    return get_pr_content(pr)
+    return get_pr_content(pr, pr_chart_submission_files)
 
 
 def process_pr(write_key, repo, message_file, pr_number, action, prefix, pr_directory):
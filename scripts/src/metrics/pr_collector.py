@@ -0,0 +1,199 @@
+"""Collect the pull requests of a repository with the GitHub GraphQL API.
+
+A GraphQL query returns PAGE_SIZE pull requests, with the fields used to classify
+them for the metrics (see metrics.check_and_get_pr_content) and their first
+FILES_PER_PR file paths. Listing the whole history of the charts repository takes a
+few dozen queries, instead of a REST request per pull request and per page of files.
+
+The files of the few pull requests that modify more than FILES_PER_PR files are
+completed with the REST API, concurrently (see tools/github_async.py).
+
+The collected pull requests mirror the attributes of the PyGithub PullRequest objects
+used by the metrics, e.g. pr.user.login and pr.base.ref.
+"""
+
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import requests
+
+sys.path.append("../")
+from tools import github_async, github_client
+
+GRAPHQL_ENDPOINT = "graphql"
+# Maximum number of pull requests, and of files of a pull request, in a query
+PAGE_SIZE = 100
+FILES_PER_PR = 100
+# Login of the author of the pull requests of deleted accounts, as in the REST API
+GHOST_LOGIN = "ghost"
+
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $pageSize: Int!, $filesPerPR: Int!,
+      $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $pageSize, after: $cursor,
+                 orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        number
+        state
+        isDraft
+        baseRefName
+        author {
+          login
+        }
+        createdAt
+        mergedAt
+        closedAt
+        files(first: $filesPerPR) {
+          totalCount
+          nodes {
+            path
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class PRCollectorError(Exception):
+    """This exception is raised when the pull requests can't be collected"""
+
+
+@dataclass
+class User:
+    login: str
+
+
+@dataclass
+class Ref:
+    ref: str
+
+
+@dataclass
+class PullRequest:
+    """A pull request, with the attributes of a PyGithub PullRequest used by metrics."""
+
+    number: int
+    # "open" or "closed", as in the REST API
+    state: str
+    draft: bool
+    user: User
+    base: Ref
+    created_at: datetime = None
+    merged_at: datetime = None
+    closed_at: datetime = None
+    # Paths of the files modified by the pull request
+    files: list[str] = field(default_factory=list)
+    # Number of files modified by the pull request
+    changed_files: int = 0
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    # datetime.fromisoformat only supports the "Z" suffix from Python 3.11
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _parse_pull_request(node):
+    return PullRequest(
+        number=node["number"],
+        state="open" if node["state"] == "OPEN" else "closed",
+        draft=node["isDraft"],
+        user=User((node.get("author") or {}).get("login", GHOST_LOGIN)),
+        base=Ref(node["baseRefName"]),
+        created_at=_parse_datetime(node.get("createdAt")),
+        merged_at=_parse_datetime(node.get("mergedAt")),
+        closed_at=_parse_datetime(node.get("closedAt")),
+        files=[file["path"] for file in node["files"]["nodes"]],
+        changed_files=node["files"]["totalCount"],
+    )
+
+
+def _query(variables):
+    try:
+        # The query is read-only: it can be retried like a GET
+        r = github_client.get_client().post(
+            GRAPHQL_ENDPOINT,
+            json={"query": PULL_REQUESTS_QUERY, "variables": variables},
+            retry=True,
+        )
+        response_json = r.json()
+    except (requests.RequestException, ValueError) as e:
+        raise PRCollectorError(f"Error querying the pull requests: {e}") from e
+
+    if "message" in response_json:
+        raise PRCollectorError(
+            f'Error querying the pull requests: {response_json["message"]}'
+        )
+    if response_json.get("errors"):
+        messages = "; ".join(error["message"] for error in response_json["errors"])
+        raise PRCollectorError(f"Error querying the pull requests: {messages}")
+    repository = (response_json.get("data") or {}).get("repository")
+    if repository is None:
+        raise PRCollectorError(
+            f"Repository {variables['owner']}/{variables['name']} not found"
+        )
+    return repository["pullRequests"]
+
+
+def _complete_files(repository, pull_requests):
+    """Fetch, with the REST API, all the files of the PRs with truncated file lists."""
+    truncated = [pr for pr in pull_requests if pr.changed_files > len(pr.files)]
+    if not truncated:
+        return
+    print(f"[INFO] Get the files of {len(truncated)} PRs with the REST API")
+    try:
+        pages = github_async.get_pages_all(
+            [f"repos/{repository}/pulls/{pr.number}/files" for pr in truncated]
+        )
+    except github_async.GitHubAPIError as e:
+        raise PRCollectorError(f"Error getting the files of the PRs: {e}") from e
+    for pr, files in zip(truncated, pages):
+        pr.files = [file["filename"] for file in files]
+
+
+def get_pull_requests(repository, page_size=PAGE_SIZE, files_per_pr=FILES_PER_PR):
+    """Get all the pull requests of a repository, the most recent first.
+
+    Args:
+        repository (str): The repository, e.g. "openshift-helm-charts/charts".
+        page_size (int): Number of pull requests per query, at most 100.
+        files_per_pr (int): Number of files of each pull request fetched by the
+                            query, at most 100. The files of the pull requests
+                            modifying more files are fetched with the REST API.
+
+    Returns:
+        list[PullRequest]: The pull requests.
+
+    Raises:
+        PRCollectorError: if a query fails.
+    """
+    owner, name = repository.split("/")
+    variables = {
+        "owner": owner,
+        "name": name,
+        "pageSize": page_size,
+        "filesPerPR": files_per_pr,
+        "cursor": None,
+    }
+    pull_requests = []
+    queries = 0
+    while True:
+        result = _query(variables)
+        queries += 1
+        pull_requests.extend(_parse_pull_request(node) for node in result["nodes"])
+        if not result["pageInfo"]["hasNextPage"]:
+            break
+        variables["cursor"] = result["pageInfo"]["endCursor"]
+    print(f"[INFO] Got {len(pull_requests)} PRs of {repository} in {queries} queries")
+
+    _complete_files(repository, pull_requests)
+    return pull_requests
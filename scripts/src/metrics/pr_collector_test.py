@@ -0,0 +1,156 @@
+import datetime
+
+import pytest
+import responses
+from responses import matchers
+
+from metrics import pr_collector
+from tools import github_client
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+REPOSITORY = "openshift-helm-charts/charts"
+
+
+@pytest.fixture(autouse=True)
+def client(monkeypatch):
+    client = github_client.GitHubClient(token="secret", sleep=lambda seconds: None)
+    monkeypatch.setattr(github_client, "_clients", {None: client})
+    return client
+
+
+def make_node(number, files, total_count=None, **kwargs):
+    node = {
+        "number": number,
+        "state": "MERGED",
+        "isDraft": False,
+        "baseRefName": "main",
+        "author": {"login": "acme-bot"},
+        "createdAt": "2024-01-02T03:04:05Z",
+        "mergedAt": "2024-01-03T03:04:05Z",
+        "closedAt": "2024-01-03T03:04:05Z",
+        "files": {
+            "totalCount": len(files) if total_count is None else total_count,
+            "nodes": [{"path": path} for path in files],
+        },
+    }
+    node.update(kwargs)
+    return node
+
+
+def mock_query(nodes, cursor, end_cursor=None):
+    responses.post(
+        GRAPHQL_URL,
+        json={
+            "data": {
+                "repository": {
+                    "pullRequests": {
+                        "pageInfo": {
+                            "hasNextPage": end_cursor is not None,
+                            "endCursor": end_cursor,
+                        },
+                        "nodes": nodes,
+                    }
+                }
+            }
+        },
+        match=[
+            matchers.json_params_matcher(
+                {"variables": {"cursor": cursor}}, strict_match=False
+            )
+        ],
+    )
+
+
+@responses.activate
+def test_get_pull_requests():
+    mock_query(
+        [make_node(3, ["charts/partners/acme/awesome/1.0.0/report.yaml"])],
+        None,
+        "cursor-1",
+    )
+    mock_query(
+        [
+            make_node(
+                2,
+                [],
+                state="CLOSED",
+                isDraft=True,
+                author=None,
+                mergedAt=None,
+                baseRefName="dev",
+            ),
+            make_node(1, [], state="OPEN", mergedAt=None, closedAt=None),
+        ],
+        "cursor-1",
+    )
+
+    pull_requests = pr_collector.get_pull_requests(REPOSITORY)
+
+    assert len(responses.calls) == 2
+    assert [pr.number for pr in pull_requests] == [3, 2, 1]
+    merged, closed, opened = pull_requests
+    assert merged.files == ["charts/partners/acme/awesome/1.0.0/report.yaml"]
+    assert merged.user.login == "acme-bot"
+    assert merged.base.ref == "main"
+    assert merged.merged_at == datetime.datetime(
+        2024, 1, 3, 3, 4, 5, tzinfo=datetime.timezone.utc
+    )
+    assert closed.state == "closed"
+    assert closed.draft
+    assert closed.user.login == pr_collector.GHOST_LOGIN
+    assert closed.base.ref == "dev"
+    assert closed.closed_at and not closed.merged_at
+    assert opened.state == "open"
+    assert opened.closed_at is None
+
+
+@responses.activate
+def test_get_pull_requests_truncated_files():
+    files = [f"charts/partners/acme/awesome/1.0.0/src/file-{i}" for i in range(3)]
+    mock_query(
+        [make_node(2, files[:2], total_count=3), make_node(1, ["README.md"])],
+        None,
+    )
+    responses.get(
+        f"https://api.github.com/repos/{REPOSITORY}/pulls/2/files",
+        json=[{"filename": file} for file in files],
+    )
+
+    pull_requests = pr_collector.get_pull_requests(REPOSITORY, files_per_pr=2)
+
+    assert pull_requests[0].files == files
+    assert pull_requests[1].files == ["README.md"]
+
+
+@responses.activate
+def test_get_pull_requests_retry():
+    responses.post(GRAPHQL_URL, status=502)
+    mock_query([make_node(1, ["README.md"])], None)
+
+    pull_requests = pr_collector.get_pull_requests(REPOSITORY)
+
+    assert len(responses.calls) == 2
+    assert [pr.number for pr in pull_requests] == [1]
+
+
+@responses.activate
+def test_get_pull_requests_errors():
+    responses.post(
+        GRAPHQL_URL,
+        json={"errors": [{"message": "Something went wrong"}]},
+    )
+    with pytest.raises(pr_collector.PRCollectorError, match="Something went wrong"):
+        pr_collector.get_pull_requests(REPOSITORY)
+
+    responses.replace(
+        responses.POST,
+        GRAPHQL_URL,
+        status=401,
+        json={"message": "Bad credentials"},
+    )
+    with pytest.raises(pr_collector.PRCollectorError, match="Bad credentials"):
+        pr_collector.get_pull_requests(REPOSITORY)
+
+    responses.replace(responses.POST, GRAPHQL_URL, json={"data": {"repository": None}})
+    with pytest.raises(pr_collector.PRCollectorError, match="not found"):
+        pr_collector.get_pull_requests(REPOSITORY)
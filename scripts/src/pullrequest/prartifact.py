@@ -1,13 +1,99 @@
-import os
+import concurrent.futures
 import sys
+import urllib.parse
 
 import requests
 
-pr_files = []
-pr_labels = []
+sys.path.append("../")
+from pullrequest import prcontext
+from tools import github_client
+
+# Files and labels of the PRs, by API URL
+pr_files = {}
+pr_labels = {}
 xRateLimit = "X-RateLimit-Limit"
 xRateRemain = "X-RateLimit-Remaining"
 
+# The GitHub API lists at most 3000 files of a PR, 100 per page
+MAX_PR_FILES = 3000
+FILES_PAGE_SIZE = 100
+# Maximum number of pages of files fetched in parallel
+FILES_JOBS = 8
+REQUEST_TIMEOUT = 30
+
+
+class PRFilesError(Exception):
+    """This exception is raised when the files of a PR can't be listed"""
+
+
+def _get_json(url):
+    try:
+        r = github_client.get_client().get(url, timeout=REQUEST_TIMEOUT)
+        data = r.json()
+    except (requests.RequestException, ValueError) as e:
+        raise PRFilesError(f"Error querying {url}: {e}") from e
+
+    if xRateLimit in r.headers:
+        print(f"[DEBUG] {xRateLimit} : {r.headers[xRateLimit]}")
+    if xRateRemain in r.headers:
+        print(f"[DEBUG] {xRateRemain}  : {r.headers[xRateRemain]}")
+
+    if isinstance(data, dict) and "message" in data:
+        raise PRFilesError(f'Error querying {url}: {data["message"]}')
+    return r, data
+
+
+def _get_files_page(api_url, page_number):
+    """Get a page of the files of a PR, and the number of the last page."""
+    files_api_query = f"{api_url}/files?per_page={FILES_PAGE_SIZE}&page={page_number}"
+    print(f"[INFO] Query files : {files_api_query}")
+    r, files = _get_json(files_api_query)
+
+    last_page = page_number
+    if "last" in r.links:
+        query = urllib.parse.urlparse(r.links["last"]["url"]).query
+        last_page = int(urllib.parse.parse_qs(query).get("page", [page_number])[0])
+    return [file["filename"] for file in files if "filename" in file], last_page
+
+
+def list_pr_files(api_url, jobs=FILES_JOBS):
+    """Query the GitHub API for the files modified by a PR.
+
+    The first page of files gives the number of the last page, in its Link header. The
+    other pages are then fetched in parallel.
+
+    Args:
+        api_url (str): URL of the GitHub PR
+        jobs (int): Maximum number of pages fetched in parallel
+
+    Returns:
+        list[str]: The modified files, in the order of the API.
+
+    Raises:
+        PRFilesError: if a page can't be fetched, or if the PR modifies more files than
+                      the API can list.
+    """
+    files, last_page = _get_files_page(api_url, 1)
+    if last_page > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            pages = executor.map(
+                lambda page_number: _get_files_page(api_url, page_number)[0],
+                range(2, last_page + 1),
+            )
+            for page in pages:
+                files.extend(page)
+
+    if len(files) >= MAX_PR_FILES:
+        # The list is truncated, unless the PR modifies exactly MAX_PR_FILES files
+        _, pr_data = _get_json(api_url)
+        changed_files = pr_data.get("changed_files")
+        if changed_files is None or changed_files > len(files):
+            raise PRFilesError(
+                f"PR {api_url} modifies {changed_files or 'more'} files, but the GitHub "
+                f"API only lists the first {MAX_PR_FILES}: split the PR"
+            )
+    return files
+
 
 def get_modified_files(api_url):
     """Populates and returns the list of files modified by this the PR
@@ -18,46 +104,34 @@ def get_modified_files(api_url):
     Returns:
         list[str]: List of modified files
     """
-    if not pr_files:
-        page_number = 1
-        max_page_size, page_size = 100, 100
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f'Bearer {os.environ.get("BOT_TOKEN")}',
-        }
-        files_api_url = f"{api_url}/files"
-
-        while page_size == max_page_size:
-            files_api_query = f"{files_api_url}?per_page={page_size}&page={page_number}"
-            print(f"[INFO] Query files : {files_api_query}")
-            r = requests.get(files_api_query, headers=headers)
-            files = r.json()
-            page_size = len(files)
-            page_number += 1
-
-            if xRateLimit in r.headers:
-                print(f"[DEBUG] {xRateLimit} : {r.headers[xRateLimit]}")
-            if xRateRemain in r.headers:
-                print(f"[DEBUG] {xRateRemain}  : {r.headers[xRateRemain]}")
-
-            if "message" in files:
-                print(f'[ERROR] getting pr files: {files["message"]}')
-                sys.exit(1)
-            else:
-                for file in files:
-                    if "filename" in file:
-                        pr_files.append(file["filename"])
-
-    return pr_files
+    if api_url not in pr_files and (context := prcontext.load_pr_context(api_url)):
+        print(f"[INFO] Files of {api_url} read from the PR context")
+        pr_files[api_url] = context.files
+    if api_url not in pr_files:
+        try:
+            pr_files[api_url] = list_pr_files(api_url)
+        except PRFilesError as e:
+            print(f"[ERROR] getting pr files: {e}")
+            sys.exit(1)
+
+    return pr_files[api_url]
 
 
 def get_labels(api_url):
-    if not pr_labels:
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f'Bearer {os.environ.get("BOT_TOKEN")}',
-        }
-        r = requests.get(api_url, headers=headers)
+    """Populates and returns the names of the labels of the PR
+
+    The labels are always queried, rather than read from the PR context, as they can
+    be changed before a job is re-run.
+
+    Args:
+        api_url (str): URL of the GitHub PR
+
+    Returns:
+        list[str]: Names of the labels
+    """
+    if api_url not in pr_labels:
+        labels = []
+        r = github_client.get_client().get(api_url, timeout=REQUEST_TIMEOUT)
         pr_data = r.json()
 
         if xRateLimit in r.headers:
@@ -70,6 +144,7 @@ def get_labels(api_url):
             sys.exit(1)
         if "labels" in pr_data:
             for label in pr_data["labels"]:
-                pr_labels.append(label["name"])
+                labels.append(label["name"])
+        pr_labels[api_url] = labels
 
-    return pr_labels
+    return pr_labels[api_url]
@@ -0,0 +1,68 @@
+import pytest
+import responses
+from responses import matchers
+
+from pullrequest import prartifact
+
+API_URL = "https://api.github.com/repos/openshift-helm-charts/charts/pulls/42"
+
+
+def mock_files_pages(files, page_size=prartifact.FILES_PAGE_SIZE):
+    """Mock the pages of files of the PR, with their Link header."""
+    pages = [files[i : i + page_size] for i in range(0, len(files), page_size)]
+    for number, page in enumerate(pages or [[]], 1):
+        headers = {}
+        if len(pages) > 1:
+            headers["Link"] = (
+                f'<{API_URL}/files?per_page={page_size}&page={len(pages)}>; rel="last"'
+            )
+        responses.get(
+            f"{API_URL}/files",
+            json=[{"filename": file} for file in page],
+            headers=headers,
+            match=[
+                matchers.query_param_matcher(
+                    {"per_page": str(page_size), "page": str(number)}
+                )
+            ],
+        )
+
+
+@responses.activate
+def test_list_pr_files_single_page():
+    files = [f"charts/file-{i}" for i in range(42)]
+    mock_files_pages(files)
+
+    assert prartifact.list_pr_files(API_URL) == files
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_list_pr_files_keeps_order():
+    files = [f"charts/file-{i:04d}" for i in range(1234)]
+    mock_files_pages(files)
+
+    assert prartifact.list_pr_files(API_URL, jobs=4) == files
+    assert len(responses.calls) == 13
+
+
+@pytest.mark.parametrize("changed_files, error", [(3000, False), (3001, True)])
+@responses.activate
+def test_list_pr_files_cap(changed_files, error):
+    files = [f"charts/file-{i:04d}" for i in range(prartifact.MAX_PR_FILES)]
+    mock_files_pages(files)
+    responses.get(API_URL, json={"changed_files": changed_files})
+
+    if error:
+        with pytest.raises(prartifact.PRFilesError, match="only lists the first 3000"):
+            prartifact.list_pr_files(API_URL)
+    else:
+        assert prartifact.list_pr_files(API_URL) == files
+
+
+@responses.activate
+def test_list_pr_files_error():
+    responses.get(f"{API_URL}/files", json={"message": "Not Found"}, status=404)
+
+    with pytest.raises(prartifact.PRFilesError, match="Not Found"):
+        prartifact.list_pr_files(API_URL)
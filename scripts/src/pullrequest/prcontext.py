@@ -0,0 +1,140 @@
+"""Share the information about a PR between the jobs of a workflow run.
+
+The validate-submission job fetches the files, head SHA, author and base ref of the
+PR once and writes them to a JSON file, the PR context. Later jobs download this file
+and point the PR_CONTEXT_FILE environment variable to it, so that
+prartifact.get_modified_files reads it instead of querying the GitHub API again. The
+API is only queried if the PR context is missing, or is about another PR.
+
+The PR context is a snapshot of information that doesn't change during a workflow
+run. The labels of the PR are not part of it: they gate the release (e.g.
+force-publish) and can be added before a job is re-run, so they are always queried.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from dataclasses import asdict, dataclass, field
+
+import requests
+
+sys.path.append("../")
+from tools import github_client
+
+CONTEXT_FILE_ENV = "PR_CONTEXT_FILE"
+REQUEST_TIMEOUT = 30
+
+# Loaded PR contexts, by path
+_contexts = {}
+
+
+class PRContextError(Exception):
+    """This exception is raised when the PR information can't be retrieved"""
+
+
+@dataclass
+class PRContext:
+    """Information about a PR, shared between the jobs of a workflow run."""
+
+    # URL of the PR on the GitHub API
+    api_url: str
+    # Files added, modified or deleted by the PR
+    files: list[str] = field(default_factory=list)
+    # SHA of the head commit of the PR
+    head_sha: str = None
+    # Login of the author of the PR
+    author: str = None
+    # Branch the PR is opened against, e.g. "main"
+    base_ref: str = None
+
+
+def fetch_pr_context(api_url, files):
+    """Query the GitHub API for the information about a PR.
+
+    Args:
+        api_url (str): URL of the GitHub PR
+        files (list[str]): Files modified by the PR, as they are usually already
+                           known by the caller (see prartifact.get_modified_files).
+
+    Returns:
+        PRContext: The information about the PR.
+
+    Raises:
+        PRContextError: if the PR can't be retrieved.
+    """
+    try:
+        r = github_client.get_client().get(api_url, timeout=REQUEST_TIMEOUT)
+        pr_data = r.json()
+    except (requests.RequestException, ValueError) as e:
+        raise PRContextError(f"Error getting PR {api_url}: {e}") from e
+    if "message" in pr_data:
+        raise PRContextError(f'Error getting PR {api_url}: {pr_data["message"]}')
+
+    return PRContext(
+        api_url=api_url,
+        files=list(files),
+        head_sha=pr_data.get("head", {}).get("sha"),
+        author=(pr_data.get("user") or {}).get("login"),
+        base_ref=pr_data.get("base", {}).get("ref"),
+    )
+
+
+def write_pr_context(context, path):
+    """Write the PR context to a JSON file.
+
+    Args:
+        context (PRContext): The PR context
+        path (str): Path to the file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(asdict(context), f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"[INFO] PR context written to {path}")
+
+
+def read_pr_context(path):
+    """Read a PR context from a JSON file.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        PRContext: The PR context.
+
+    Raises:
+        PRContextError: if the file can't be read or is not a valid PR context.
+    """
+    try:
+        with open(path) as f:
+            return PRContext(**json.load(f))
+    except (OSError, ValueError, TypeError) as e:
+        raise PRContextError(f"Error reading PR context {path}: {e}") from e
+
+
+def load_pr_context(api_url):
+    """Load the PR context of the workflow run, pointed to by PR_CONTEXT_FILE.
+
+    Args:
+        api_url (str): URL of the GitHub PR
+
+    Returns:
+        PRContext: The PR context, or None if it is not available or is about
+                   another PR.
+    """
+    path = os.environ.get(CONTEXT_FILE_ENV)
+    if not path or not os.path.exists(path):
+        return None
+    if path not in _contexts:
+        try:
+            _contexts[path] = read_pr_context(path)
+        except PRContextError as e:
+            print(f"[WARNING] Ignoring PR context: {e}")
+            _contexts[path] = None
+
+    context = _contexts[path]
+    if context is None or context.api_url != api_url:
+        return None
+    return context
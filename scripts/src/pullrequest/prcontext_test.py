@@ -0,0 +1,83 @@
+import pytest
+import responses
+
+from pullrequest import prartifact, prcontext
+
+API_URL = "https://api.github.com/repos/openshift-helm-charts/charts/pulls/42"
+
+pr_data = {
+    "labels": [{"name": "content-ok"}, {"name": "authorized-request"}],
+    "head": {"sha": "0123456789abcdef"},
+    "user": {"login": "octocat"},
+    "base": {"ref": "main"},
+}
+files = ["charts/partners/acme/awesome/1.42.0/report.yaml"]
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(monkeypatch):
+    monkeypatch.setattr(prcontext, "_contexts", {})
+    monkeypatch.setattr(prartifact, "pr_files", {})
+    monkeypatch.setattr(prartifact, "pr_labels", {})
+    monkeypatch.delenv(prcontext.CONTEXT_FILE_ENV, raising=False)
+
+
+@responses.activate
+def test_fetch_pr_context():
+    responses.get(API_URL, json=pr_data)
+
+    context = prcontext.fetch_pr_context(API_URL, files)
+    assert context == prcontext.PRContext(
+        api_url=API_URL,
+        files=files,
+        head_sha="0123456789abcdef",
+        author="octocat",
+        base_ref="main",
+    )
+
+
+@responses.activate
+def test_fetch_pr_context_error():
+    responses.get(API_URL, json={"message": "Not Found"}, status=404)
+
+    with pytest.raises(prcontext.PRContextError, match="Not Found"):
+        prcontext.fetch_pr_context(API_URL, files)
+
+
+def test_write_and_read_pr_context(tmp_path):
+    path = tmp_path / "pr-context.json"
+    context = prcontext.PRContext(api_url=API_URL, files=files)
+    prcontext.write_pr_context(context, str(path))
+    assert prcontext.read_pr_context(str(path)) == context
+
+    path.write_text('{"unknown": "key"}')
+    with pytest.raises(prcontext.PRContextError):
+        prcontext.read_pr_context(str(path))
+
+
+def test_load_pr_context(tmp_path, monkeypatch):
+    path = tmp_path / "pr-context.json"
+    context = prcontext.PRContext(api_url=API_URL, files=files)
+    prcontext.write_pr_context(context, str(path))
+
+    assert prcontext.load_pr_context(API_URL) is None
+    monkeypatch.setenv(prcontext.CONTEXT_FILE_ENV, str(path))
+    assert prcontext.load_pr_context(API_URL) == context
+    # The PR context is about another PR
+    assert prcontext.load_pr_context(f"{API_URL}0") is None
+
+
+@responses.activate
+def test_prartifact_reads_pr_context(tmp_path, monkeypatch):
+    path = tmp_path / "pr-context.json"
+    context = prcontext.PRContext(api_url=API_URL, files=files)
+    prcontext.write_pr_context(context, str(path))
+    monkeypatch.setenv(prcontext.CONTEXT_FILE_ENV, str(path))
+
+    assert prartifact.get_modified_files(API_URL) == files
+    assert len(responses.calls) == 0
+
+    # The labels, e.g. force-publish, can be added before a job is re-run
+    responses.get(API_URL, json=pr_data | {"labels": [{"name": "force-publish"}]})
+    assert prartifact.get_labels(API_URL) == ["force-publish"]
+    assert len(responses.calls) == 1
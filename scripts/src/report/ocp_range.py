@@ -0,0 +1,97 @@
+"""Convert the kubeVersion range of a chart to the range of supported OCP versions.
+
+This mirrors get-ocp-range (github.com/opdev/getocprange), which the CI runs through
+the .github/actions/get-ocp-range action to compute the OCP_VERSION_RANGE a report is
+checked against. Each Kubernetes minor version in KUBE_OPENSHIFT_VERSIONS that is
+within the kubeVersion range maps to an OCP version, and the range is written as:
+
+* ">=<min>" if the most recent Kubernetes version is within the range,
+* "<min>" if a single OCP version is within the range,
+* "<min> - <max>" otherwise.
+
+KUBE_OPENSHIFT_VERSIONS must be kept in sync with get-ocp-range when a new OCP
+version is released.
+"""
+
+import re
+
+import semantic_version
+
+# Kubernetes minor version of each OCP release, oldest first
+KUBE_OPENSHIFT_VERSIONS = {
+    "1.13": "4.1",
+    "1.14": "4.2",
+    "1.16": "4.3",
+    "1.17": "4.4",
+    "1.18": "4.5",
+    "1.19": "4.6",
+    "1.20": "4.7",
+    "1.21": "4.8",
+    "1.22": "4.9",
+    "1.23": "4.10",
+    "1.24": "4.11",
+    "1.25": "4.12",
+    "1.26": "4.13",
+    "1.27": "4.14",
+    "1.28": "4.15",
+    "1.29": "4.16",
+    "1.30": "4.17",
+    "1.31": "4.18",
+    "1.32": "4.19",
+    "1.33": "4.20",
+    "1.34": "4.21",
+}
+
+
+class OCPRangeError(Exception):
+    """This exception is raised when a kubeVersion range can't be converted"""
+
+
+def _to_npm_spec(kube_version_range):
+    """Rewrite a Helm (Masterminds semver) constraint in the NPM syntax."""
+    spec = kube_version_range.replace(",", " ")
+    # "v1.21.0" -> "1.21.0"
+    spec = re.sub(r"(?<![\w.])v(?=\d)", "", spec)
+    # ">= 1.19" -> ">=1.19"
+    spec = re.sub(r"([<>=~^]+)\s+", r"\1", spec)
+    # "1.29-0" -> "1.29.0-0"
+    spec = re.sub(r"(?<![\w.])(\d+\.\d+)-", r"\1.0-", spec)
+    return semantic_version.NpmSpec(" ".join(spec.split()))
+
+
+def get_ocp_range(kube_version_range):
+    """Get the range of OCP versions supported by a chart.
+
+    Args:
+        kube_version_range (str): The kubeVersion of the chart, e.g. ">=1.25.0-0"
+
+    Returns:
+        str: The range of supported OCP versions, e.g. ">=4.12"
+
+    Raises:
+        OCPRangeError: if the kubeVersion is not a valid range, or doesn't include
+                       any OCP version.
+    """
+    if not kube_version_range:
+        raise OCPRangeError("No kubeVersion specified")
+    try:
+        spec = _to_npm_spec(kube_version_range)
+    except ValueError as e:
+        raise OCPRangeError(f"Invalid kubeVersion {kube_version_range}: {e}") from e
+
+    ocp_versions = [
+        ocp_version
+        for kube_version, ocp_version in KUBE_OPENSHIFT_VERSIONS.items()
+        if semantic_version.Version(f"{kube_version}.0") in spec
+    ]
+    if not ocp_versions:
+        raise OCPRangeError(
+            f"kubeVersion {kube_version_range} doesn't include any OCP version"
+        )
+
+    min_version, max_version = ocp_versions[0], ocp_versions[-1]
+    if max_version == list(KUBE_OPENSHIFT_VERSIONS.values())[-1]:
+        return f">={min_version}"
+    if min_version == max_version:
+        return min_version
+    return f"{min_version} - {max_version}"
@@ -0,0 +1,31 @@
+import pytest
+
+from report import ocp_range
+
+
+@pytest.mark.parametrize(
+    "kube_version_range, expected",
+    [
+        (">=1.0.0-0", ">=4.1"),
+        (">= 1.21.0-0", ">=4.8"),
+        ("^1.25.0", ">=4.12"),
+        (">=v1.21.0", ">=4.8"),
+        (">= 1.29-0", ">=4.16"),
+        # Only the first release of each minor version is checked
+        (">= 1.20.1", ">=4.8"),
+        ("^1.16.1-0", ">=4.4"),
+        ("> 1.9.0", ">=4.1"),
+        ("v1.25.x", "4.12"),
+        ("1.20.0 - 1.24.0", "4.7 - 4.11"),
+        (">=1.23.0 <=1.26.3", "4.10 - 4.13"),
+        (">=1.23.0, <1.27.0", "4.10 - 4.13"),
+    ],
+)
+def test_get_ocp_range(kube_version_range, expected):
+    assert ocp_range.get_ocp_range(kube_version_range) == expected
+
+
+@pytest.mark.parametrize("kube_version_range", ["", None, "not a range", "<1.10.0"])
+def test_get_ocp_range_error(kube_version_range):
+    with pytest.raises(ocp_range.OCPRangeError):
+        ocp_range.get_ocp_range(kube_version_range)
@@ -0,0 +1,134 @@
+"""On-disk cache of the report summaries generated by chart-verifier.
+
+The summary of a report.yaml (i.e. the JSON output of "chart-verifier report all") only
+depends on the content of the report, on the version of chart-verifier and on the
+values passed to it with --set. Those are used to build the key of each cache entry, so
+that the cache directory can be shared between jobs (e.g. uploaded and restored as a
+workflow artifact) and entries are never served for a different report or verifier.
+
+The cache is enabled by setting the REPORT_CACHE_DIR environment variable to the
+directory to use. Its size is capped to REPORT_CACHE_MAX_SIZE bytes (defaults to
+DEFAULT_MAX_SIZE), least recently used entries being evicted first.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+CACHE_DIR_ENV = "REPORT_CACHE_DIR"
+CACHE_MAX_SIZE_ENV = "REPORT_CACHE_MAX_SIZE"
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+ENTRY_SUFFIX = ".json"
+
+
+class ReportCache:
+    """A directory of JSON report summaries, addressed by the hash of their inputs.
+
+    Each entry is stored in its own file. The modification time of the file is updated
+    on every hit and is used to determine the least recently used entries to evict.
+
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(report_sha256, verifier_tag, set_values):
+        """Build the cache key of a report summary.
+
+        Args:
+            report_sha256 (str): sha256 of the content of the report.yaml
+            verifier_tag (str): Image or version of chart-verifier used to summarize
+                                the report
+            set_values (str): Values passed to chart-verifier with --set
+
+        Returns:
+            str: The hexadecimal cache key
+        """
+        h = hashlib.sha256()
+        for part in (report_sha256, verifier_tag, set_values):
+            h.update((part or "").encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}{ENTRY_SUFFIX}")
+
+    def get(self, key):
+        """Return the report summary stored under key, or None if not cached."""
+        path = self._entry_path(key)
+        try:
+            with open(path) as fd:
+                report_out = json.load(fd)
+        except (OSError, ValueError):
+            self.misses += 1
+            print(f"[INFO] report cache miss: {key} ({self.stats()})")
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        print(f"[INFO] report cache hit: {key} ({self.stats()})")
+        return report_out
+
+    def put(self, key, report_out):
+        """Store the report summary under key, then evict entries above the size cap."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(report_out, f)
+        os.replace(tmp_path, self._entry_path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size."""
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total_size += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            print(f"[INFO] report cache evict: {os.path.basename(path)}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def stats(self):
+        return f"hits={self.hits}, misses={self.misses}"
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the ReportCache configured by the environment, or None if disabled."""
+    global _cache
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+
+    if _cache is None or _cache.directory != directory:
+        max_size = int(os.environ.get(CACHE_MAX_SIZE_ENV, DEFAULT_MAX_SIZE))
+        _cache = ReportCache(directory, max_size)
+    return _cache
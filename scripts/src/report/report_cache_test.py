@@ -0,0 +1,43 @@
+import os
+
+from report import report_cache
+
+
+def test_make_key_depends_on_all_inputs():
+    key = report_cache.ReportCache.make_key("abc", "verifier:1.13", "")
+    assert key == report_cache.ReportCache.make_key("abc", "verifier:1.13", "")
+    assert key != report_cache.ReportCache.make_key("abd", "verifier:1.13", "")
+    assert key != report_cache.ReportCache.make_key("abc", "verifier:1.14", "")
+    assert key != report_cache.ReportCache.make_key(
+        "abc", "verifier:1.13", "profile.vendortype=partner"
+    )
+
+
+def test_get_and_put(tmp_path):
+    cache = report_cache.ReportCache(str(tmp_path))
+    assert cache.get("key") is None
+    cache.put("key", {"digests": {"chart": "sha256:0123"}})
+    assert cache.get("key") == {"digests": {"chart": "sha256:0123"}}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = report_cache.ReportCache(str(tmp_path), max_size=2 * 1024)
+    payload = {"metadata": "x" * 900}
+
+    cache.put("first", payload)
+    cache.put("second", payload)
+    # Make "first" the most recently used entry
+    os.utime(os.path.join(tmp_path, "second.json"), (1, 1))
+    assert cache.get("first") is not None
+
+    cache.put("third", payload)
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_get_cache_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv(report_cache.CACHE_DIR_ENV, raising=False)
+    assert report_cache.get_cache() is None
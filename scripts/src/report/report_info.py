@@ -1,3 +1,6 @@
+import copy
+import functools
+import hashlib
 import json
 import os
 import subprocess
@@ -5,10 +8,14 @@ import sys
 
 import docker
 
+sys.path.append("../")
+from report import report_cache, report_summary, verifier_pool
+
 REPORT_ANNOTATIONS = "annotations"
 REPORT_RESULTS = "results"
 REPORT_DIGESTS = "digests"
 REPORT_METADATA = "metadata"
+REPORT_ALL = "all"
 SHA_ERROR = "Digest in report did not match report content"
 
 
@@ -25,36 +32,133 @@ def write_error_log(*msg):
         print(line)
 
 
-def _get_report_info(
-    report_path, report_info_path, info_type, profile_type, profile_version
-):
-    if report_info_path and len(report_info_path) > 0:
-        print(f"[INFO] Using existing report info: {report_info_path}")
-        report_out = json.load(open(report_info_path))
-    else:
-        command = "report"
-        set_values = ""
-        if profile_type:
-            set_values = "profile.vendortype=%s" % profile_type
-        if profile_version:
-            if set_values:
-                set_values = "%s,profile.version=%s" % (set_values, profile_version)
-            else:
-                set_values = "profile.version=%s" % profile_version
-
-        if os.environ.get("VERIFIER_IMAGE"):
-            print(f"[INFO] Generate report info using docker  : {report_path}")
-            docker_command = (
-                f"{command} {info_type} /charts/{os.path.basename(report_path)}"
-            )
-            if set_values:
-                docker_command = "%s --set %s" % (docker_command, set_values)
+class ReportInfo:
+    """Summary of a report.yaml, as produced by "chart-verifier report all".
 
-            client = docker.from_env()
-            report_directory = os.path.dirname(os.path.abspath(report_path))
-            print(
-                f'Call docker using image: {os.environ.get("VERIFIER_IMAGE")}, docker command: {docker_command}, report directory: {report_directory}'
+    The summary holds every section (annotations, results, digests and metadata) so
+    that the verifier only needs to run once per report.yaml, whatever the number of
+    sections the caller is interested in.
+
+    A partial summary can also be provided along with a fallback, called to get the
+    full summary the first time a missing section is requested. This is used when the
+    read-only sections are generated in-process (see report_summary).
+
+    """
+
+    def __init__(self, report_out, fallback=None):
+        self.report_out = report_out
+        self.fallback = fallback
+
+    def get(self, info_type):
+        """Return the content of the given section of the summary.
+
+        Args:
+            info_type (str): One of REPORT_ANNOTATIONS, REPORT_RESULTS, REPORT_DIGESTS
+                             or REPORT_METADATA.
+
+        Returns:
+            dict: Content of the section. Annotations are returned as a mapping of
+                  annotation names to their values.
+        """
+        if info_type not in self.report_out and self.fallback:
+            self.report_out = self.fallback()
+            self.fallback = None
+
+        if info_type not in self.report_out:
+            msg = f"Error extracting {info_type} from the report: {self.report_out}"
+            write_error_log(msg)
+            sys.exit(1)
+
+        if info_type == REPORT_ANNOTATIONS:
+            annotations = {}
+            for report_annotation in self.report_out[REPORT_ANNOTATIONS]:
+                annotations[report_annotation["name"]] = report_annotation["value"]
+
+            return annotations
+
+        return copy.deepcopy(self.report_out[info_type])
+
+
+# In-memory cache of ReportInfo objects, keyed by (report path, sha256 of the report
+# content, profile type, profile version, verifier image).
+_report_infos = {}
+
+
+def _file_sha256(path):
+    with open(path, "rb") as fd:
+        return hashlib.sha256(fd.read()).hexdigest()
+
+
+def _get_set_values(profile_type, profile_version):
+    set_values = ""
+    if profile_type:
+        set_values = "profile.vendortype=%s" % profile_type
+    if profile_version:
+        if set_values:
+            set_values = "%s,profile.version=%s" % (set_values, profile_version)
+        else:
+            set_values = "profile.version=%s" % profile_version
+    return set_values
+
+
+@functools.cache
+def _get_verifier_binary_version():
+    out = subprocess.run(["chart-verifier", "version"], capture_output=True)
+    return out.stdout.decode("utf-8").strip()
+
+
+@functools.cache
+def _get_verifier_image_id(image):
+    """Get the ID of the local verifier image, pulling it if it is missing."""
+    client = docker.from_env()
+    try:
+        return client.images.get(image).id
+    except docker.errors.ImageNotFound:
+        print(f"[INFO] Pull verifier image: {image}")
+        return client.images.pull(image).id
+
+
+def _get_verifier_tag():
+    """Identify the chart-verifier used to generate report info, for cache keys.
+
+    Images are identified by their ID rather than their tag (e.g. "main"), which can
+    be moved to a newer verifier.
+    """
+    image = os.environ.get("VERIFIER_IMAGE")
+    if image:
+        return f"{image}@{_get_verifier_image_id(image)}"
+    return f"chart-verifier {_get_verifier_binary_version()}"
+
+
+def _run_verifier(report_path, set_values):
+    """Run "chart-verifier report all" against report.yaml and return its raw output.
+
+    The verifier is run in a container if the VERIFIER_IMAGE environment variable is
+    set, and using the chart-verifier binary otherwise. Containers are reused across
+    calls unless pooling is disabled (see verifier_pool).
+
+    """
+    command = "report"
+
+    if os.environ.get("VERIFIER_IMAGE"):
+        print(f"[INFO] Generate report info using docker  : {report_path}")
+        docker_command = (
+            f"{command} {REPORT_ALL} /charts/{os.path.basename(report_path)}"
+        )
+        if set_values:
+            docker_command = "%s --set %s" % (docker_command, set_values)
+
+        report_directory = os.path.dirname(os.path.abspath(report_path))
+        print(
+            f'Call docker using image: {os.environ.get("VERIFIER_IMAGE")}, docker command: {docker_command}, report directory: {report_directory}'
+        )
+        if verifier_pool.is_enabled():
+            container = verifier_pool.get_pool().get(
+                os.environ.get("VERIFIER_IMAGE"), report_directory
             )
+            output = container.run(docker_command.split())
+        else:
+            client = docker.from_env()
             output = client.containers.run(
                 os.environ.get("VERIFIER_IMAGE"),
                 docker_command,
@@ -63,61 +167,126 @@ def _get_report_info(
                 stdout=True,
                 volumes={report_directory: {"bind": "/charts/", "mode": "rw"}},
             )
-        else:
-            print(
-                f"[INFO] Generate report info using chart-verifier on path : {os.path.abspath(report_path)}"
-            )
-            if set_values:
-                out = subprocess.run(
-                    [
-                        "chart-verifier",
-                        command,
-                        info_type,
-                        "--set",
-                        set_values,
-                        os.path.abspath(report_path),
-                    ],
-                    capture_output=True,
-                )
-            else:
-                out = subprocess.run(
-                    [
-                        "chart-verifier",
-                        command,
-                        info_type,
-                        os.path.abspath(report_path),
-                    ],
-                    capture_output=True,
-                )
-            output = out.stdout.decode("utf-8")
-
-        if SHA_ERROR in output:
-            msg = f"[ERROR] {SHA_ERROR}"
-            write_error_log(msg)
-            sys.exit(1)
+        if isinstance(output, bytes):
+            output = output.decode("utf-8")
+    else:
+        print(
+            f"[INFO] Generate report info using chart-verifier on path : {os.path.abspath(report_path)}"
+        )
+        args = ["chart-verifier", command, REPORT_ALL]
+        if set_values:
+            args.extend(["--set", set_values])
+        args.append(os.path.abspath(report_path))
+        out = subprocess.run(args, capture_output=True)
+        output = out.stdout.decode("utf-8")
+        if out.returncode != 0:
+            stderr = out.stderr.decode("utf-8")
+            print(f"[ERROR] chart-verifier exited with code {out.returncode}: {stderr}")
+            output += stderr
+
+    return output
+
+
+def get_report_info(
+    report_path=None, report_info_path=None, profile_type="", profile_version=""
+):
+    """Get the ReportInfo for a given report.yaml or existing report info file.
+
+    The verifier is only run the first time a given report is requested. Subsequent
+    calls with the same report content, profile and verifier are served from memory. When no
+    profile is set, the read-only sections are generated in-process if possible, and
+    the verifier only runs if the results are requested. If the
+    REPORT_CACHE_DIR environment variable is set, report info generated by previous
+    jobs are also looked up on disk (see report_cache).
+
+    Args:
+        report_path (str): Path to the report.yaml file.
+        report_info_path (str): Path to an existing JSON report info. If set,
+                                report_path is ignored.
+        profile_type (str): Profile vendor type to pass to the verifier.
+        profile_version (str): Profile version to pass to the verifier.
+
+    Returns:
+        ReportInfo: The summary of the report.
+    """
+    if report_info_path and len(report_info_path) > 0:
+        key = (os.path.abspath(report_info_path), _file_sha256(report_info_path))
+        if key not in _report_infos:
+            print(f"[INFO] Using existing report info: {report_info_path}")
+            with open(report_info_path) as fd:
+                _report_infos[key] = ReportInfo(json.load(fd))
+        return _report_infos[key]
+
+    report_sha256 = _file_sha256(report_path)
+    key = (
+        os.path.abspath(report_path),
+        report_sha256,
+        profile_type or "",
+        profile_version or "",
+        # The verifier may be switched between the image and the binary in-process
+        os.environ.get("VERIFIER_IMAGE") or "",
+    )
+    if key in _report_infos:
+        print(f"[INFO] Using cached report info: {report_path}")
+        return _report_infos[key]
+
+    set_values = _get_set_values(profile_type, profile_version)
+
+    def generate():
+        return _generate_report_out(report_path, report_sha256, set_values)
 
+    if not set_values:
         try:
-            report_out = json.loads(output)
-        except BaseException as err:
-            msgs = []
-            msgs.append(f"[ERROR] loading report output: /n{output}")
-            msgs.append(f"[ERROR] exception was: {err=}, {type(err)=}")
-            write_error_log(*msgs)
-            sys.exit(1)
+            report_out = report_summary.summarize(report_path)
+        except report_summary.SummaryUnavailable as e:
+            print(f"[INFO] Report info not available without chart-verifier: {e}")
+        else:
+            print(f"[INFO] Generate report info in-process : {report_path}")
+            _report_infos[key] = ReportInfo(report_out, fallback=generate)
+            return _report_infos[key]
+
+    _report_infos[key] = ReportInfo(generate())
+    return _report_infos[key]
+
+
+def _generate_report_out(report_path, report_sha256, set_values):
+    """Get the output of "chart-verifier report all", from the on-disk report cache if
+    enabled, or by running the verifier."""
+    cache = report_cache.get_cache()
+    if cache:
+        cache_key = cache.make_key(report_sha256, _get_verifier_tag(), set_values)
+        report_out = cache.get(cache_key)
+        if report_out is not None:
+            return report_out
+
+    output = _run_verifier(report_path, set_values)
 
-    if info_type not in report_out:
-        msg = f"Error extracting {info_type} from the report:", report_out.strip()
+    if SHA_ERROR in output:
+        msg = f"[ERROR] {SHA_ERROR}"
         write_error_log(msg)
         sys.exit(1)
 
-    if info_type == REPORT_ANNOTATIONS:
-        annotations = {}
-        for report_annotation in report_out[REPORT_ANNOTATIONS]:
-            annotations[report_annotation["name"]] = report_annotation["value"]
+    try:
+        report_out = json.loads(output)
+    except BaseException as err:
+        msgs = []
+        msgs.append(f"[ERROR] loading report output: /n{output}")
+        msgs.append(f"[ERROR] exception was: {err=}, {type(err)=}")
+        write_error_log(*msgs)
+        sys.exit(1)
+
+    if cache:
+        cache.put(cache_key, report_out)
+
+    return report_out
 
-        return annotations
 
-    return report_out[info_type]
+def _get_report_info(
+    report_path, report_info_path, info_type, profile_type, profile_version
+):
+    return get_report_info(
+        report_path, report_info_path, profile_type, profile_version
+    ).get(info_type)
 
 
 def get_report_annotations(report_path=None, report_info_path=None):
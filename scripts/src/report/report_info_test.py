@@ -0,0 +1,161 @@
+import json
+import types
+
+import docker
+import pytest
+
+from report import report_cache, report_info, verifier_pool
+from report.verifier_pool_test import FakeClient
+
+report_all_output = {
+    "annotations": [
+        {"name": "charts.openshift.io/digest", "value": "sha256:0123"},
+        {"name": "charts.openshift.io/testedOpenShiftVersion", "value": "4.15"},
+    ],
+    "results": {"passed": "12", "failed": "0", "message": []},
+    "digests": {"chart": "sha256:0123", "package": "4567"},
+    "metadata": {
+        "vendorType": "partner",
+        "profileVersion": "v1.3",
+        "chart-uri": "https://example.com/awesome-1.42.0.tgz",
+        "chart": {"name": "awesome", "version": "1.42.0"},
+    },
+}
+
+
+@pytest.fixture
+def verifier_calls(monkeypatch):
+    """Replace the call to chart-verifier and record the arguments it is called with."""
+    calls = []
+
+    def fake_run_verifier(report_path, set_values):
+        calls.append((report_path, set_values))
+        return json.dumps(report_all_output)
+
+    monkeypatch.setattr(report_info, "_run_verifier", fake_run_verifier)
+    monkeypatch.setattr(report_info, "_report_infos", {})
+    monkeypatch.setattr(report_info, "_get_verifier_tag", lambda: "verifier:test")
+    monkeypatch.delenv(report_cache.CACHE_DIR_ENV, raising=False)
+    return calls
+
+
+@pytest.fixture
+def report_path(tmp_path):
+    p = tmp_path / "report.yaml"
+    p.write_text("kind: verify-report\n")
+    return str(p)
+
+
+def test_verifier_runs_once_for_all_sections(verifier_calls, report_path):
+    assert report_info.get_report_chart(report_path) == {
+        "name": "awesome",
+        "version": "1.42.0",
+    }
+    assert (
+        report_info.get_report_chart_url(report_path)
+        == "https://example.com/awesome-1.42.0.tgz"
+    )
+    assert report_info.get_report_digests(report_path)["package"] == "4567"
+    assert report_info.get_report_metadata(report_path)["vendorType"] == "partner"
+    assert report_info.get_report_annotations(report_path) == {
+        "charts.openshift.io/digest": "sha256:0123",
+        "charts.openshift.io/testedOpenShiftVersion": "4.15",
+    }
+
+    assert len(verifier_calls) == 1
+
+
+def test_profile_is_part_of_cache_key(verifier_calls, report_path):
+    report_info.get_report_metadata(report_path)
+    results = report_info.get_report_results(report_path, profile_type="partner")
+    assert results["passed"] == 12
+    report_info.get_report_results(report_path, profile_type="partner")
+
+    assert verifier_calls == [
+        (report_path, ""),
+        (report_path, "profile.vendortype=partner"),
+    ]
+
+
+def test_verifier_is_part_of_cache_key(verifier_calls, report_path, monkeypatch):
+    monkeypatch.setenv("VERIFIER_IMAGE", "verifier:main")
+    report_info.get_report_results(report_path, profile_type="partner")
+    monkeypatch.setenv("VERIFIER_IMAGE", "")
+    report_info.get_report_results(report_path, profile_type="partner")
+    report_info.get_report_results(report_path, profile_type="partner")
+
+    assert len(verifier_calls) == 2
+
+
+def test_report_change_invalidates_cache(verifier_calls, report_path):
+    report_info.get_report_chart(report_path)
+    with open(report_path, "a") as fd:
+        fd.write("# modified\n")
+    report_info.get_report_chart(report_path)
+
+    assert len(verifier_calls) == 2
+
+
+def test_cached_sections_are_not_shared(verifier_calls, report_path):
+    results = report_info.get_report_results(report_path)
+    results["message"].append("modified by the caller")
+
+    assert report_info.get_report_results(report_path)["message"] == []
+
+
+def test_report_cache_dir_is_shared_across_processes(
+    verifier_calls, report_path, tmp_path, monkeypatch
+):
+    monkeypatch.setenv(report_cache.CACHE_DIR_ENV, str(tmp_path / "cache"))
+    report_info.get_report_chart(report_path)
+
+    # Simulate a later job: nothing in memory, but the cache directory is restored.
+    monkeypatch.setattr(report_info, "_report_infos", {})
+    assert report_info.get_report_chart(report_path)["name"] == "awesome"
+
+    assert len(verifier_calls) == 1
+    assert report_cache.get_cache().hits == 1
+
+
+def test_pooled_verifier_sha_error(monkeypatch, report_path, tmp_path):
+    client = FakeClient()
+    monkeypatch.setattr(verifier_pool, "_pool", verifier_pool.VerifierPool(client))
+    monkeypatch.setattr(report_info, "_report_infos", {})
+    monkeypatch.setenv("VERIFIER_IMAGE", "verifier:test")
+    monkeypatch.delenv(verifier_pool.POOL_ENV, raising=False)
+    monkeypatch.delenv(report_cache.CACHE_DIR_ENV, raising=False)
+    monkeypatch.setenv("WORKFLOW_WORKING_DIRECTORY", str(tmp_path / "work"))
+    container = verifier_pool.get_pool().get("verifier:test", str(tmp_path.resolve()))
+    client.started[0].result = (1, (None, f"{report_info.SHA_ERROR}\n".encode()))
+
+    with pytest.raises(SystemExit):
+        report_info._generate_report_out(report_path, "0123", "")
+
+    assert client.started == [container.container]
+    errors = (tmp_path / "work" / "errors").read_text()
+    assert errors == f"[ERROR] {report_info.SHA_ERROR}\n"
+
+
+def test_verifier_tag_is_image_id(monkeypatch):
+    image_ids = {"verifier:main": "sha256:0123"}
+
+    class Images:
+        def get(self, image):
+            if image not in image_ids:
+                raise docker.errors.ImageNotFound(image)
+            return types.SimpleNamespace(id=image_ids[image])
+
+        def pull(self, image):
+            image_ids[image] = "sha256:4567"
+            return self.get(image)
+
+    monkeypatch.setattr(
+        docker, "from_env", lambda: types.SimpleNamespace(images=Images())
+    )
+    report_info._get_verifier_image_id.cache_clear()
+
+    monkeypatch.setenv("VERIFIER_IMAGE", "verifier:main")
+    assert report_info._get_verifier_tag() == "verifier:main@sha256:0123"
+    monkeypatch.setenv("VERIFIER_IMAGE", "verifier:latest")
+    assert report_info._get_verifier_tag() == "verifier:latest@sha256:4567"
+    report_info._get_verifier_image_id.cache_clear()
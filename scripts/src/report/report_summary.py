@@ -0,0 +1,439 @@
+"""In-process equivalent of "chart-verifier report" for the read-only sections.
+
+The annotations, digests and metadata sections of a report summary are a direct
+projection of the content of report.yaml, so they can be produced without running
+chart-verifier (either as a binary or in a container). This module produces the same
+JSON structure as "chart-verifier report", so that report_info can use it as a fast
+path.
+
+The results section depends on the profile definitions embedded in chart-verifier
+(mandatory checks per vendor type and profile version) and is never produced here:
+callers must fall back to chart-verifier for it.
+
+chart-verifier also checks the integrity of the report against its reportDigest
+("uint64:<n>"). That digest is the hash of chart-verifier's report structure computed
+by github.com/mitchellh/hashstructure (format v2, FNV-1 64-bit), which is
+recomputed here by get_report_digest. A report whose digest does not match is not
+summarized here: it is left to chart-verifier, which reports it with the "Digest in
+report did not match report content" (SHA_ERROR) error.
+"""
+
+import struct
+
+import yaml
+
+try:
+    from yaml import CBaseLoader as BaseLoader
+except ImportError:
+    from yaml import BaseLoader
+
+ANNOTATIONS_PREFIX = "charts.openshift.io"
+V1_0_PROFILE_ANNOTATIONS = [
+    "digest",
+    "lastCertifiedTimestamp",
+    "certifiedOpenShiftVersions",
+]
+PROFILE_ANNOTATIONS = [
+    "digest",
+    "lastCertifiedTimestamp",
+    "testedOpenShiftVersion",
+    "supportedOpenShiftVersions",
+]
+
+# Go zero values are serialized as null or ~ by some YAML emitters.
+_NULL_VALUES = {"", "~", "null", "Null", "NULL"}
+
+# Mapping of report.yaml keys (helm's chart.Metadata marshalled without YAML tags) to
+# the JSON keys used by chart-verifier (helm's chart.Metadata JSON tags), along with
+# the type of each field. All fields are omitted from JSON when empty.
+_CHART_FIELDS = [
+    ("name", "name", "str"),
+    ("home", "home", "str"),
+    ("sources", "sources", "list"),
+    ("version", "version", "str"),
+    ("description", "description", "str"),
+    ("keywords", "keywords", "list"),
+    ("maintainers", "maintainers", "maintainers"),
+    ("icon", "icon", "str"),
+    ("apiversion", "apiVersion", "str"),
+    ("condition", "condition", "str"),
+    ("tags", "tags", "str"),
+    ("appversion", "appVersion", "str"),
+    ("deprecated", "deprecated", "bool"),
+    ("annotations", "annotations", "dict"),
+    ("kubeversion", "kubeVersion", "str"),
+    ("dependencies", "dependencies", "dependencies"),
+    ("type", "type", "str"),
+]
+
+_MAINTAINER_FIELDS = [
+    ("name", "name", "str"),
+    ("email", "email", "str"),
+    ("url", "url", "str"),
+]
+
+# (report key, JSON key, type, omitempty)
+_DEPENDENCY_FIELDS = [
+    ("name", "name", "str", False),
+    ("version", "version", "str", True),
+    ("repository", "repository", "str", False),
+    ("condition", "condition", "str", True),
+    ("tags", "tags", "list", True),
+    ("enabled", "enabled", "bool", True),
+    ("importvalues", "import-values", "raw", True),
+    ("alias", "alias", "str", True),
+]
+
+
+# Go types hashed for the report digest, as (type name, fields), each field being
+# (Go field name, report key, field type). The field types are those of _convert, a
+# nested type for a struct and a list of a type for a slice of structs. Only the
+# fields below are covered by the digest, e.g. not webCatalogOnly nor the publicKey
+# digest. The reportDigest itself is hashed as an empty string (no report key).
+_DIGEST_PROFILE = (
+    "Profile",
+    [("VendorType", "VendorType", "str"), ("Version", "version", "str")],
+)
+_DIGEST_DIGESTS = (
+    "Digests",
+    [("Chart", "chart", "str"), ("Package", "package", "str")],
+)
+_DIGEST_TOOL = (
+    "ToolMetadata",
+    [
+        ("Version", "verifier-version", "str"),
+        ("Profile", "profile", _DIGEST_PROFILE),
+        ("ReportDigest", None, "str"),
+        ("ChartUri", "chart-uri", "str"),
+        ("Digests", "digests", _DIGEST_DIGESTS),
+        ("LastCertifiedTimestamp", "lastCertifiedTimestamp", "str"),
+        ("CertifiedOpenShiftVersions", "certifiedOpenShiftVersions", "str"),
+        ("TestedOpenShiftVersion", "testedOpenShiftVersion", "str"),
+        ("SupportedOpenShiftVersions", "supportedOpenShiftVersions", "str"),
+        ("ProviderDelivery", "providerControlledDelivery", "bool"),
+    ],
+)
+_DIGEST_MAINTAINER = (
+    "Maintainer",
+    [("Name", "name", "str"), ("Email", "email", "str"), ("URL", "url", "str")],
+)
+_DIGEST_DEPENDENCY = (
+    "Dependency",
+    [
+        ("Name", "name", "str"),
+        ("Version", "version", "str"),
+        ("Repository", "repository", "str"),
+        ("Condition", "condition", "str"),
+        ("Tags", "tags", "list"),
+        ("Enabled", "enabled", "bool"),
+        ("ImportValues", "importvalues", "raw"),
+        ("Alias", "alias", "str"),
+    ],
+)
+_DIGEST_CHART = (
+    "Metadata",
+    [
+        ("Name", "name", "str"),
+        ("Home", "home", "str"),
+        ("Sources", "sources", "list"),
+        ("Version", "version", "str"),
+        ("Description", "description", "str"),
+        ("Keywords", "keywords", "list"),
+        ("Maintainers", "maintainers", [_DIGEST_MAINTAINER]),
+        ("Icon", "icon", "str"),
+        ("APIVersion", "apiversion", "str"),
+        ("Condition", "condition", "str"),
+        ("Tags", "tags", "str"),
+        ("AppVersion", "appversion", "str"),
+        ("Deprecated", "deprecated", "bool"),
+        ("Annotations", "annotations", "dict"),
+        ("KubeVersion", "kubeversion", "str"),
+        ("Dependencies", "dependencies", [_DIGEST_DEPENDENCY]),
+        ("Type", "type", "str"),
+    ],
+)
+_DIGEST_RESULT = (
+    "CheckReport",
+    [
+        ("Check", "check", "str"),
+        ("Type", "type", "str"),
+        ("Outcome", "outcome", "str"),
+        ("Reason", "reason", "str"),
+    ],
+)
+_DIGEST_REPORT = (
+    "Report",
+    [
+        ("Apiversion", "apiversion", "str"),
+        ("Kind", "kind", "str"),
+        (
+            "Metadata",
+            "metadata",
+            (
+                "ReportMetadata",
+                [
+                    ("ToolMetadata", "tool", _DIGEST_TOOL),
+                    ("ChartData", "chart", _DIGEST_CHART),
+                    ("Overrides", "chart-overrides", "str"),
+                ],
+            ),
+        ),
+        ("Results", "results", [_DIGEST_RESULT]),
+    ],
+)
+
+# FNV-1 64-bit, the default hash function of hashstructure
+_FNV_OFFSET_BASIS = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+_UINT64_MASK = (1 << 64) - 1
+
+
+class SummaryUnavailable(Exception):
+    """This exception is raised when the report cannot be summarized in-process"""
+
+
+def _to_str(value):
+    if value is None or not isinstance(value, str) or value in _NULL_VALUES:
+        return ""
+    return value
+
+
+def _to_bool(value):
+    return _to_str(value).lower() == "true"
+
+
+def _to_list(value):
+    if not isinstance(value, list):
+        return []
+    return [_to_str(v) for v in value]
+
+
+def _to_dict(value):
+    if not isinstance(value, dict):
+        return {}
+    return {k: _to_str(v) for k, v in value.items()}
+
+
+def _convert(value, field_type):
+    if field_type == "str":
+        return _to_str(value)
+    if field_type == "bool":
+        return _to_bool(value)
+    if field_type == "list":
+        return _to_list(value)
+    if field_type == "dict":
+        return _to_dict(value)
+    if field_type == "maintainers":
+        return [_convert_maintainer(m) for m in value or [] if isinstance(m, dict)]
+    if field_type == "dependencies":
+        return [_convert_dependency(d) for d in value or [] if isinstance(d, dict)]
+    return value or None
+
+
+def _convert_maintainer(maintainer):
+    out = {}
+    for report_key, json_key, field_type in _MAINTAINER_FIELDS:
+        value = _convert(maintainer.get(report_key), field_type)
+        if value:
+            out[json_key] = value
+    return out
+
+
+def _convert_dependency(dependency):
+    out = {}
+    for report_key, json_key, field_type, omitempty in _DEPENDENCY_FIELDS:
+        value = _convert(dependency.get(report_key), field_type)
+        if value or not omitempty:
+            out[json_key] = value
+    return out
+
+
+def _convert_chart(chart):
+    out = {}
+    for report_key, json_key, field_type in _CHART_FIELDS:
+        value = _convert(chart.get(report_key), field_type)
+        if value:
+            out[json_key] = value
+    return out
+
+
+def _fnv1(data):
+    h = _FNV_OFFSET_BASIS
+    for byte in data:
+        h = (h * _FNV_PRIME) & _UINT64_MASK
+        h ^= byte
+    return h
+
+
+def _hash_str(value):
+    return _fnv1(value.encode("utf-8"))
+
+
+def _hash_ordered(a, b):
+    return _fnv1(struct.pack("<QQ", a, b))
+
+
+def _hash_unordered(h):
+    """Finish a XOR of hashes, as hashstructure does for maps and struct fields."""
+    return _fnv1(struct.pack("<Q", h))
+
+
+def _hash_value(value, field_type):
+    """Hash a report value as hashstructure hashes the Go value it is decoded to."""
+    if isinstance(field_type, tuple):
+        type_name, fields = field_type
+        if not isinstance(value, dict):
+            # A nil pointer is hashed as a zero int
+            return _fnv1(struct.pack("<q", 0))
+        h = _hash_str(type_name)
+        for go_name, report_key, value_type in fields:
+            field_hash = _hash_ordered(
+                _hash_str(go_name), _hash_value(value.get(report_key), value_type)
+            )
+            # hashstructure finishes the hash after each field, so the order matters
+            h = _hash_unordered(h ^ field_hash)
+        return h
+    if isinstance(field_type, list):
+        items = [_hash_value(v, field_type[0]) for v in value or []]
+    elif field_type == "list":
+        items = [_hash_str(v) for v in _to_list(value)]
+    elif field_type == "str":
+        return _hash_str(_to_str(value))
+    elif field_type == "bool":
+        return _fnv1(b"\x01" if _to_bool(value) else b"\x00")
+    elif field_type == "dict":
+        h = 0
+        for k, v in _to_dict(value).items():
+            h ^= _hash_ordered(_hash_str(k), _hash_str(v))
+        return _hash_unordered(h)
+    elif _to_list(value):
+        # Import values are decoded to Go values typed by yaml.v3 resolution rules
+        raise SummaryUnavailable(
+            "Report digest with import values requires chart-verifier"
+        )
+    else:
+        return 0
+
+    h = 0
+    for item in items:
+        h = _hash_ordered(h, item)
+    return h
+
+
+def get_report_digest(report_data):
+    """Compute the reportDigest of a report, as chart-verifier does.
+
+    Args:
+        report_data (dict): The report, as returned by load_report.
+
+    Returns:
+        str: The digest, e.g. "uint64:1234".
+
+    Raises:
+        SummaryUnavailable: If the digest can only be computed by chart-verifier.
+    """
+    return f"uint64:{_hash_value(report_data, _DIGEST_REPORT)}"
+
+
+def load_report(report_path):
+    """Load report.yaml, keeping all scalars as strings.
+
+    Scalars are typed according to chart-verifier's schema later on, so that values
+    such as "version: 1.10" are not converted to floats.
+
+    """
+    with open(report_path) as fd:
+        return yaml.load(fd, Loader=BaseLoader)
+
+
+def _get_tool_metadata(report_data):
+    try:
+        tool = report_data["metadata"]["tool"]
+        profile = tool["profile"]
+        profile["VendorType"]
+        profile["version"]
+        tool["digests"]["chart"]
+        report_data["metadata"]["chart"]
+    except (KeyError, TypeError) as e:
+        raise SummaryUnavailable(f"Incomplete report: {e}") from e
+
+    return tool
+
+
+def get_annotations(report_data):
+    tool = _get_tool_metadata(report_data)
+    values = {
+        "digest": _to_str(tool["digests"]["chart"]),
+        "lastCertifiedTimestamp": _to_str(tool.get("lastCertifiedTimestamp")),
+        "certifiedOpenShiftVersions": _to_str(tool.get("certifiedOpenShiftVersions")),
+        "testedOpenShiftVersion": _to_str(tool.get("testedOpenShiftVersion")),
+        "supportedOpenShiftVersions": _to_str(tool.get("supportedOpenShiftVersions")),
+    }
+
+    if _to_str(tool["profile"]["version"]) == "v1.0":
+        names = V1_0_PROFILE_ANNOTATIONS
+    else:
+        names = PROFILE_ANNOTATIONS
+
+    return [
+        {"name": f"{ANNOTATIONS_PREFIX}/{name}", "value": values[name]}
+        for name in names
+    ]
+
+
+def get_digests(report_data):
+    tool = _get_tool_metadata(report_data)
+    digests = {"chart": _to_str(tool["digests"]["chart"])}
+    for key in ("package", "publicKey"):
+        value = _to_str(tool["digests"].get(key))
+        if value:
+            digests[key] = value
+    return digests
+
+
+def get_metadata(report_data):
+    tool = _get_tool_metadata(report_data)
+    if "webCatalogOnly" in tool:
+        web_catalog_only = _to_bool(tool["webCatalogOnly"])
+    else:
+        web_catalog_only = _to_bool(tool.get("providerControlledDelivery"))
+
+    return {
+        "vendorType": _to_str(tool["profile"]["VendorType"]),
+        "profileVersion": _to_str(tool["profile"]["version"]),
+        "webCatalogOnly": web_catalog_only,
+        "chart-uri": _to_str(tool.get("chart-uri")),
+        "chart": _convert_chart(report_data["metadata"]["chart"] or {}),
+    }
+
+
+def summarize(report_path):
+    """Produce the annotations, digests and metadata sections of a report summary.
+
+    Args:
+        report_path (str): Path to the report.yaml file.
+
+    Returns:
+        dict: The summary, in the same format as the output of "chart-verifier report".
+
+    Raises:
+        SummaryUnavailable: If the report can't be summarized in-process and
+                            chart-verifier must be used instead.
+    """
+    try:
+        report_data = load_report(report_path)
+    except (OSError, yaml.YAMLError) as e:
+        raise SummaryUnavailable(f"Failed to load report: {e}") from e
+
+    if not isinstance(report_data, dict):
+        raise SummaryUnavailable("Report is not a YAML mapping")
+
+    report_digest = _to_str(_get_tool_metadata(report_data).get("reportDigest"))
+    if report_digest and report_digest != get_report_digest(report_data):
+        raise SummaryUnavailable("Report digest does not match the report content")
+
+    return {
+        "annotations": get_annotations(report_data),
+        "digests": get_digests(report_data),
+        "metadata": get_metadata(report_data),
+    }
@@ -0,0 +1,276 @@
+"""Unit and conformance tests for the in-process report summary engine.
+
+The conformance tests run the engine against every report.yaml submitted under the
+charts/ directory of this repository. The reportDigest of these reports was computed
+by chart-verifier, from 1.9.0 to 1.16.0, and must match the digest computed here. When
+chart-verifier is available on the PATH, the output of the engine is also compared with
+the output of "chart-verifier report all".
+
+"""
+
+import glob
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from report import report_summary, verifier_report
+
+CHARTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "charts")
+SUBMITTED_REPORTS = sorted(
+    glob.glob(os.path.join(CHARTS_DIR, "**", "report.yaml"), recursive=True)
+)
+DIGEST_REPORT = os.path.join(
+    CHARTS_DIR, "community", "ai-lab", "chatbot-ai-sample", "0.1.1", "report.yaml"
+)
+# Submitted reports modified after chart-verifier computed their reportDigest
+MODIFIED_REPORTS = [
+    os.path.join(CHARTS_DIR, "partners", "flomesh", "osm-edge", "1.2.1-ubi8"),
+    os.path.join(
+        CHARTS_DIR, "partners", "vitagroupag", "cdr-core-ehrbase-enterprise", "0.1.8"
+    ),
+]
+
+report_v1_1 = """\
+apiversion: v1
+kind: verify-report
+metadata:
+    tool:
+        verifier-version: 1.13.8
+        profile:
+            VendorType: partner
+            version: v1.1
+        chart-uri: https://example.com/awesome-1.10.tgz
+        digests:
+            chart: sha256:0123
+            package: "4567"
+        lastCertifiedTimestamp: "2025-02-05T17:30:50.743167+00:00"
+        testedOpenShiftVersion: "4.15"
+        supportedOpenShiftVersions: '>=4.14'
+        webCatalogOnly: true
+    chart:
+        name: awesome
+        home: ""
+        sources: []
+        version: 1.10
+        description: An awesome chart
+        keywords:
+            - awesome
+        maintainers:
+            - name: Acme
+              email: ""
+              url: https://example.com
+        icon: ""
+        apiversion: v2
+        condition: ""
+        tags: ""
+        appversion: ""
+        deprecated: false
+        annotations:
+            charts.openshift.io/name: Awesome
+        kubeversion: '>= 1.27.0-0'
+        dependencies:
+            - name: common
+              version: 1.0.0
+              repository: https://example.com/charts
+              condition: ""
+              tags: []
+              enabled: false
+              importvalues: []
+              alias: ""
+        type: application
+    chart-overrides: ""
+results: []
+"""
+
+report_v1_0 = """\
+apiversion: v1
+kind: verify-report
+metadata:
+    tool:
+        verifier-version: 1.2.3
+        profile:
+            VendorType: redhat
+            version: v1.0
+        chart-uri: https://example.com/awesome-1.0.0.tgz
+        digests:
+            chart: sha256:0123
+        lastCertifiedTimestamp: "2021-06-01T10:00:00.000000+00:00"
+        certifiedOpenShiftVersions: 4.7.0
+        providerControlledDelivery: false
+    chart:
+        name: awesome
+        version: 1.0.0
+    chart-overrides: ""
+results: []
+"""
+
+
+def write_report(tmp_path, content):
+    p = tmp_path / "report.yaml"
+    p.write_text(content)
+    return str(p)
+
+
+def test_summarize(tmp_path):
+    summary = report_summary.summarize(write_report(tmp_path, report_v1_1))
+
+    assert summary["annotations"] == [
+        {"name": "charts.openshift.io/digest", "value": "sha256:0123"},
+        {
+            "name": "charts.openshift.io/lastCertifiedTimestamp",
+            "value": "2025-02-05T17:30:50.743167+00:00",
+        },
+        {"name": "charts.openshift.io/testedOpenShiftVersion", "value": "4.15"},
+        {"name": "charts.openshift.io/supportedOpenShiftVersions", "value": ">=4.14"},
+    ]
+    assert summary["digests"] == {"chart": "sha256:0123", "package": "4567"}
+    assert summary["metadata"] == {
+        "vendorType": "partner",
+        "profileVersion": "v1.1",
+        "webCatalogOnly": True,
+        "chart-uri": "https://example.com/awesome-1.10.tgz",
+        "chart": {
+            "name": "awesome",
+            "version": "1.10",
+            "description": "An awesome chart",
+            "keywords": ["awesome"],
+            "maintainers": [{"name": "Acme", "url": "https://example.com"}],
+            "apiVersion": "v2",
+            "annotations": {"charts.openshift.io/name": "Awesome"},
+            "kubeVersion": ">= 1.27.0-0",
+            "dependencies": [
+                {
+                    "name": "common",
+                    "version": "1.0.0",
+                    "repository": "https://example.com/charts",
+                }
+            ],
+            "type": "application",
+        },
+    }
+
+
+def test_summarize_v1_0_profile(tmp_path):
+    summary = report_summary.summarize(write_report(tmp_path, report_v1_0))
+
+    assert summary["annotations"] == [
+        {"name": "charts.openshift.io/digest", "value": "sha256:0123"},
+        {
+            "name": "charts.openshift.io/lastCertifiedTimestamp",
+            "value": "2021-06-01T10:00:00.000000+00:00",
+        },
+        {"name": "charts.openshift.io/certifiedOpenShiftVersions", "value": "4.7.0"},
+    ]
+    assert summary["digests"] == {"chart": "sha256:0123"}
+    assert not summary["metadata"]["webCatalogOnly"]
+
+
+def test_report_digest(tmp_path):
+    report_data = report_summary.load_report(DIGEST_REPORT)
+    digest = report_data["metadata"]["tool"]["reportDigest"]
+    assert report_summary.get_report_digest(report_data) == digest
+    summary = report_summary.summarize(DIGEST_REPORT)
+    assert summary["metadata"]["chart"]["name"] == "chatbot-ai-sample"
+
+    with open(DIGEST_REPORT) as fd:
+        content = fd.read()
+    # Fields covered by the digest
+    for old, new in [
+        ("chart-uri: ", "chart-uri: x"),
+        ("outcome: PASS", "outcome: FAIL"),
+        ("name: chatbot-ai-sample", "name: chatbot"),
+    ]:
+        modified = write_report(tmp_path, content.replace(old, new, 1))
+        with pytest.raises(report_summary.SummaryUnavailable, match="digest"):
+            report_summary.summarize(modified)
+    # Fields that are not
+    modified = write_report(
+        tmp_path, content.replace("webCatalogOnly: false", "webCatalogOnly: true")
+    )
+    assert report_summary.summarize(modified)["metadata"]["webCatalogOnly"]
+
+
+def test_report_digest_with_import_values(tmp_path):
+    content = report_v1_1.replace(
+        "        chart-uri:", "        reportDigest: uint64:1234\n        chart-uri:"
+    ).replace("importvalues: []", "importvalues:\n                - data")
+    with pytest.raises(report_summary.SummaryUnavailable, match="import values"):
+        report_summary.summarize(write_report(tmp_path, content))
+
+
+def test_incomplete_report_requires_chart_verifier(tmp_path):
+    with pytest.raises(report_summary.SummaryUnavailable):
+        report_summary.summarize(write_report(tmp_path, "kind: verify-report\n"))
+
+
+def test_submitted_report_digests():
+    """The digests computed by chart-verifier match, unless the report was modified."""
+    mismatches = []
+    digests = 0
+    for report_path in SUBMITTED_REPORTS:
+        report_data = report_summary.load_report(report_path)
+        try:
+            digest = report_data["metadata"]["tool"]["reportDigest"]
+        except (KeyError, TypeError):
+            continue
+        digests += 1
+        if report_summary.get_report_digest(report_data) != digest:
+            mismatches.append(os.path.dirname(report_path))
+
+    assert digests > 600
+    assert mismatches == MODIFIED_REPORTS
+
+
+def test_submitted_reports():
+    """Every submitted report is either summarized consistently or left to chart-verifier."""
+    assert SUBMITTED_REPORTS, "No report found under charts/"
+
+    summarized = 0
+    for report_path in SUBMITTED_REPORTS:
+        try:
+            summary = report_summary.summarize(report_path)
+        except report_summary.SummaryUnavailable:
+            continue
+        summarized += 1
+
+        _, report_data = verifier_report.get_report_data(report_path)
+        chart = summary["metadata"]["chart"]
+        assert chart["name"] == report_data["metadata"]["chart"]["name"], report_path
+        assert chart["version"] == str(
+            report_data["metadata"]["chart"]["version"]
+        ), report_path
+        annotations = {a["name"]: a["value"] for a in summary["annotations"]}
+        assert annotations["charts.openshift.io/digest"].startswith("sha256:")
+
+    # Only the incomplete and modified reports are left to chart-verifier
+    assert summarized > len(SUBMITTED_REPORTS) - 20
+
+
+@pytest.mark.skipif(
+    shutil.which("chart-verifier") is None, reason="chart-verifier is not installed"
+)
+def test_conformance_with_chart_verifier():
+    mismatches = []
+    for report_path in SUBMITTED_REPORTS:
+        try:
+            summary = report_summary.summarize(report_path)
+        except report_summary.SummaryUnavailable:
+            continue
+
+        out = subprocess.run(
+            ["chart-verifier", "report", "all", os.path.abspath(report_path)],
+            capture_output=True,
+        )
+        expected = json.loads(out.stdout.decode("utf-8"))
+        for section in ("digests", "metadata"):
+            if summary[section] != expected[section]:
+                mismatches.append(f"{report_path}: {section}")
+        if sorted(summary["annotations"], key=lambda a: a["name"]) != sorted(
+            expected["annotations"], key=lambda a: a["name"]
+        ):
+            mismatches.append(f"{report_path}: annotations")
+
+    assert not mismatches
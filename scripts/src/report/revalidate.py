@@ -0,0 +1,252 @@
+"""Revalidate all the reports submitted in the charts/ tree.
+
+Used when a new OpenShift version or a new chart-verifier version is released, to check
+that the reports of existing charts are still valid, without going through a pull
+request for each chart.
+
+Each charts/<category>/<vendor>/<chart>/<version>/report.yaml is checked with
+verifier_report.validate, and the annotations that would be set in the index are
+computed with indexannotations.getIndexAnnotations. As in CI, the OCP version range of
+each report is derived from the kubeVersion of its chart (see ocp_range), unless a
+range is given to check all the reports against.
+Reports are processed in parallel by a pool of processes. One JSON object is written
+per report as soon as it is checked (JSON lines), followed by a summary per vendor.
+
+The status of each report is "valid", "invalid", or "error" when it couldn't be
+checked because of the environment, e.g. chart-verifier or docker is not available.
+Errors are not counted as invalid reports. The command exits with 1 if a report is
+invalid, and with 2 if a report couldn't be checked.
+
+Reports that can't be summarized in-process are passed to chart-verifier (see
+report_info): set REPORT_CACHE_DIR so that later runs only call it for new reports.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+
+import docker
+
+sys.path.append("../")
+from chartrepomanager import indexannotations
+from report import ocp_range, report_info, verifier_report
+
+STATUS_VALID = "valid"
+STATUS_INVALID = "invalid"
+STATUS_ERROR = "error"
+STATUSES = (STATUS_VALID, STATUS_INVALID, STATUS_ERROR)
+
+# Errors of the tools used to check the reports, rather than of the reports
+TOOL_ERRORS = (OSError, subprocess.CalledProcessError, docker.errors.DockerException)
+# Error logged by report_info when the output of chart-verifier can't be parsed
+TOOL_OUTPUT_ERROR = "[ERROR] loading report output"
+
+
+def find_reports(charts_dir):
+    """List the submitted report.yaml files, sorted by path."""
+    pattern = os.path.join(charts_dir, "*", "*", "*", "*", "report.yaml")
+    return sorted(glob.glob(pattern))
+
+
+def get_report_ocp_range(report_path):
+    """Get the OCP version range a report is checked against in CI.
+
+    The range is converted from the kubeVersion of the chart. As in CI, a conversion
+    error is ignored for the v1.0 profile, which doesn't check the range.
+
+    Args:
+        report_path (str): Path to the report.yaml
+
+    Returns:
+        str: Range of supported OCP versions, empty if the kubeVersion of a v1.0
+             report can't be converted or if the report is incomplete.
+
+    Raises:
+        OCPRangeError: if the kubeVersion can't be converted.
+    """
+    try:
+        metadata = verifier_report.load_report(report_path).data["metadata"]
+        kube_version = metadata["chart"].get("kubeversion")
+        profile_version = str(metadata["tool"]["profile"]["version"])
+    except (KeyError, TypeError, AttributeError):
+        # Incomplete reports are rejected by verifier_report.validate
+        return ""
+    try:
+        return ocp_range.get_ocp_range(kube_version)
+    except ocp_range.OCPRangeError:
+        if profile_version.startswith("v1.0"):
+            return ""
+        raise
+
+
+def revalidate_report(report_path, ocp_version_range=None):
+    """Validate a report and compute its index annotations.
+
+    Args:
+        report_path (str): Path to the report.yaml, as
+            charts/<category>/<vendor>/<chart>/<version>/report.yaml
+        ocp_version_range (str): Range of supported OCP versions, derived from the
+                                 kubeVersion of the chart if None
+
+    Returns:
+        dict: The result for this report, with a "status" field set to "valid",
+              "invalid" or "error", and a "message" field explaining why the report
+              is invalid or couldn't be checked. The "valid" field is True or False,
+              or None if the report couldn't be checked.
+    """
+    category, vendor, chart, version = report_path.split(os.sep)[-5:-1]
+    result = {
+        "path": report_path,
+        "category": category,
+        "vendor": vendor,
+        "chart": chart,
+        "version": version,
+    }
+
+    # The checks are verbose: only keep their output to report errors.
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            if ocp_version_range is None:
+                try:
+                    ocp_version_range = get_report_ocp_range(report_path)
+                except ocp_range.OCPRangeError as e:
+                    print(f"[ERROR] Error converting kubeVersion to an OCP range: {e}")
+                    raise
+            result["ocp_version_range"] = ocp_version_range
+            valid, message = verifier_report.validate(report_path, ocp_version_range)
+            if valid:
+                result["annotations"] = indexannotations.getIndexAnnotations(
+                    ocp_version_range, report_path
+                )
+    except (Exception, SystemExit) as err:
+        errors = [line for line in output.getvalue().splitlines() if "[ERROR]" in line]
+        message = errors[-1] if errors else f"{type(err).__name__}: {err}"
+        if isinstance(err, TOOL_ERRORS) or (
+            isinstance(err, SystemExit)
+            and TOOL_OUTPUT_ERROR in output.getvalue()
+            and report_info.SHA_ERROR not in output.getvalue()
+        ):
+            status = STATUS_ERROR
+            valid = None
+        else:
+            status = STATUS_INVALID
+            valid = False
+    else:
+        status = STATUS_VALID if valid else STATUS_INVALID
+
+    result["status"] = status
+    result["valid"] = valid
+    result["message"] = message
+    return result
+
+
+def _revalidate_report(args):
+    return revalidate_report(*args)
+
+
+def revalidate(report_paths, ocp_version_range=None, jobs=None):
+    """Revalidate the given reports in a pool of processes.
+
+    The reports are checked against ocp_version_range if set, or else against the
+    range derived from the kubeVersion of their chart.
+
+    Yields:
+        dict: The result of each report (see revalidate_report), in the order of
+              report_paths.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(
+            _revalidate_report,
+            [(path, ocp_version_range) for path in report_paths],
+            chunksize=16,
+        )
+
+
+def print_summary(summary, out):
+    print(f"{'vendor':<40}" + "".join(f" {s:>7}" for s in STATUSES), file=out)
+    for vendor in sorted(summary):
+        counts = summary[vendor]
+        print(f"{vendor:<40}" + "".join(f" {counts[s]:>7}" for s in STATUSES), file=out)
+    totals = {s: sum(counts[s] for counts in summary.values()) for s in STATUSES}
+    print(f"{'total':<40}" + "".join(f" {totals[s]:>7}" for s in STATUSES), file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c",
+        "--charts-dir",
+        dest="charts_dir",
+        type=str,
+        default="charts",
+        help="path to the charts directory of the repository",
+    )
+    parser.add_argument(
+        "-r",
+        "--ocp-version-range",
+        dest="ocp_version_range",
+        type=str,
+        default=os.environ.get("OCP_VERSION_RANGE"),
+        help="range of supported OCP versions to check all the reports against "
+        "(defaults to $OCP_VERSION_RANGE, or else to the range derived from the "
+        "kubeVersion of each chart, as in CI)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=None,
+        help="number of processes (defaults to the number of CPUs)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        type=str,
+        default="-",
+        help="file to write the JSON lines results to (defaults to stdout)",
+    )
+    args = parser.parse_args()
+
+    report_paths = find_reports(args.charts_dir)
+    if not report_paths:
+        print(f"[ERROR] No report found in {args.charts_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output == "-":
+        out = contextlib.nullcontext(sys.stdout)
+        summary_out = sys.stderr
+    else:
+        out = open(args.output, "w")
+        summary_out = sys.stdout
+
+    summary = collections.defaultdict(collections.Counter)
+    with out as fd:
+        for result in revalidate(report_paths, args.ocp_version_range, args.jobs):
+            fd.write(json.dumps(result) + "\n")
+            fd.flush()
+            summary[result["vendor"]][result["status"]] += 1
+
+    print_summary(summary, summary_out)
+
+    if any(counts[STATUS_ERROR] for counts in summary.values()):
+        print(
+            "[ERROR] Some reports couldn't be checked, see their messages",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    if any(counts[STATUS_INVALID] for counts in summary.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
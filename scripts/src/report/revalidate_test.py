@@ -0,0 +1,136 @@
+import os
+
+import pytest
+
+from report import report_info, revalidate
+
+CHARTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "charts")
+# Reports summarized in-process, without chart-verifier
+VALID_REPORT = os.path.join(
+    CHARTS_DIR, "community", "redhat", "redhat-wildfly", "1.4.0", "report.yaml"
+)
+KUBE_VERSION_REPORT = os.path.join(
+    CHARTS_DIR, "partners", "castai", "castai-agent", "0.52.0", "report.yaml"
+)
+INVALID_REPORT = os.path.join(
+    CHARTS_DIR,
+    "partners",
+    "a60924148a9b77a2ff5f7b786",
+    "testchart411",
+    "0.1.8",
+    "report.yaml",
+)
+# Report modified after its reportDigest was computed, only checked by chart-verifier
+MODIFIED_REPORT = os.path.join(
+    CHARTS_DIR,
+    "partners",
+    "vitagroupag",
+    "cdr-core-ehrbase-enterprise",
+    "0.1.8",
+    "report.yaml",
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_report_infos(monkeypatch):
+    monkeypatch.setattr(report_info, "_report_infos", {})
+    monkeypatch.delenv("VERIFIER_IMAGE", raising=False)
+    monkeypatch.delenv("REPORT_CACHE_DIR", raising=False)
+
+
+def test_find_reports(tmp_path):
+    version_dir = tmp_path / "charts" / "partners" / "acme" / "awesome" / "1.42.0"
+    version_dir.mkdir(parents=True)
+    (version_dir / "report.yaml").write_text("kind: something-else\n")
+
+    report_paths = revalidate.find_reports(str(tmp_path / "charts"))
+    assert report_paths == [str(version_dir / "report.yaml")]
+
+    result = revalidate.revalidate_report(report_paths[0], ">=4.12")
+    assert result["vendor"] == "acme"
+    assert result["chart"] == "awesome"
+    assert result["version"] == "1.42.0"
+    assert result["status"] == revalidate.STATUS_INVALID
+    assert result["message"].startswith("Report is incomplete")
+
+
+def test_valid_report():
+    result = revalidate.revalidate_report(VALID_REPORT, ">=4.6")
+
+    assert result["status"] == revalidate.STATUS_VALID
+    assert result["valid"]
+    assert result["annotations"]["charts.openshift.io/testedOpenShiftVersion"] == "4.7"
+    assert (
+        result["annotations"]["charts.openshift.io/supportedOpenShiftVersions"]
+        == ">=4.6"
+    )
+
+
+def test_ocp_version_range_from_kube_version():
+    # The kubeVersion of the chart is ">= 1.19"
+    assert revalidate.get_report_ocp_range(KUBE_VERSION_REPORT) == ">=4.6"
+
+    result = revalidate.revalidate_report(KUBE_VERSION_REPORT)
+
+    assert result["status"] == revalidate.STATUS_VALID
+    assert result["ocp_version_range"] == ">=4.6"
+    # Another range can still be forced
+    result = revalidate.revalidate_report(KUBE_VERSION_REPORT, ">=4.8")
+    assert result["status"] == revalidate.STATUS_INVALID
+    assert "does not match supportedOpenShiftVersions" in result["message"]
+
+
+def test_ocp_version_range_without_kube_version(tmp_path):
+    # The range is not checked for the v1.0 profile
+    assert revalidate.get_report_ocp_range(VALID_REPORT) == ""
+    assert revalidate.revalidate_report(VALID_REPORT)["valid"]
+
+    report = open(KUBE_VERSION_REPORT).read()
+    report_path = tmp_path / "report.yaml"
+    report_path.write_text(report.replace("kubeversion: '>= 1.19'", "kubeversion: ''"))
+
+    result = revalidate.revalidate_report(str(report_path))
+
+    assert result["status"] == revalidate.STATUS_INVALID
+    assert "Error converting kubeVersion to an OCP range" in result["message"]
+
+
+def test_invalid_report():
+    result = revalidate.revalidate_report(INVALID_REPORT, ">=4.6")
+
+    assert result["status"] == revalidate.STATUS_INVALID
+    assert result["valid"] is False
+    assert "does not match supportedOpenShiftVersions" in result["message"]
+    assert "annotations" not in result
+
+
+def test_missing_chart_verifier(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    report_info._get_verifier_binary_version.cache_clear()
+
+    result = revalidate.revalidate_report(MODIFIED_REPORT, ">=4.6")
+
+    assert result["status"] == revalidate.STATUS_ERROR
+    assert result["valid"] is None
+    assert "chart-verifier" in result["message"]
+
+
+def test_main_exit_status(tmp_path, monkeypatch, capsys):
+    charts_dir = tmp_path / "charts"
+    for report_path in (VALID_REPORT, MODIFIED_REPORT):
+        category, vendor, chart, version = report_path.split(os.sep)[-5:-1]
+        version_dir = charts_dir / category / vendor / chart / version
+        version_dir.mkdir(parents=True)
+        (version_dir / "report.yaml").write_bytes(open(report_path, "rb").read())
+    monkeypatch.setenv("PATH", str(tmp_path))
+    monkeypatch.setattr(
+        "sys.argv", ["revalidate", "-c", str(charts_dir), "-r", ">=4.6", "-j", "1"]
+    )
+
+    with pytest.raises(SystemExit) as e:
+        revalidate.main()
+
+    assert e.value.code == 2
+    summary = capsys.readouterr().err
+    assert "redhat" in summary and "vitagroupag" in summary
+    assert summary.splitlines()[-2].split() == ["total", "1", "0", "1"]
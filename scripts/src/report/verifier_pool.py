@@ -0,0 +1,120 @@
+"""Pool of long-lived chart-verifier containers.
+
+Running "chart-verifier report" with docker's containers.run creates, starts and removes
+a container for every call. Instead, the pool starts one container per verifier image
+and report directory, kept alive for the duration of the job, and runs the verifier in
+it using exec. All containers are removed when the process exits.
+
+Pooling is used whenever report_info runs chart-verifier in a container (i.e. when the
+VERIFIER_IMAGE environment variable is set). It can be disabled by setting the
+VERIFIER_POOL environment variable to "false", in which case a new container is run
+for every call.
+"""
+
+import atexit
+import os
+
+import docker
+
+POOL_ENV = "VERIFIER_POOL"
+MOUNT_POINT = "/charts/"
+
+# Command used to keep the container alive, in place of the entrypoint of the image.
+KEEPALIVE_COMMAND = ["sleep", "2147483647"]
+
+
+def is_enabled():
+    return os.environ.get(POOL_ENV, "true").lower() not in ("false", "0", "no")
+
+
+class VerifierContainer:
+    """A running verifier container with a report directory mounted on MOUNT_POINT."""
+
+    def __init__(self, client, image, report_directory):
+        self.image = image
+        self.report_directory = report_directory
+
+        # Commands are exec'ed with the original entrypoint of the image (i.e. the
+        # chart-verifier binary), since it is replaced to keep the container alive.
+        config = client.images.get(image).attrs.get("Config") or {}
+        self.entrypoint = config.get("Entrypoint") or []
+
+        print(
+            f"[INFO] Start verifier container using image: {image}, report directory: {report_directory}"
+        )
+        self.container = client.containers.run(
+            image,
+            entrypoint=KEEPALIVE_COMMAND,
+            detach=True,
+            volumes={report_directory: {"bind": MOUNT_POINT, "mode": "rw"}},
+        )
+
+    def run(self, args):
+        """Run the verifier in the container with the given arguments.
+
+        Args:
+            args (list): Arguments passed to the entrypoint of the image.
+
+        Returns:
+            str: Standard output of the command, followed by its standard error if
+                 it failed, so that the error message (e.g. report_info.SHA_ERROR)
+                 reaches the caller.
+        """
+        exit_code, (stdout, stderr) = self.container.exec_run(
+            self.entrypoint + args, stdout=True, stderr=True, demux=True
+        )
+        stdout = (stdout or b"").decode("utf-8")
+        stderr = (stderr or b"").decode("utf-8")
+        if exit_code != 0:
+            print(f"[ERROR] Verifier exited with code {exit_code}: {stderr.strip()}")
+            return stdout + stderr
+        return stdout
+
+    def remove(self):
+        print(f"[INFO] Remove verifier container: {self.container.short_id}")
+        try:
+            self.container.remove(force=True)
+        except docker.errors.APIError as err:
+            print(f"[WARNING] Failed to remove verifier container: {err}")
+
+
+class VerifierPool:
+    """Verifier containers, indexed by image and report directory."""
+
+    def __init__(self, client=None):
+        self._client = client
+        self.containers = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = docker.from_env()
+        return self._client
+
+    def get(self, image, report_directory):
+        """Return the container for the given image and report directory, starting it
+        on first use."""
+        key = (image, report_directory)
+        if key not in self.containers:
+            self.containers[key] = VerifierContainer(
+                self.client, image, report_directory
+            )
+        return self.containers[key]
+
+    def close(self):
+        """Remove all the containers of the pool."""
+        while self.containers:
+            _, container = self.containers.popitem()
+            container.remove()
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the pool of the current process, removed at exit."""
+    global _pool
+    if _pool is None:
+        _pool = VerifierPool()
+        atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,136 @@
+"""Compare cold container runs with pooled exec for the chartprreview sequence.
+
+The benchmark replays the report_info calls made by chartprreview for a submitted
+report and a report generated in a different directory, either with a new container
+per verifier run (VERIFIER_POOL=false) or with the verifier pool.
+
+By default, it runs against a local stand-in image that prints a canned
+"chart-verifier report all" output, so that only the container overhead is measured:
+
+    python verifier_pool_benchmark.py --iterations 10
+
+Use --image to run it against a real chart-verifier image instead.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import docker
+
+sys.path.append("../")
+from report import report_info, verifier_pool
+
+STANDIN_TAG = "chart-verifier-standin:benchmark"
+
+report_all_output = {
+    "annotations": [{"name": "charts.openshift.io/digest", "value": "sha256:0123"}],
+    "results": {"passed": "12", "failed": "0", "message": []},
+    "digests": {"chart": "sha256:0123", "package": "4567"},
+    "metadata": {
+        "vendorType": "partner",
+        "profileVersion": "v1.3",
+        "chart-uri": "https://example.com/awesome-1.42.0.tgz",
+        "chart": {"name": "awesome", "version": "1.42.0"},
+    },
+}
+
+
+def build_standin_image(client):
+    """Build an image with the same entrypoint layout as chart-verifier."""
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "output.json"), "w") as fd:
+            json.dump(report_all_output, fd)
+        with open(os.path.join(directory, "Dockerfile"), "w") as fd:
+            fd.write(
+                "FROM busybox\n"
+                "COPY output.json /app/output.json\n"
+                'RUN printf "#!/bin/sh\\ncat /app/output.json\\n" > /app/chart-verifier'
+                " && chmod +x /app/chart-verifier\n"
+                'ENTRYPOINT ["/app/chart-verifier"]\n'
+            )
+        client.images.build(path=directory, tag=STANDIN_TAG, rm=True)
+    return STANDIN_TAG
+
+
+def make_report(directory):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "report.yaml")
+    with open(path, "w") as fd:
+        # Not a complete report, so that report_info always calls the verifier.
+        fd.write("kind: verify-report\n")
+    return path
+
+
+def chartprreview_sequence(submitted_report, generated_report):
+    """report_info calls made by chartprreview, in order."""
+    report_info.get_report_digests(report_path=submitted_report)
+    report_info.get_report_digests(report_path=generated_report)
+    report_info.get_report_chart_url(report_path=submitted_report)
+    report_info.get_report_chart(report_path=submitted_report)
+    report_info.get_report_chart(report_path=generated_report)
+    report_info.get_report_metadata(report_path=submitted_report)
+    report_info.get_report_annotations(report_path=submitted_report)
+    report_info.get_report_results(
+        report_path=generated_report, profile_type="partner", profile_version="v1.3"
+    )
+
+
+def run(submitted_report, generated_report, iterations, pooled):
+    os.environ[verifier_pool.POOL_ENV] = "true" if pooled else "false"
+    timings = []
+    for _ in range(iterations):
+        # Each iteration is a new job: nothing is memoized between them.
+        report_info._report_infos = {}
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            chartprreview_sequence(submitted_report, generated_report)
+        timings.append(time.perf_counter() - start)
+
+    if pooled:
+        with contextlib.redirect_stdout(io.StringIO()):
+            verifier_pool.get_pool().close()
+    return timings
+
+
+def print_timings(name, timings):
+    print(
+        f"{name:<12} first={timings[0]:.3f}s median={statistics.median(timings):.3f}s "
+        f"total={sum(timings):.3f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--image", help="verifier image to use instead of the stand-in image"
+    )
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    image = args.image or build_standin_image(docker.from_env())
+    os.environ["VERIFIER_IMAGE"] = image
+    os.environ.pop("REPORT_CACHE_DIR", None)
+
+    with tempfile.TemporaryDirectory() as directory:
+        submitted_report = make_report(os.path.join(directory, "submitted"))
+        generated_report = make_report(os.path.join(directory, "generated"))
+
+        print(f"image: {image}, iterations: {args.iterations}")
+        cold = run(submitted_report, generated_report, args.iterations, pooled=False)
+        print_timings("cold run", cold)
+        pooled = run(submitted_report, generated_report, args.iterations, pooled=True)
+        print_timings("pooled exec", pooled)
+        print(
+            f"speedup (median): {statistics.median(cold) / statistics.median(pooled):.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from report import report_info, verifier_pool
+
+
+class FakeContainer:
+    short_id = "0123"
+
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self.commands = []
+        self.removed = False
+        self.result = (0, (b'{"results": {}}', None))
+
+    def exec_run(self, cmd, stdout=True, stderr=True, demux=False):
+        assert demux
+        self.commands.append(cmd)
+        return self.result
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeImage:
+    attrs = {"Config": {"Entrypoint": ["/app/chart-verifier"]}}
+
+
+class FakeClient:
+    def __init__(self):
+        self.started = []
+        client = self
+
+        class Images:
+            def get(self, image):
+                return FakeImage()
+
+        class Containers:
+            def run(self, image, **kwargs):
+                container = FakeContainer(kwargs)
+                client.started.append(container)
+                return container
+
+        self.images = Images()
+        self.containers = Containers()
+
+
+def test_container_is_reused_per_report_directory():
+    client = FakeClient()
+    pool = verifier_pool.VerifierPool(client)
+
+    first = pool.get("verifier:test", "/tmp/a")
+    assert first.run(["report", "all", "/charts/report.yaml"]) == '{"results": {}}'
+    assert pool.get("verifier:test", "/tmp/a") is first
+    pool.get("verifier:test", "/tmp/b")
+
+    assert len(client.started) == 2
+    assert client.started[0].kwargs["volumes"] == {
+        "/tmp/a": {"bind": verifier_pool.MOUNT_POINT, "mode": "rw"}
+    }
+    assert client.started[0].commands == [
+        ["/app/chart-verifier", "report", "all", "/charts/report.yaml"]
+    ]
+
+
+def test_run_failure_returns_stderr():
+    client = FakeClient()
+    container = verifier_pool.VerifierPool(client).get("verifier:test", "/tmp/a")
+    client.started[0].result = (1, (None, f"{report_info.SHA_ERROR}\n".encode()))
+
+    output = container.run(["report", "all", "/charts/report.yaml"])
+
+    assert report_info.SHA_ERROR in output
+
+
+def test_run_success_ignores_stderr():
+    client = FakeClient()
+    container = verifier_pool.VerifierPool(client).get("verifier:test", "/tmp/a")
+    client.started[0].result = (0, (b'{"results": {}}', b"warning: deprecated\n"))
+
+    assert container.run(["report", "all", "/charts/report.yaml"]) == (
+        '{"results": {}}'
+    )
+
+
+def test_close_removes_containers():
+    client = FakeClient()
+    pool = verifier_pool.VerifierPool(client)
+    pool.get("verifier:test", "/tmp/a")
+    pool.get("verifier:test", "/tmp/b")
+
+    pool.close()
+
+    assert all(c.removed for c in client.started)
+    assert pool.containers == {}
+
+
+def test_pool_can_be_disabled(monkeypatch):
+    monkeypatch.delenv(verifier_pool.POOL_ENV, raising=False)
+    assert verifier_pool.is_enabled()
+    monkeypatch.setenv(verifier_pool.POOL_ENV, "false")
+    assert not verifier_pool.is_enabled()
@@ -23,6 +23,7 @@ A tampered report is only determined if the chart-testing check has passed:
 These are not comprehensive lists - other certification checks will preform further checks
 """
 
+import os
 import sys
 
 import semantic_version
@@ -47,9 +48,183 @@ class ConfigKeyMissing(Exception):
     pass
 
 
+class VerifierReport:
+    """Parsed content of a report.yaml, with indexed accessors.
+
+    Results are indexed by check name (e.g. "chart-testing" for "v1.1/chart-testing")
+    the first time a result is requested, so that looking up the result of a check
+    does not require scanning all the results.
+
+    Use load_report to get the VerifierReport of a report.yaml file: reports are only
+    parsed once as long as the file is not modified.
+
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._results = None
+
+    @property
+    def tool(self):
+        return self.data["metadata"]["tool"]
+
+    def _index_results(self):
+        results = {}
+        for result in self.data["results"]:
+            name = result["check"].rsplit("/", 1)[-1]
+            results.setdefault(name, []).append(result)
+        return results
+
+    def get_result(self, check_name):
+        """Get the result of a given check.
+
+        Args:
+            check_name (str): The name of the check to get the result for, e.g.
+                "/chart-testing". The name of the check in the report must end with
+                check_name.
+
+        Returns:
+            (bool, str): a boolean to True if the test passed, false otherwise
+                         and the corresponding "reason" field.
+        """
+        if "/" in check_name:
+            if self._results is None:
+                self._results = self._index_results()
+            candidates = self._results.get(check_name.rsplit("/", 1)[-1], [])
+        else:
+            candidates = self.data["results"]
+
+        for result in candidates:
+            if result["check"].endswith(check_name):
+                return result["outcome"] == "PASS", result["reason"]
+        return False, "Not Found"
+
+    @property
+    def profile_version(self):
+        """Version of the profile used, without the "v" prefix (e.g. "1.1")."""
+        profile_version = "1.1"
+        try:
+            profile_version = self.tool["profile"]["version"][1:]
+        except Exception:
+            pass
+        return profile_version
+
+    def get_web_catalog_only(self, raise_if_missing=False):
+        """Check the delivery method set in the report.
+
+        Args:
+            raise_if_missing (bool, optional): Whether to raise an Exception if the
+                delivery method is not set in the report. If set to False, the function
+                returns False.
+
+        Raises:
+            ConfigKeyMissing: if the key is not found in the report and
+                raise_if_missing is set to True
+
+        """
+        keyFound = False
+        web_catalog_only = False
+        try:
+            if "webCatalogOnly" in self.tool:
+                web_catalog_only = self.tool["webCatalogOnly"]
+                keyFound = True
+            if "providerControlledDelivery" in self.tool:
+                web_catalog_only = self.tool["providerControlledDelivery"]
+                keyFound = True
+        except Exception as err:
+            print(
+                f"Exception getting webCatalogOnly/providerControlledDelivery {err=}, {type(err)=}"
+            )
+            pass
+
+        if not keyFound and raise_if_missing:
+            raise ConfigKeyMissing(
+                "Neither webCatalogOnly nor providerControlledDelivery keys were set"
+            )
+
+        return web_catalog_only
+
+    @property
+    def web_catalog_only(self):
+        return self.get_web_catalog_only()
+
+    def _get_digest(self, name):
+        digest = None
+        try:
+            digests = self.tool["digests"]
+            if name in digests:
+                digest = digests[name]
+        except Exception as err:
+            print(f"Exception getting {name} digest {err=}, {type(err)=}")
+            pass
+        return digest
+
+    @property
+    def package_digest(self):
+        """The package digest from report.yaml. Set to None if not found."""
+        return self._get_digest("package")
+
+    @property
+    def public_key_digest(self):
+        """The public key digest from report.yaml. Set to None if not found."""
+        return self._get_digest("publicKey")
+
+
+# Parsed reports, indexed by absolute path. Each entry also holds the modification time
+# and size of the file when it was parsed, to detect changes.
+_reports = {}
+
+# Cached reports, indexed by the id of their data, so that the module level functions
+# called with the data returned by get_report_data reuse the corresponding report.
+_reports_by_data = {}
+
+
+def load_report(report_path):
+    """Load the report.yaml at report_path, parsing it only if it was modified.
+
+    Args:
+        report_path (str): Path to the report.yaml file.
+
+    Returns:
+        VerifierReport: The parsed report.
+
+    Raises:
+        OSError: if the file can't be read.
+        yaml.YAMLError: if the file isn't valid YAML.
+    """
+    path = os.path.abspath(report_path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    cached = _reports.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path) as report_data:
+        report = VerifierReport(yaml.load(report_data, Loader=SafeLoader))
+
+    if cached:
+        _reports_by_data.pop(id(cached[1].data), None)
+    _reports[path] = (stamp, report)
+    _reports_by_data[id(report.data)] = report
+    return report
+
+
+def _as_report(report_data):
+    if isinstance(report_data, VerifierReport):
+        return report_data
+    report = _reports_by_data.get(id(report_data))
+    if report is not None and report.data is report_data:
+        return report
+    return VerifierReport(report_data)
+
+
 def get_report_data(report_path):
     """Load and returns the report data contained in report.yaml
 
+    The report is only parsed once as long as the file is not modified, so the
+    returned content is shared between callers and must not be modified.
+
     Args:
         report_path (str): Path to the report.yaml file.
 
@@ -58,9 +233,7 @@ def get_report_data(report_path):
                       content of the report.yaml file.
     """
     try:
-        with open(report_path) as report_data:
-            report_content = yaml.load(report_data, Loader=SafeLoader)
-        return True, report_content
+        return True, load_report(report_path).data
     except Exception as err:
         print(f"Exception 2 loading file: {err}")
         return False, ""
@@ -77,15 +250,7 @@ def get_result(report_data, check_name):
         (bool, str): a boolean to True if the test passed, false otherwise
                      and the corresponding "reason" field.
     """
-    outcome = False
-    reason = "Not Found"
-    for result in report_data["results"]:
-        if result["check"].endswith(check_name):
-            reason = result["reason"]
-            if result["outcome"] == "PASS":
-                outcome = True
-            break
-    return outcome, reason
+    return _as_report(report_data).get_result(check_name)
 
 
 def get_chart_testing_result(report_data):
@@ -101,12 +266,7 @@ def get_signature_is_valid_result(report_data):
 
 
 def get_profile_version(report_data):
-    profile_version = "1.1"
-    try:
-        profile_version = report_data["metadata"]["tool"]["profile"]["version"][1:]
-    except Exception:
-        pass
-    return profile_version
+    return _as_report(report_data).profile_version
 
 
 def get_web_catalog_only(report_data, raise_if_missing=False):
@@ -122,41 +282,11 @@ def get_web_catalog_only(report_data, raise_if_missing=False):
         ConfigKeyMissing: if the key is not found in OWNERS and raise_if_missing is set to True
 
     """
-    keyFound = False
-    web_catalog_only = False
-    try:
-        if "webCatalogOnly" in report_data["metadata"]["tool"]:
-            web_catalog_only = report_data["metadata"]["tool"]["webCatalogOnly"]
-            keyFound = True
-        if "providerControlledDelivery" in report_data["metadata"]["tool"]:
-            web_catalog_only = report_data["metadata"]["tool"][
-                "providerControlledDelivery"
-            ]
-            keyFound = True
-    except Exception as err:
-        print(
-            f"Exception getting webCatalogOnly/providerControlledDelivery {err=}, {type(err)=}"
-        )
-        pass
-
-    if not keyFound and raise_if_missing:
-        raise ConfigKeyMissing(
-            "Neither webCatalogOnly nor providerControlledDelivery keys were set"
-        )
-
-    return web_catalog_only
+    return _as_report(report_data).get_web_catalog_only(raise_if_missing)
 
 
 def get_package_digest(report_data):
-    package_digest = None
-    try:
-        digests = report_data["metadata"]["tool"]["digests"]
-        if "package" in digests:
-            package_digest = digests["package"]
-    except Exception as err:
-        print(f"Exception getting package digest {err=}, {type(err)=}")
-        pass
-    return package_digest
+    return _as_report(report_data).package_digest
 
 
 def get_public_key_digest(report_data):
@@ -168,15 +298,7 @@ def get_public_key_digest(report_data):
     Returns:
         str: The public key digest from report.yaml. Set to None if not found.
     """
-    public_key_digest = None
-    try:
-        digests = report_data["metadata"]["tool"]["digests"]
-        if "publicKey" in digests:
-            public_key_digest = digests["publicKey"]
-    except Exception as err:
-        print(f"Exception getting publicKey digest {err=}, {type(err)=}")
-        pass
-    return public_key_digest
+    return _as_report(report_data).public_key_digest
 
 
 def report_is_valid(report_data):
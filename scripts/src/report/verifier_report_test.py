@@ -0,0 +1,85 @@
+import os
+
+from report import verifier_report
+
+report_content = """\
+apiversion: v1
+kind: verify-report
+metadata:
+    tool:
+        profile:
+            VendorType: partner
+            version: v1.2
+        digests:
+            chart: sha256:0123
+            package: "4567"
+        webCatalogOnly: true
+    chart:
+        name: awesome
+        version: 1.42.0
+results:
+    - check: v1.0/has-kubeversion
+      type: Mandatory
+      outcome: PASS
+      reason: Kubernetes version specified
+    - check: v1.1/chart-testing
+      type: Mandatory
+      outcome: FAIL
+      reason: Chart tests have failed
+"""
+
+
+def write_report(tmp_path, content=report_content):
+    p = tmp_path / "report.yaml"
+    p.write_text(content)
+    return str(p)
+
+
+def test_report_is_parsed_once(tmp_path):
+    report_path = write_report(tmp_path)
+
+    report = verifier_report.load_report(report_path)
+    assert verifier_report.load_report(report_path) is report
+
+    _, report_data = verifier_report.get_report_data(report_path)
+    assert report_data is report.data
+
+
+def test_modified_report_is_parsed_again(tmp_path):
+    report_path = write_report(tmp_path)
+    report = verifier_report.load_report(report_path)
+
+    write_report(tmp_path, report_content.replace("v1.2", "v1.3"))
+    os.utime(report_path, ns=(0, 0))
+
+    assert verifier_report.load_report(report_path) is not report
+    assert verifier_report.load_report(report_path).profile_version == "1.3"
+
+
+def test_results(tmp_path):
+    _, report_data = verifier_report.get_report_data(write_report(tmp_path))
+
+    assert verifier_report.get_has_kubeversion_result(report_data) == (
+        True,
+        "Kubernetes version specified",
+    )
+    assert verifier_report.get_chart_testing_result(report_data) == (
+        False,
+        "Chart tests have failed",
+    )
+    assert verifier_report.get_signature_is_valid_result(report_data) == (
+        False,
+        "Not Found",
+    )
+    assert verifier_report.get_result(report_data, "testing")[1] == (
+        "Chart tests have failed"
+    )
+
+
+def test_properties(tmp_path):
+    report = verifier_report.load_report(write_report(tmp_path))
+
+    assert report.profile_version == "1.2"
+    assert report.web_catalog_only is True
+    assert report.package_digest == "4567"
+    assert report.public_key_digest is None
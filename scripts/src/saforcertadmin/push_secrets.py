@@ -27,11 +27,11 @@ import os
 import sys
 from base64 import b64encode
 
-import requests
 from nacl import encoding, public
 
 sys.path.append("../")
 from pullrequest import prartifact
+from tools import github_client
 
 token = os.environ.get("BOT_TOKEN")
 headers = {
@@ -52,7 +52,7 @@ def encrypt(public_key: str, secret_value: str) -> str:
 
 def get_repo_public_key(repo):
     """Get the public key id and key of a github repository"""
-    response = requests.get(
+    response = github_client.get_client().get(
         f"https://api.github.com/repos/{repo}/actions/secrets/public-key",
         headers=headers,
     )
@@ -82,7 +82,7 @@ def get_repo_public_key(repo):
 def get_repo_secrets(repo):
     """Get the list of secret names of a github repository"""
     secret_names = []
-    response = requests.get(
+    response = github_client.get_client().get(
         f"https://api.github.com/repos/{repo}/actions/secrets", headers=headers
     )
     if response.status_code != 200:
@@ -101,7 +101,7 @@ def get_repo_secrets(repo):
 
 def create_or_update_repo_secrets(repo, secret_name, key_id, encrypted_value):
     """Create or update a github repository secret"""
-    response = requests.put(
+    response = github_client.get_client().put(
         f"https://api.github.com/repos/{repo}/actions/secrets/{secret_name}",
         json={"key_id": key_id, "encrypted_value": encrypted_value},
         headers=headers,
@@ -3,23 +3,15 @@ import re
 import tarfile
 from dataclasses import dataclass, field
 
-import requests
 import semver
-import yaml
-
-try:
-    from yaml import CLoader as Loader
-except ImportError:
-    from yaml import Loader
-
 
+from indexfile import index_cache, index_lookup, index_stream
 from owners import owners_file
+from pullrequest import prartifact, prcontext
 from reporegex import matchers
 from report import verifier_report
-from tools import gitutils
+from tools import chart_archive, github_client
 
-xRateLimit = "X-RateLimit-Limit"
-xRateRemain = "X-RateLimit-Remaining"
 REQUEST_TIMEOUT = 10
 
 
@@ -140,11 +132,12 @@ class Chart:
     def get_release_tag(self) -> str:
         return f"{self.organization}-{self.name}-{self.version}"
 
-    def check_index(self, index: dict):
+    def check_index(self, index: dict | index_stream.IndexReader):
         """Check if the chart is present in the Helm index
 
         Args:
-            index (dict): Content of the Helm repo index
+            index (dict | IndexReader): Content of the Helm repo index, or a streaming
+                reader over it.
 
         Raise:
             HelmIndexError if:
@@ -152,15 +145,21 @@ class Chart:
             * The Chart is already present in the index
 
         """
-        try:
-            chart_entry = index["entries"].get(self.name, [])
-        except KeyError as e:
-            raise HelmIndexError(f"Malformed index {index}") from e
+        if isinstance(index, index_stream.IndexReader):
+            try:
+                versions = index.get_versions(self.name)
+            except index_stream.IndexStreamError as e:
+                raise HelmIndexError(f"Malformed index: {e}") from e
+        else:
+            try:
+                chart_entry = index["entries"].get(self.name, [])
+            except KeyError as e:
+                raise HelmIndexError(f"Malformed index {index}") from e
+            versions = [chart["version"] for chart in chart_entry]
 
-        for chart in chart_entry:
-            if chart["version"] == self.version:
-                msg = f"[ERROR] Helm chart release already exists in the index.yaml: {self.version}"
-                raise HelmIndexError(msg)
+        if self.version in versions:
+            msg = f"[ERROR] Helm chart release already exists in the index.yaml: {self.version}"
+            raise HelmIndexError(msg)
 
     def check_release_tag(self, repository: str):
         """Check for the existence of the chart's release tag on the provided repository.
@@ -179,7 +178,9 @@ class Chart:
             "Authorization": f'Bearer {os.environ.get("BOT_TOKEN")}',
         }
         print(f"[INFO] checking tag: {tag_api}")
-        r = requests.head(tag_api, headers=headers, timeout=REQUEST_TIMEOUT)
+        r = github_client.get_client().head(
+            tag_api, headers=headers, timeout=REQUEST_TIMEOUT
+        )
         if r.status_code == 200:
             msg = f"[ERROR] Helm chart release already exists in the GitHub Release/Tag: {tag_name}"
             raise ReleaseTagError(msg)
@@ -261,39 +262,16 @@ class Submission:
     def _get_modified_files(self):
         """Query the GitHub API in order to retrieve the list of files that are added / modified by
         this PR"""
-        page_number = 1
-        max_page_size, page_size = 100, 100
-        files_api_url = re.sub(r"^https://api\.github\.com/", "", self.api_url)
-
-        while page_size == max_page_size:
-            files_api_query = (
-                f"{files_api_url}/files?per_page={page_size}&page={page_number}"
-            )
-            print(f"[INFO] Query files : {files_api_query}")
-
-            try:
-                r = gitutils.github_api(
-                    "get", files_api_query, os.environ.get("BOT_TOKEN")
-                )
-            except SystemExit as e:
-                raise SubmissionError(e) from e
-
-            files = r.json()
-            page_size = len(files)
-            page_number += 1
+        context = prcontext.load_pr_context(self.api_url)
+        if context is not None:
+            print(f"[INFO] Files of {self.api_url} read from the PR context")
+            self.modified_files = list(context.files)
+            return
 
-            if xRateLimit in r.headers:
-                print(f"[DEBUG] {xRateLimit} : {r.headers[xRateLimit]}")
-            if xRateRemain in r.headers:
-                print(f"[DEBUG] {xRateRemain}  : {r.headers[xRateRemain]}")
-
-            if "message" in files:
-                msg = f'[ERROR] getting pr files: {files["message"]}'
-                raise SubmissionError(msg)
-            else:
-                for file in files:
-                    if "filename" in file:
-                        self.modified_files.append(file["filename"])
+        try:
+            self.modified_files = prartifact.list_pr_files(self.api_url)
+        except prartifact.PRFilesError as e:
+            raise SubmissionError(f"[ERROR] getting pr files: {e}") from e
 
     def parse_modified_files(self, repo_path: str = ""):
         """Classify the list of modified files.
@@ -625,7 +603,7 @@ def get_file_type(file_path: str) -> tuple[str, re.Match[str]]:
 
 def download_index_data(
     repository: str, branch: str = "gh-pages", ignore_missing: bool = False
-) -> dict:
+) -> dict | index_stream.IndexReader:
     """Download the helm repository index
 
     Args:
@@ -636,70 +614,93 @@ def download_index_data(
                             download of index.yaml fails.
 
     Returns:
-        dict: The helm repository index
+        dict | IndexReader: The lookup file of the helm repository index if available (see
+            indexfile/index_lookup.py), which holds the versions of each chart. Otherwise, a
+            streaming reader over the index, so that it doesn't need to be loaded.
 
     Raise:
         HelmIndexError if the download fails. If not on the production repository, doesn't raise
             and returns an empty index file instead.
-        HelmIndexError if the index file is not valid YAML.
 
     """
     index_url = f"https://raw.githubusercontent.com/{repository}/{branch}/index.yaml"
-    r = requests.get(index_url, timeout=REQUEST_TIMEOUT)
 
-    data = {"apiVersion": "v1", "entries": {}}
-    if r.status_code != 200:
-        if not ignore_missing:
-            raise HelmIndexError(f"Error retrieving index file at {index_url}")
-    else:
-        try:
-            data = yaml.load(r.text, Loader=Loader)
-        except yaml.YAMLError as e:
-            raise HelmIndexError(f"Error parsing index file at {index_url}") from e
+    # The lookup file holds the versions of each chart, which is all check_index needs
+    try:
+        return index_lookup.get_lookup(index_url, timeout=REQUEST_TIMEOUT)
+    except (index_cache.IndexDownloadError, index_lookup.LookupParseError) as e:
+        print(f"[INFO] index lookup not available, downloading the index instead: {e}")
 
-    return data
+    try:
+        content = index_cache.get_index_content(index_url, timeout=REQUEST_TIMEOUT)
+    except index_cache.IndexDownloadError as e:
+        if not ignore_missing:
+            raise HelmIndexError(f"Error retrieving index file at {index_url}") from e
+        return {"apiVersion": "v1", "entries": {}}
 
+    # Invalid content is reported by check_index, when the index is read
+    return index_stream.IndexReader(content)
 
-def check_tarball_content(tarball_path: str, chart_name: str):
-    """Check the tarball content for errors.
 
-    Checks that the tarball contains a unique directory named after the chart. This directory must contain a Chart.yaml
-    file. The directory may contain additional files or folders. No other files or folder should be placed at the root
-    of the archive.
+def get_tarball_layout_error(members: list[tarfile.TarInfo], chart_name: str) -> str:
+    """Check the layout of the tarball, given its members.
 
     Args:
-        tarball_path (str): Location of the tarball to check on the local filesystem.
+        members (list[tarfile.TarInfo]): Members of the tarball.
         chart_name (str): Name of the corresponding chart.
 
-    Raise:
-        TarballContentError: If an error is found when checking the tarball content
+    Returns:
+        str: The error message if the layout is incorrect, None otherwise.
 
     """
     found_chart_directory = False
     found_chart_yaml = False
     found_file_out_of_dir = False
     expected_chart_file_path = os.path.join(chart_name, "Chart.yaml")
-    with tarfile.open(tarball_path, "r:gz") as tar:
-        tarinfo = tar.next()
-        while tarinfo:
-            if (
-                tarinfo.isdir() and tarinfo.name == chart_name
-            ) or tarinfo.name.startswith(chart_name + "/"):
-                found_chart_directory = True
-                if tarinfo.isfile() and tarinfo.name == expected_chart_file_path:
-                    found_chart_yaml = True
-            else:
-                found_file_out_of_dir = True
-            tarinfo = tar.next()
+    for tarinfo in members:
+        if (tarinfo.isdir() and tarinfo.name == chart_name) or tarinfo.name.startswith(
+            chart_name + "/"
+        ):
+            found_chart_directory = True
+            if tarinfo.isfile() and tarinfo.name == expected_chart_file_path:
+                found_chart_yaml = True
+        else:
+            found_file_out_of_dir = True
 
     if not found_chart_directory:
-        msg = f"[ERROR] Incorrect tarball content: expected a {chart_name} directory"
-        raise TarballContentError(msg)
+        return f"[ERROR] Incorrect tarball content: expected a {chart_name} directory"
 
     if found_file_out_of_dir:
-        msg = f"[ERROR] Incorrect tarball content: found a file outside the {chart_name} directory"
-        raise TarballContentError(msg)
+        return f"[ERROR] Incorrect tarball content: found a file outside the {chart_name} directory"
 
     if not found_chart_yaml:
-        msg = f"[ERROR] Incorrect tarball content: expected a {expected_chart_file_path} file"
-        raise TarballContentError(msg)
+        return f"[ERROR] Incorrect tarball content: expected a {expected_chart_file_path} file"
+
+    return None
+
+
+def check_tarball_content(tarball_path: str, chart_name: str):
+    """Check the tarball content for errors.
+
+    Checks that the tarball contains a unique directory named after the chart. This directory must contain a Chart.yaml
+    file. The directory may contain additional files or folders. No other files or folder should be placed at the root
+    of the archive.
+
+    Args:
+        tarball_path (str): Location of the tarball to check on the local filesystem.
+        chart_name (str): Name of the corresponding chart.
+
+    Raise:
+        TarballContentError: If an error is found when checking the tarball content, or if the tarball can't be read
+            or is too large once decompressed
+
+    """
+    try:
+        archive = chart_archive.read_chart_archive(tarball_path)
+    except chart_archive.ChartArchiveError as e:
+        msg = f"[ERROR] Incorrect tarball content: {e}"
+        raise TarballContentError(msg) from e
+
+    layout_error = get_tarball_layout_error(archive.members, chart_name)
+    if layout_error:
+        raise TarballContentError(layout_error)
@@ -17,7 +17,9 @@ from pathlib import Path
 
 import pytest
 import responses
+import yaml
 
+from indexfile import index_stream
 from reporegex import matchers
 from submission import submission
 
@@ -975,6 +977,13 @@ def test_check_index(test_scenario):
         test_scenario.chart.check_index(test_scenario.index)
 
 
+@pytest.mark.parametrize("test_scenario", scenarios_check_index)
+def test_check_index_streaming(test_scenario):
+    reader = index_stream.IndexReader(yaml.safe_dump(test_scenario.index))
+    with test_scenario.excepted_exception:
+        test_scenario.chart.check_index(reader)
+
+
 @dataclass
 class CheckReleaseTagScenario:
     chart: submission.Chart = field(
@@ -1030,3 +1039,13 @@ def test_check_release_tag(test_scenario):
 
     with test_scenario.excepted_exception:
         test_scenario.chart.check_release_tag(repository="my-fake-org/my-fake-repo")
+
+
+def test_check_tarball_content_unreadable(tmp_path):
+    tarball_path = tmp_path / "awesome-1.0.0.tgz"
+    tarball_path.write_bytes(b"not a tarball")
+
+    with pytest.raises(
+        submission.TarballContentError, match="Incorrect tarball content"
+    ):
+        submission.check_tarball_content(str(tarball_path), "awesome")
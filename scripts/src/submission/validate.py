@@ -2,6 +2,7 @@ import argparse
 import json
 import sys
 
+from pullrequest import prcontext
 from submission import serializer, submission
 from tools import gitutils
 
@@ -18,6 +19,20 @@ def write_submission_to_file(s: submission.Submission, artifact_path: str):
         f.write(data)
 
 
+def write_pr_context_to_file(s: submission.Submission, path: str):
+    """Save the PR context, for the next jobs to read instead of querying the GitHub API.
+
+    The files of the PR are taken from the Submission, so only the PR itself is queried.
+    The PR context is optional, failing to write it is not an error.
+    """
+    try:
+        context = prcontext.fetch_pr_context(s.api_url, s.modified_files)
+    except prcontext.PRContextError as e:
+        print(f"[WARNING] PR context not written: {e}")
+        return
+    prcontext.write_pr_context(context, path)
+
+
 def read_submission_from_file(articact_path: str) -> submission.Submission:
     """Read and load the JSON representation of the Submission object from file."""
     with open(articact_path, "r", encoding="utf-8") as f:
@@ -99,7 +114,8 @@ def main():
     1. Pull all information related to the PR from GitHub and initialized the Submission object.
     2. Validate the Submission by running a series of checks and created required GitHub outputs
        pr-content-error-message and owners-error-message.
-    3. Save the Submission object to a file, to be uploaded as an artifact for next jobs.
+    3. Save the Submission object to a file, to be uploaded as an artifact for next jobs, along
+       with the PR context if requested.
 
     """
     parser = argparse.ArgumentParser()
@@ -134,9 +150,19 @@ def main():
         action="store_true",
         help="When checking for the presence of the Helm chart in the Helm repository index, default to an empty index if it can't be found",
     )
+    parser.add_argument(
+        "--pr-context-output",
+        dest="pr_context_output",
+        type=str,
+        default=None,
+        help="Path to artifact file to write the PR context (files, labels, head SHA, author, base ref)",
+    )
 
     args = parser.parse_args()
     s = submission.Submission(args.api_url)
+    if args.pr_context_output:
+        write_pr_context_to_file(s, args.pr_context_output)
+
     try:
         pr_content_error_msg = craft_pr_content_error_msg(
             s, args.repository, args.ignore_missing_helm_index
@@ -0,0 +1,388 @@
+"""Read and rewrite packaged Helm charts (.tgz) without extracting them to disk."""
+
+import contextlib
+import copy
+import gzip
+import hashlib
+import io
+import os
+import posixpath
+import tarfile
+import tempfile
+from dataclasses import dataclass, field
+
+import yaml
+
+try:
+    from yaml import CBaseLoader as BaseLoader
+    from yaml import CDumper as Dumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import BaseLoader, Dumper, SafeLoader
+
+# Same compression level as helm package (Go's gzip.DefaultCompression)
+COMPRESS_LEVEL = 6
+
+# Maximum total size of the files in an archive, once decompressed
+MAX_UNCOMPRESSED_SIZE = 1024 * 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+
+# Fields of helm's chart.Metadata, as printed by "helm show chart", with their type.
+# All fields are omitted when empty.
+_METADATA_FIELDS = [
+    ("name", "str"),
+    ("home", "str"),
+    ("sources", "list"),
+    ("version", "str"),
+    ("description", "str"),
+    ("keywords", "list"),
+    ("maintainers", "maintainers"),
+    ("icon", "str"),
+    ("apiVersion", "str"),
+    ("condition", "str"),
+    ("tags", "str"),
+    ("appVersion", "str"),
+    ("deprecated", "bool"),
+    ("annotations", "dict"),
+    ("kubeVersion", "str"),
+    ("dependencies", "dependencies"),
+    ("type", "str"),
+]
+
+_MAINTAINER_FIELDS = [("name", "str"), ("email", "str"), ("url", "str")]
+
+# (field, type, omitempty)
+_DEPENDENCY_FIELDS = [
+    ("name", "str", False),
+    ("version", "str", True),
+    ("repository", "str", False),
+    ("condition", "str", True),
+    ("tags", "list", True),
+    ("enabled", "bool", True),
+    ("import-values", "raw", True),
+    ("alias", "str", True),
+]
+
+
+class ChartArchiveError(Exception):
+    """This exception is raised when the chart archive is not as expected"""
+
+
+class ArchiveTooLargeError(ChartArchiveError):
+    """This exception is raised when the decompressed archive exceeds the maximum size"""
+
+
+class _HashingFile:
+    """Wrap a file object, computing the SHA-256 digest of the bytes read or written."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.hash.update(data)
+        return data
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def drain(self):
+        """Read the rest of the file, so that the digest covers all of it."""
+        while self.read(CHUNK_SIZE):
+            pass
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def _to_str(value):
+    if not isinstance(value, str) or value in ("~", "null", "Null", "NULL"):
+        return ""
+    return value
+
+
+def _convert(value, field_type):
+    if field_type == "str":
+        return _to_str(value)
+    if field_type == "bool":
+        return _to_str(value).lower() == "true"
+    if field_type == "list":
+        return [_to_str(v) for v in value] if isinstance(value, list) else []
+    if field_type == "dict":
+        if not isinstance(value, dict):
+            return {}
+        return {k: _to_str(v) for k, v in value.items()}
+    if field_type == "maintainers":
+        return [
+            _convert_fields(m, _MAINTAINER_FIELDS)
+            for m in value or []
+            if isinstance(m, dict)
+        ]
+    if field_type == "dependencies":
+        return [_convert_dependency(d) for d in value or [] if isinstance(d, dict)]
+    return value or None
+
+
+def _convert_fields(data, fields):
+    out = {}
+    for name, field_type in fields:
+        value = _convert(data.get(name), field_type)
+        if value:
+            out[name] = value
+    return out
+
+
+def _convert_dependency(dependency):
+    out = {}
+    for name, field_type, omitempty in _DEPENDENCY_FIELDS:
+        value = _convert(dependency.get(name), field_type)
+        if value or not omitempty:
+            out[name] = value
+    return out
+
+
+@dataclass
+class ChartArchive:
+    """Content of a chart archive, gathered in a single pass over the archive.
+
+    Attributes:
+        members: All the members of the archive.
+        chart_dir: Top-level directory of the archive, named after the chart.
+        chart_yaml: Content of <chart_dir>/Chart.yaml, as text.
+        requirements_yaml: Content of <chart_dir>/requirements.yaml (v1 charts).
+        has_values_schema: Whether <chart_dir>/values.schema.json is present.
+        has_readme: Whether <chart_dir>/README.md is present.
+        size: Total size of the files in the archive, once decompressed.
+        sha256: SHA-256 digest of the archive (.tgz) itself.
+    """
+
+    members: list[tarfile.TarInfo] = field(default_factory=list)
+    chart_dir: str = ""
+    chart_yaml: str | None = None
+    requirements_yaml: str | None = None
+    has_values_schema: bool = False
+    has_readme: bool = False
+    size: int = 0
+    sha256: str | None = None
+
+    def get_chart_metadata(self):
+        """Get the chart metadata, as printed by "helm show chart".
+
+        As with helm, unknown and empty fields are dropped, all values are kept as
+        strings (e.g. "version: 1.10" is not converted to a float), and the
+        dependencies of v1 charts are read from requirements.yaml.
+
+        Returns:
+            dict: The chart metadata.
+
+        Raises:
+            ChartArchiveError: if the archive does not contain a valid Chart.yaml.
+        """
+        if self.chart_yaml is None:
+            raise ChartArchiveError(f"No {self.chart_dir}/Chart.yaml in the archive")
+        try:
+            data = yaml.load(self.chart_yaml, Loader=BaseLoader)
+            if self.requirements_yaml is not None:
+                requirements = yaml.load(self.requirements_yaml, Loader=BaseLoader)
+                if isinstance(requirements, dict) and "dependencies" in requirements:
+                    data["dependencies"] = requirements["dependencies"]
+        except yaml.YAMLError as e:
+            raise ChartArchiveError(f"Invalid {self.chart_dir}/Chart.yaml") from e
+        if not isinstance(data, dict):
+            raise ChartArchiveError(f"Invalid {self.chart_dir}/Chart.yaml")
+
+        metadata = _convert_fields(data, _METADATA_FIELDS)
+        metadata.setdefault("apiVersion", "v1")
+        return metadata
+
+    def add_member(self, member, read):
+        """Record a member of the archive.
+
+        Args:
+            member (tarfile.TarInfo): The member.
+            read (callable): Returns the content of the member, only called for the
+                metadata files.
+        """
+        self.members.append(member)
+        self.size += member.size
+        name = posixpath.normpath(member.name)
+        if not self.chart_dir:
+            # As with helm, the chart is in the first directory of the archive
+            self.chart_dir = name.split("/")[0]
+        if not member.isfile():
+            return
+
+        if name == f"{self.chart_dir}/Chart.yaml":
+            self.chart_yaml = read().decode("utf-8")
+        elif name == f"{self.chart_dir}/requirements.yaml":
+            self.requirements_yaml = read().decode("utf-8")
+        elif name == f"{self.chart_dir}/values.schema.json":
+            self.has_values_schema = True
+        elif name == f"{self.chart_dir}/README.md":
+            self.has_readme = True
+
+
+def read_chart_archive(path, max_size=MAX_UNCOMPRESSED_SIZE):
+    """Read the members and metadata files of a chart archive, without extracting it.
+
+    The archive is read in a single streaming pass, which also computes its digest.
+    Reading stops as soon as the decompressed size of its files exceeds max_size, so
+    that a small archive can't be used to exhaust the resources of the runner.
+
+    Args:
+        path (str): Path to the chart archive (.tgz).
+        max_size (int): Maximum total size of the files in the archive, in bytes.
+
+    Returns:
+        ChartArchive: The content of the archive.
+
+    Raises:
+        ArchiveTooLargeError: if the decompressed archive is larger than max_size.
+        ChartArchiveError: if the file is not a valid gzipped tar archive.
+    """
+    archive = ChartArchive()
+    with open(path, "rb") as raw:
+        fileobj = _HashingFile(raw)
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+                for member in tar:
+                    if archive.size + member.size > max_size:
+                        raise ArchiveTooLargeError(
+                            f"{path} is larger than {max_size} bytes once decompressed"
+                        )
+                    archive.add_member(member, lambda: tar.extractfile(member).read())
+        except (tarfile.TarError, OSError, EOFError) as e:
+            raise ChartArchiveError(f"Failed to read {path}: {e}") from e
+        fileobj.drain()
+    archive.sha256 = fileobj.hexdigest()
+    return archive
+
+
+def _is_chart_yaml(member, chart):
+    return posixpath.normpath(member.name) == f"{chart}/Chart.yaml"
+
+
+def rewrite_annotations(src_path, dest_path, chart, annotations):
+    """Copy a chart archive, merging annotations into its Chart.yaml.
+
+    The archive is streamed member by member: all members are copied unchanged,
+    except <chart>/Chart.yaml in which annotations are merged into the existing ones,
+    overwriting values for overlapping keys. dest_path is written atomically and may be
+    the same as src_path.
+
+    Args:
+        src_path (str): Path to the chart archive to read.
+        dest_path (str): Path to the chart archive to write.
+        chart (str): Name of the chart, i.e. its top-level directory in the archive.
+        annotations (dict): Annotations to set.
+
+    Returns:
+        ChartArchive: The content of the new archive.
+
+    Raises:
+        ChartArchiveError: if the archive does not contain <chart>/Chart.yaml.
+    """
+    archive = ChartArchive()
+    with _write_archive(dest_path) as (dest, hashed), tarfile.open(
+        src_path, mode="r:gz"
+    ) as src:
+        found = False
+        for member in src:
+            if member.isfile() and _is_chart_yaml(member, chart):
+                found = True
+                data = yaml.load(src.extractfile(member), Loader=SafeLoader)
+                if "annotations" not in data or data["annotations"] is None:
+                    data["annotations"] = annotations
+                else:
+                    data["annotations"] |= annotations
+                content = yaml.dump(data, Dumper=Dumper).encode("utf-8")
+                info = copy.copy(member)
+                info.size = len(content)
+                dest.addfile(info, io.BytesIO(content))
+                archive.add_member(info, lambda: content)
+            elif member.isfile():
+                dest.addfile(member, src.extractfile(member))
+                archive.add_member(member, lambda: src.extractfile(member).read())
+            else:
+                dest.addfile(member)
+                archive.add_member(member, None)
+        if not found:
+            raise ChartArchiveError(f"No {chart}/Chart.yaml found in {src_path}")
+    archive.sha256 = hashed.hexdigest()
+    return archive
+
+
+def normalize_archive(src_path, dest_path, mtime=0, max_size=MAX_UNCOMPRESSED_SIZE):
+    """Copy a chart archive so that its bytes only depend on the content of its files.
+
+    Members are sorted by name, their modification time is set to mtime and their
+    ownership is reset to root, as is the timestamp of the gzip header. Packaging the
+    same chart source twice then yields the same archive, and the same digest.
+
+    Args:
+        src_path (str): Path to the chart archive to read.
+        dest_path (str): Path to the chart archive to write, may be the same as src_path.
+        mtime (int): Modification time to set on all the members.
+        max_size (int): Maximum total size of the files in the archive, in bytes.
+
+    Returns:
+        ChartArchive: The content of the new archive.
+
+    Raises:
+        ArchiveTooLargeError: if the decompressed archive is larger than max_size.
+    """
+    entries = []
+    size = 0
+    with tarfile.open(src_path, mode="r|gz") as src:
+        for member in src:
+            size += member.size
+            if size > max_size:
+                raise ArchiveTooLargeError(
+                    f"{src_path} is larger than {max_size} bytes once decompressed"
+                )
+            data = src.extractfile(member).read() if member.isfile() else None
+            entries.append((member, data))
+    entries.sort(key=lambda entry: entry[0].name)
+
+    archive = ChartArchive()
+    with _write_archive(dest_path) as (dest, hashed):
+        for member, data in entries:
+            info = copy.copy(member)
+            info.mtime = mtime
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            info.pax_headers = {}
+            dest.addfile(info, io.BytesIO(data) if data is not None else None)
+            archive.add_member(info, lambda: data)
+    archive.sha256 = hashed.hexdigest()
+    return archive
+
+
+@contextlib.contextmanager
+def _write_archive(dest_path):
+    """Write a chart archive atomically.
+
+    Yields the tar file to add members to, and the underlying hashing writer whose
+    digest is complete once the context exits. The gzip header carries no timestamp.
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix=".tgz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            hashed = _HashingFile(raw)
+            with gzip.GzipFile(
+                fileobj=hashed, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0
+            ) as gz, tarfile.open(fileobj=gz, mode="w") as tar:
+                yield tar, hashed
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,199 @@
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tarfile
+
+import pytest
+import yaml
+
+from tools import chart_archive
+
+chart_yaml = """\
+apiVersion: v2
+name: awesome
+version: 1.42.0
+description: An awesome chart
+annotations:
+  charts.openshift.io/name: Awesome
+  charts.openshift.io/providerType: redhat
+dependencies:
+- name: common
+  version: 1.0.0
+"""
+
+chart_files = {
+    "awesome/Chart.yaml": chart_yaml,
+    "awesome/values.yaml": "replicas: 1\n",
+    "awesome/templates/configmap.yaml": (
+        "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: {{ .Release.Name }}\n"
+        "data:\n  replicas: {{ .Values.replicas | quote }}\n"
+    ),
+    "awesome/charts/common/Chart.yaml": (
+        "apiVersion: v2\nname: common\nversion: 1.0.0\ntype: library\n"
+    ),
+    "awesome/charts/common/templates/_helpers.tpl": (
+        '{{- define "common.name" -}}common{{- end -}}\n'
+    ),
+}
+
+annotations = {
+    "charts.openshift.io/providerType": "community",
+    "charts.openshift.io/provider": "Acme",
+}
+
+
+@pytest.fixture
+def chart_package(tmp_path):
+    path = tmp_path / "awesome-1.42.0.tgz"
+    with tarfile.open(path, "w:gz") as tar:
+        for name, content in chart_files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = 1700000000
+            tar.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def read_members(path):
+    with tarfile.open(path, "r:gz") as tar:
+        return {
+            m.name: (m.mode, m.mtime, tar.extractfile(m).read())
+            for m in tar.getmembers()
+        }
+
+
+def test_rewrite_annotations(chart_package):
+    before = read_members(chart_package)
+    archive = chart_archive.rewrite_annotations(
+        chart_package, chart_package, "awesome", annotations
+    )
+    after = read_members(chart_package)
+
+    # The returned content is that of the written archive
+    expected = chart_archive.read_chart_archive(chart_package)
+    assert [m.name for m in archive.members] == [m.name for m in expected.members]
+    assert archive.chart_yaml == expected.chart_yaml
+    assert archive.get_chart_metadata() == expected.get_chart_metadata()
+    assert archive.sha256 == expected.sha256
+
+    assert list(after) == list(before)
+    for name in before:
+        if name != "awesome/Chart.yaml":
+            assert after[name] == before[name]
+
+    data = yaml.safe_load(after["awesome/Chart.yaml"][2])
+    assert data["annotations"] == {
+        "charts.openshift.io/name": "Awesome",
+        "charts.openshift.io/providerType": "community",
+        "charts.openshift.io/provider": "Acme",
+    }
+    assert data["dependencies"] == [{"name": "common", "version": "1.0.0"}]
+
+
+def test_missing_chart_yaml(chart_package, tmp_path):
+    dest = str(tmp_path / "out.tgz")
+    with pytest.raises(chart_archive.ChartArchiveError):
+        chart_archive.rewrite_annotations(chart_package, dest, "other", annotations)
+    assert not os.path.exists(dest)
+    assert os.listdir(tmp_path) == ["awesome-1.42.0.tgz"]
+
+
+@pytest.mark.skipif(shutil.which("helm") is None, reason="helm is not installed")
+def test_helm_accepts_rewritten_archive(chart_package):
+    chart_archive.rewrite_annotations(
+        chart_package, chart_package, "awesome", annotations
+    )
+
+    out = subprocess.run(
+        ["helm", "show", "chart", chart_package], capture_output=True, check=True
+    )
+    shown = yaml.safe_load(out.stdout)
+    assert shown["annotations"]["charts.openshift.io/provider"] == "Acme"
+
+    subprocess.run(["helm", "lint", chart_package], capture_output=True, check=True)
+    out = subprocess.run(
+        ["helm", "template", "test", chart_package], capture_output=True, check=True
+    )
+    assert b'replicas: "1"' in out.stdout
+
+
+def test_read_chart_archive(chart_package):
+    archive = chart_archive.read_chart_archive(chart_package)
+
+    assert archive.chart_dir == "awesome"
+    assert [m.name for m in archive.members] == list(chart_files)
+    assert not archive.has_readme
+    assert not archive.has_values_schema
+    assert archive.size == sum(len(c.encode("utf-8")) for c in chart_files.values())
+    with open(chart_package, "rb") as f:
+        assert archive.sha256 == hashlib.sha256(f.read()).hexdigest()
+    assert archive.get_chart_metadata() == {
+        "name": "awesome",
+        "version": "1.42.0",
+        "description": "An awesome chart",
+        "apiVersion": "v2",
+        "annotations": {
+            "charts.openshift.io/name": "Awesome",
+            "charts.openshift.io/providerType": "redhat",
+        },
+        "dependencies": [{"name": "common", "version": "1.0.0", "repository": ""}],
+    }
+
+
+def test_chart_metadata_v1_chart():
+    archive = chart_archive.ChartArchive(
+        chart_dir="legacy",
+        chart_yaml="name: legacy\nversion: 1.10\nhome: ''\nunknown: field\n",
+        requirements_yaml="dependencies:\n- name: common\n  enabled: true\n",
+    )
+
+    assert archive.get_chart_metadata() == {
+        "name": "legacy",
+        "version": "1.10",
+        "apiVersion": "v1",
+        "dependencies": [{"name": "common", "repository": "", "enabled": True}],
+    }
+
+
+def test_archive_too_large(chart_package):
+    with pytest.raises(chart_archive.ArchiveTooLargeError):
+        chart_archive.read_chart_archive(chart_package, max_size=100)
+
+
+def test_invalid_archive(tmp_path):
+    path = tmp_path / "awesome-1.42.0.tgz"
+    path.write_bytes(b"not a tarball")
+
+    with pytest.raises(chart_archive.ChartArchiveError):
+        chart_archive.read_chart_archive(str(path))
+
+
+def test_normalize_archive(chart_package, tmp_path):
+    first = str(tmp_path / "first.tgz")
+    archive = chart_archive.normalize_archive(chart_package, first)
+
+    # Same files, with different order, mtimes and owners
+    repackaged = str(tmp_path / "repackaged.tgz")
+    with tarfile.open(repackaged, "w:gz") as tar:
+        for name, content in reversed(chart_files.items()):
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = 1800000000
+            info.uid = info.gid = 1000
+            info.uname = info.gname = "helm"
+            tar.addfile(info, io.BytesIO(data))
+    second = str(tmp_path / "second.tgz")
+    chart_archive.normalize_archive(repackaged, second)
+
+    with open(first, "rb") as f1, open(second, "rb") as f2:
+        content = f1.read()
+        assert content == f2.read()
+    assert archive.sha256 == hashlib.sha256(content).hexdigest()
+    assert [m.name for m in archive.members] == sorted(chart_files)
+    assert read_members(first)["awesome/Chart.yaml"][2] == chart_yaml.encode("utf-8")
@@ -0,0 +1,203 @@
+"""Asyncio front end of the GitHub API client, for fan-out operations.
+
+Code paths that issue many independent GitHub API calls, e.g. listing the files of
+every PR of a repository, send them concurrently through an AsyncGitHubClient, which
+bounds the number of requests in flight. Each request is sent by the shared
+github_client.GitHubClient in a worker thread, so it keeps the retries, the rate
+limit pacing and the metrics of that client.
+
+The errors follow gitutils.github_api: a JSON response carrying a "message" is an
+error, as is an unsuccessful status. Both raise GitHubAPIError.
+
+The sync wrappers run the requests in a new event loop and return their JSON bodies,
+in the order of the endpoints:
+
+    releases = github_async.get_pages("repos/openshift-helm-charts/charts/releases")
+    files = github_async.get_pages_all(
+        [f"repos/openshift-helm-charts/charts/pulls/{n}/files" for n in numbers]
+    )
+"""
+
+import asyncio
+import sys
+import urllib.parse
+
+import requests
+
+sys.path.append("../")
+from tools import github_client
+
+# Maximum number of requests in flight, kept below the connection pool size
+DEFAULT_CONCURRENCY = 8
+PAGE_SIZE = 100
+
+
+class GitHubAPIError(Exception):
+    """This exception is raised when a request to the GitHub API fails"""
+
+
+def _get_json(method, endpoint, response):
+    """Get the JSON body of a response, or None if it has none."""
+    try:
+        data = response.json() if response.content else None
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and "message" in data:
+        raise GitHubAPIError(
+            f'{method.upper()} {endpoint}: {response.status_code} : {data["message"]}'
+        )
+    if not response.ok:
+        raise GitHubAPIError(
+            f"{method.upper()} {endpoint}: {response.status_code} : {response.reason}"
+        )
+    return data
+
+
+def _get_page_url(endpoint, page_number, per_page):
+    separator = "&" if "?" in endpoint else "?"
+    return f"{endpoint}{separator}per_page={per_page}&page={page_number}"
+
+
+class AsyncGitHubClient:
+    """Send requests to the GitHub API concurrently, see the module documentation.
+
+    An instance is bound to the event loop it is first used in.
+
+    Args:
+        token (str): Token used to authenticate the requests. Defaults to the
+                     BOT_TOKEN environment variable.
+        concurrency (int): Maximum number of requests in flight.
+        client (github_client.GitHubClient): Client sending the requests. Defaults
+                                             to the shared client of the token.
+    """
+
+    def __init__(self, token=None, concurrency=DEFAULT_CONCURRENCY, client=None):
+        self.client = client or github_client.get_client(token)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(self, method, endpoint, **kwargs):
+        """Send a request, return its JSON body or None if it has none.
+
+        Args:
+            method (str): HTTP method, e.g. "get".
+            endpoint (str): Endpoint, relative to the GitHub API URL, or full URL.
+            **kwargs: Other arguments of GitHubClient.request, e.g. json.
+
+        Raises:
+            GitHubAPIError: if the request fails or returns an error message.
+        """
+        async with self._semaphore:
+            try:
+                response = await asyncio.to_thread(
+                    self.client.request, method, endpoint, **kwargs
+                )
+            except requests.RequestException as e:
+                raise GitHubAPIError(f"{method.upper()} {endpoint}: {e}") from e
+        return _get_json(method, endpoint, response)
+
+    async def request_all(self, method, endpoints, return_exceptions=False, **kwargs):
+        """Send the same request to several endpoints concurrently.
+
+        Args:
+            method (str): HTTP method, e.g. "delete".
+            endpoints (list[str]): The endpoints.
+            return_exceptions (bool): Return the errors in place of the JSON bodies
+                                      instead of raising the first one.
+            **kwargs: Other arguments of GitHubClient.request, e.g. json.
+
+        Returns:
+            list: The JSON bodies of the responses, in the order of the endpoints.
+        """
+        return await asyncio.gather(
+            *(self.request(method, endpoint, **kwargs) for endpoint in endpoints),
+            return_exceptions=return_exceptions,
+        )
+
+    async def get_pages(self, endpoint, per_page=PAGE_SIZE):
+        """Get all the items of a paginated endpoint.
+
+        The first page gives the number of the last page, in its Link header. The
+        other pages are then fetched concurrently.
+
+        Args:
+            endpoint (str): The endpoint, e.g. "repos/o/r/releases".
+            per_page (int): Number of items per page.
+
+        Returns:
+            list: The items, in the order of the API.
+        """
+        async with self._semaphore:
+            try:
+                response = await asyncio.to_thread(
+                    self.client.get, _get_page_url(endpoint, 1, per_page)
+                )
+            except requests.RequestException as e:
+                raise GitHubAPIError(f"GET {endpoint}: {e}") from e
+        items = list(_get_json("get", endpoint, response) or [])
+
+        last_page = 1
+        if "last" in response.links:
+            query = urllib.parse.urlparse(response.links["last"]["url"]).query
+            last_page = int(urllib.parse.parse_qs(query).get("page", [1])[0])
+        pages = await self.request_all(
+            "get",
+            [
+                _get_page_url(endpoint, page_number, per_page)
+                for page_number in range(2, last_page + 1)
+            ],
+        )
+        for page in pages:
+            items.extend(page or [])
+        return items
+
+    async def get_pages_all(self, endpoints, per_page=PAGE_SIZE):
+        """Get all the items of several paginated endpoints concurrently.
+
+        Returns:
+            list[list]: The items of each endpoint, in the order of the endpoints.
+        """
+        return await asyncio.gather(
+            *(self.get_pages(endpoint, per_page) for endpoint in endpoints)
+        )
+
+
+def request_all(
+    method,
+    endpoints,
+    token=None,
+    concurrency=DEFAULT_CONCURRENCY,
+    return_exceptions=False,
+    **kwargs,
+):
+    """Sync wrapper of AsyncGitHubClient.request_all."""
+
+    async def run():
+        client = AsyncGitHubClient(token, concurrency)
+        return await client.request_all(
+            method, endpoints, return_exceptions=return_exceptions, **kwargs
+        )
+
+    return asyncio.run(run())
+
+
+def get_all(endpoints, token=None, concurrency=DEFAULT_CONCURRENCY):
+    """Get the JSON bodies of several endpoints concurrently."""
+    return request_all("get", endpoints, token, concurrency)
+
+
+def get_pages(endpoint, token=None, concurrency=DEFAULT_CONCURRENCY):
+    """Sync wrapper of AsyncGitHubClient.get_pages."""
+
+    async def run():
+        return await AsyncGitHubClient(token, concurrency).get_pages(endpoint)
+
+    return asyncio.run(run())
+
+
+def get_pages_all(endpoints, token=None, concurrency=DEFAULT_CONCURRENCY):
+    """Sync wrapper of AsyncGitHubClient.get_pages_all."""
+
+    async def run():
+        return await AsyncGitHubClient(token, concurrency).get_pages_all(endpoints)
+
+    return asyncio.run(run())
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+import requests
+import responses
+from responses import matchers
+
+from tools import github_async, github_client
+
+API_URL = "https://api.github.com/repos/openshift-helm-charts/charts"
+
+
+@pytest.fixture(autouse=True)
+def client(monkeypatch):
+    client = github_client.GitHubClient(token="secret", sleep=lambda seconds: None)
+    monkeypatch.setattr(github_client, "_clients", {None: client, "secret": client})
+    return client
+
+
+def mock_pages(endpoint, items, per_page=github_async.PAGE_SIZE):
+    """Mock the pages of a paginated endpoint, with their Link header."""
+    pages = [items[i : i + per_page] for i in range(0, len(items), per_page)]
+    for number, page in enumerate(pages or [[]], 1):
+        headers = {}
+        if len(pages) > 1:
+            headers["Link"] = (
+                f'<{endpoint}?per_page={per_page}&page={len(pages)}>; rel="last"'
+            )
+        responses.get(
+            endpoint,
+            json=page,
+            headers=headers,
+            match=[
+                matchers.query_param_matcher(
+                    {"per_page": str(per_page), "page": str(number)}
+                )
+            ],
+        )
+
+
+@responses.activate
+def test_get_all():
+    for number in range(20):
+        responses.get(f"{API_URL}/pulls/{number}", json={"number": number})
+
+    pulls = github_async.get_all([f"{API_URL}/pulls/{n}" for n in range(20)])
+
+    assert [pull["number"] for pull in pulls] == list(range(20))
+    assert responses.calls[0].request.headers["Authorization"] == "Bearer secret"
+
+
+@responses.activate
+def test_request_all_no_content():
+    responses.delete(f"{API_URL}/git/refs/heads/a", status=204)
+    responses.delete(f"{API_URL}/git/refs/heads/b", status=204)
+
+    assert github_async.request_all(
+        "delete", [f"{API_URL}/git/refs/heads/a", f"{API_URL}/git/refs/heads/b"]
+    ) == [None, None]
+
+
+@responses.activate
+def test_request_all_errors():
+    responses.get(f"{API_URL}/pulls/1", json={"number": 1})
+    responses.get(f"{API_URL}/pulls/2", status=404, json={"message": "Not Found"})
+    responses.get(f"{API_URL}/pulls/3", status=500)
+    endpoints = [f"{API_URL}/pulls/{n}" for n in (1, 2, 3)]
+
+    with pytest.raises(github_async.GitHubAPIError, match="Not Found"):
+        github_async.get_all(endpoints)
+
+    results = github_async.request_all("get", endpoints, return_exceptions=True)
+    assert results[0] == {"number": 1}
+    assert isinstance(results[1], github_async.GitHubAPIError)
+    assert isinstance(results[2], github_async.GitHubAPIError)
+    assert "500" in str(results[2])
+
+
+def test_concurrency(client, monkeypatch):
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+
+    def request(method, endpoint, **kwargs):
+        with lock:
+            in_flight.append(endpoint)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(endpoint)
+        raise requests.ConnectionError("unreachable")
+
+    monkeypatch.setattr(client, "request", request)
+
+    results = github_async.request_all(
+        "get", [str(n) for n in range(30)], concurrency=4, return_exceptions=True
+    )
+
+    assert all(isinstance(r, github_async.GitHubAPIError) for r in results)
+    assert 1 < max(max_in_flight) <= 4
+
+
+@responses.activate
+def test_get_pages():
+    releases = [{"id": n} for n in range(250)]
+    mock_pages(f"{API_URL}/releases", releases)
+
+    assert github_async.get_pages(f"{API_URL}/releases") == releases
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_get_pages_all():
+    files = {
+        n: [{"filename": f"file-{n}-{i}"} for i in range(n * 60)] for n in range(4)
+    }
+    for n, pr_files in files.items():
+        mock_pages(f"{API_URL}/pulls/{n}/files", pr_files)
+
+    assert github_async.get_pages_all(
+        [f"{API_URL}/pulls/{n}/files" for n in files]
+    ) == list(files.values())
@@ -0,0 +1,390 @@
+"""Client for the GitHub API, shared by the scripts.
+
+All the requests of a process go through a single pooled requests.Session, with a
+timeout on every call. The client:
+
+* retries, with exponential backoff, the requests hitting a secondary rate limit
+  (403 or 429 with a Retry-After header or a "secondary rate limit" message) and the
+  requests that couldn't connect (connection refused or timed out, DNS failure), which
+  were never sent. The idempotent requests (GET, HEAD, OPTIONS, PUT
+  and DELETE) are also retried when failing with a 5xx status, a connection error
+  or a timeout. Other requests (e.g. a POST creating a comment) may have been
+  processed in that case, so they are only retried if the caller opts in with
+  retry=True, e.g. for GraphQL queries.
+* paces the requests before the primary rate limit is exhausted: the
+  X-RateLimit-Remaining and X-RateLimit-Reset headers of each response feed a token
+  bucket, which spreads the remaining requests until the reset once less than
+  PACING_THRESHOLD of the limit is left. The GraphQL endpoint has its own rate limit,
+  and token bucket.
+* records, for all the clients of the process, the number of requests by method and
+  status, the retries, the time spent waiting for the rate limit and a histogram of
+  the latencies. They are written at exit to the file pointed to by the
+  GITHUB_METRICS_FILE environment variable, in the Prometheus text format.
+
+    client = github_client.get_client()
+    r = client.get("repos/openshift-helm-charts/charts/pulls/1")
+"""
+
+import atexit
+import bisect
+import os
+import threading
+import time
+import urllib.parse
+from collections import Counter
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+GITHUB_BASE_URL = "https://api.github.com"
+TOKEN_ENV = "BOT_TOKEN"
+METRICS_FILE_ENV = "GITHUB_METRICS_FILE"
+DEFAULT_TIMEOUT = 30
+POOL_SIZE = 16
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 2
+# Requests are not retried if the server asks to wait longer than this, in seconds
+MAX_RETRY_DELAY = 300
+# Fraction of the primary rate limit below which requests are paced
+PACING_THRESHOLD = 0.1
+# Maximum number of requests sent at once while pacing
+PACING_BURST = 5
+# Upper bounds of the buckets of the latency histogram, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+# Methods whose requests can be sent again without changing their effect
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RATE_LIMIT_STATUSES = (403, 429)
+
+xRateLimit = "X-RateLimit-Limit"
+xRateRemain = "X-RateLimit-Remaining"
+xRateReset = "X-RateLimit-Reset"
+
+# Clients, by token
+_clients = {}
+
+
+class RateLimiter:
+    """Token bucket pacing the requests to the primary rate limit of the GitHub API.
+
+    Requests are not paced until a response reports that less than PACING_THRESHOLD
+    of the limit remains. The bucket is then refilled at the rate that spreads the
+    remaining requests until the reset of the limit, and holds at most PACING_BURST
+    tokens. Once no requests remain, they wait for the reset.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self._tokens = PACING_BURST
+        self._last = clock()
+
+    def update(self, headers):
+        """Update the state of the rate limit from the headers of a response."""
+        try:
+            limit = int(headers[xRateLimit])
+            remaining = int(headers[xRateRemain])
+            reset = int(headers[xRateReset])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            if self.reset != reset or self.remaining is None:
+                self.limit, self.reset = limit, reset
+                self.remaining = remaining
+            else:
+                # Responses may arrive out of order: keep the lowest count
+                self.remaining = min(self.remaining, remaining)
+
+    def acquire(self):
+        """Reserve a request, return the time to wait before sending it, in seconds."""
+        with self._lock:
+            now = self._clock()
+            if self.reset is not None and now >= self.reset:
+                # The limit has been reset, its new state is only known after a response
+                self.remaining = self.reset = None
+            if self.remaining is None or self.remaining > self.limit * PACING_THRESHOLD:
+                if self.remaining is not None:
+                    self.remaining -= 1
+                self._tokens, self._last = PACING_BURST, now
+                return 0.0
+
+            if self.remaining <= 0:
+                return self.reset - now
+
+            rate = self.remaining / max(self.reset - now, 1)
+            self._tokens = min(PACING_BURST, self._tokens + (now - self._last) * rate)
+            self._last = now
+            # The token is taken even if not available yet, so that concurrent
+            # requests wait in turn
+            self._tokens -= 1
+            self.remaining -= 1
+            return max(0.0, -self._tokens / rate)
+
+
+class Metrics:
+    """Counts and latencies of the requests sent to the GitHub API."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.retries = 0
+        self.rate_limit_waits = 0
+        self.rate_limit_wait_time = 0.0
+        self.latency_buckets = Counter()
+        self.latency_count = 0
+        self.latency_sum = 0.0
+
+    def observe(self, method, status, latency):
+        """Record a request, its status (or "error") and its latency in seconds."""
+        with self._lock:
+            self.requests[(method.upper(), str(status))] += 1
+            bucket = bisect.bisect_left(LATENCY_BUCKETS, latency)
+            self.latency_buckets[bucket] += 1
+            self.latency_count += 1
+            self.latency_sum += latency
+
+    def observe_wait(self, wait):
+        with self._lock:
+            self.rate_limit_waits += 1
+            self.rate_limit_wait_time += wait
+
+    def observe_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def to_prometheus(self):
+        """Format the metrics in the Prometheus text format."""
+        with self._lock:
+            lines = ["# TYPE github_requests_total counter"]
+            for (method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'github_requests_total{{method="{method}",status="{status}"}} {count}'
+                )
+            lines += [
+                "# TYPE github_retries_total counter",
+                f"github_retries_total {self.retries}",
+                "# TYPE github_rate_limit_waits_total counter",
+                f"github_rate_limit_waits_total {self.rate_limit_waits}",
+                "# TYPE github_rate_limit_wait_seconds_total counter",
+                f"github_rate_limit_wait_seconds_total {self.rate_limit_wait_time:.3f}",
+                "# TYPE github_request_duration_seconds histogram",
+            ]
+            cumulative = 0
+            for i, bound in enumerate(LATENCY_BUCKETS + ("+Inf",)):
+                cumulative += self.latency_buckets[i]
+                lines.append(
+                    f'github_request_duration_seconds_bucket{{le="{bound}"}} {cumulative}'
+                )
+            lines += [
+                f"github_request_duration_seconds_sum {self.latency_sum:.3f}",
+                f"github_request_duration_seconds_count {self.latency_count}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def __str__(self):
+        requests_count = sum(self.requests.values())
+        return (
+            f"requests={requests_count}, retries={self.retries}, "
+            f"rate_limit_waits={self.rate_limit_waits}, "
+            f"rate_limit_wait_time={self.rate_limit_wait_time:.3f}s, "
+            f"latency_sum={self.latency_sum:.3f}s"
+        )
+
+
+# Metrics of all the clients of the process
+metrics = Metrics()
+
+
+def _is_unsent(error):
+    """Check if a request failed while connecting, i.e. before it was sent."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests wraps the urllib3 error in a MaxRetryError, holding it as its reason
+    cause = error.args[0] if error.args else None
+    cause = getattr(cause, "reason", cause)
+    return isinstance(cause, urllib3.exceptions.NewConnectionError)
+
+
+class GitHubClient:
+    """Client for the GitHub API, see the module documentation.
+
+    Args:
+        token (str): Token used to authenticate the requests, if any.
+        base_url (str): URL prepended to the endpoints that are not full URLs.
+        timeout (float): Default timeout of the requests, in seconds.
+        max_retries (int): Maximum number of retries of a request.
+        sleep (callable): Function used to wait, e.g. between retries.
+        clock (callable): Function returning the current time, as time.time.
+    """
+
+    def __init__(
+        self,
+        token=None,
+        base_url=GITHUB_BASE_URL,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        sleep=time.sleep,
+        clock=time.time,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self._clock = clock
+        self.rate_limiter = RateLimiter(clock)
+        self.graphql_rate_limiter = RateLimiter(clock)
+        self.metrics = metrics
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github.v3+json"
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _get_url(self, endpoint):
+        if endpoint.startswith(("https://", "http://")):
+            return endpoint
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    def _get_rate_limiter(self, url):
+        if urllib.parse.urlparse(url).path.rstrip("/").endswith("/graphql"):
+            return self.graphql_rate_limiter
+        return self.rate_limiter
+
+    def _get_retry_delay(self, response, attempt, retry):
+        """Time to wait before retrying a request, or None if it shouldn't be retried.
+
+        The 5xx statuses are only retried if retry is set.
+        """
+        backoff = BACKOFF_FACTOR**attempt
+        if response.status_code in RETRY_STATUSES:
+            return backoff if retry else None
+        if response.status_code not in RATE_LIMIT_STATUSES:
+            return None
+
+        if "Retry-After" in response.headers:
+            try:
+                return max(int(response.headers["Retry-After"]), backoff)
+            except ValueError:
+                return backoff
+        if response.headers.get(xRateRemain) == "0" and xRateReset in response.headers:
+            return max(int(response.headers[xRateReset]) - self._clock(), 0) + 1
+        if "secondary rate limit" in response.text.lower():
+            # GitHub recommends waiting at least one minute
+            return max(60, backoff)
+        return None
+
+    def request(self, method, endpoint, timeout=None, retry=None, **kwargs):
+        """Send a request to the GitHub API.
+
+        Args:
+            method (str): HTTP method, e.g. "get".
+            endpoint (str): Endpoint, relative to the base URL (e.g.
+                            "repos/o/r/pulls/1"), or full URL.
+            timeout (float): Timeout of the request, in seconds. Defaults to the
+                             timeout of the client.
+            retry (bool): Retry the request on a 5xx status, a connection error or a
+                          timeout. Defaults to True for the idempotent methods only.
+                          Requests that couldn't connect (see _is_unsent) or hit a
+                          rate limit are always retried.
+            **kwargs: Other arguments of requests.Session.request, e.g. json.
+
+        Returns:
+            requests.Response: The response to the last attempt.
+
+        Raises:
+            requests.RequestException: if the request fails after all the retries.
+        """
+        url = self._get_url(endpoint)
+        timeout = timeout if timeout is not None else self.timeout
+        rate_limiter = self._get_rate_limiter(url)
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(self.max_retries + 1):
+            wait = rate_limiter.acquire()
+            if wait > 0:
+                print(f"[INFO] Waiting {wait:.1f}s for the GitHub API rate limit")
+                self.metrics.observe_wait(wait)
+                self._sleep(wait)
+
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.observe(method, "error", time.monotonic() - start)
+                # The request was not sent if the connection couldn't be established
+                if attempt == self.max_retries or not (retry or _is_unsent(e)):
+                    raise
+                delay = BACKOFF_FACTOR**attempt
+            else:
+                self.metrics.observe(
+                    method, response.status_code, time.monotonic() - start
+                )
+                rate_limiter.update(response.headers)
+                delay = self._get_retry_delay(response, attempt, retry)
+                if (
+                    delay is None
+                    or delay > MAX_RETRY_DELAY
+                    or attempt == self.max_retries
+                ):
+                    return response
+                print(
+                    f"[WARNING] {method.upper()} {url}: status {response.status_code}, "
+                    f"retrying in {delay:.0f}s"
+                )
+            self.metrics.observe_retry()
+            self._sleep(delay)
+
+    def get(self, endpoint, **kwargs):
+        return self.request("get", endpoint, **kwargs)
+
+    def post(self, endpoint, **kwargs):
+        return self.request("post", endpoint, **kwargs)
+
+    def put(self, endpoint, **kwargs):
+        return self.request("put", endpoint, **kwargs)
+
+    def patch(self, endpoint, **kwargs):
+        return self.request("patch", endpoint, **kwargs)
+
+    def delete(self, endpoint, **kwargs):
+        return self.request("delete", endpoint, **kwargs)
+
+    def head(self, endpoint, **kwargs):
+        return self.request("head", endpoint, **kwargs)
+
+    def __str__(self):
+        return f"GitHub API client ({self.metrics})"
+
+
+def _write_metrics():
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        with open(path, "w") as f:
+            f.write(metrics.to_prometheus())
+
+
+def get_client(token=None):
+    """Get the client shared by the process for a token.
+
+    Args:
+        token (str): Token used to authenticate the requests. Defaults to the
+                     BOT_TOKEN environment variable.
+
+    Returns:
+        GitHubClient: The client.
+    """
+    if token is None:
+        token = os.environ.get(TOKEN_ENV)
+    if token not in _clients:
+        if not _clients:
+            atexit.register(_write_metrics)
+        _clients[token] = GitHubClient(token)
+    return _clients[token]
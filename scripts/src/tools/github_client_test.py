@@ -0,0 +1,280 @@
+import pytest
+import requests
+import responses
+import urllib3
+
+from tools import github_client
+
+URL = "https://api.github.com/repos/openshift-helm-charts/charts/pulls/42"
+
+
+class FakeTime:
+    """Clock and sleep function, advancing the clock when sleeping."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def rate_limit_headers(remaining, reset, limit=5000):
+    return {
+        github_client.xRateLimit: str(limit),
+        github_client.xRateRemain: str(remaining),
+        github_client.xRateReset: str(int(reset)),
+    }
+
+
+@pytest.fixture
+def fake_time():
+    return FakeTime()
+
+
+@pytest.fixture
+def client(fake_time, monkeypatch):
+    monkeypatch.setattr(github_client, "metrics", github_client.Metrics())
+    return github_client.GitHubClient(
+        token="secret", sleep=fake_time.sleep, clock=fake_time.clock
+    )
+
+
+@responses.activate
+def test_request_headers(client):
+    responses.get(URL, json={"number": 42})
+
+    r = client.get("repos/openshift-helm-charts/charts/pulls/42")
+
+    assert r.json() == {"number": 42}
+    request = responses.calls[0].request
+    assert request.headers["Authorization"] == "Bearer secret"
+    assert request.headers["Accept"] == "application/vnd.github.v3+json"
+
+
+@responses.activate
+def test_retry_server_error(client, fake_time):
+    responses.get(URL, status=502)
+    responses.get(URL, status=503)
+    responses.get(URL, json={"number": 42})
+
+    r = client.get(URL)
+
+    assert r.status_code == 200
+    assert len(responses.calls) == 3
+    assert fake_time.sleeps == [1, 2]
+    assert client.metrics.retries == 2
+
+
+@responses.activate
+def test_retry_server_error_exhausted(client, fake_time):
+    responses.get(URL, status=500)
+
+    r = client.get(URL)
+
+    assert r.status_code == 500
+    assert len(responses.calls) == github_client.MAX_RETRIES + 1
+
+
+@responses.activate
+def test_retry_connection_error(client, fake_time):
+    responses.get(URL, body=requests.ConnectionError("reset"))
+    responses.get(URL, json={})
+
+    assert client.get(URL).status_code == 200
+    assert fake_time.sleeps == [1]
+    assert client.metrics.requests[("GET", "error")] == 1
+
+
+@responses.activate
+def test_no_retry_non_idempotent(client, fake_time):
+    responses.post(URL, status=502)
+    responses.patch(URL, body=requests.ReadTimeout("timed out"))
+    responses.post(URL, body=requests.ConnectionError("reset"))
+
+    assert client.post(URL, json={}).status_code == 502
+    with pytest.raises(requests.ReadTimeout):
+        client.patch(URL, json={})
+    with pytest.raises(requests.ConnectionError):
+        client.post(URL, json={})
+
+    assert len(responses.calls) == 3
+    assert fake_time.sleeps == []
+
+
+@responses.activate
+def test_retry_non_idempotent_not_sent(client, fake_time):
+    responses.post(URL, body=requests.ConnectTimeout("connect timed out"))
+    responses.post(URL, status=429, headers={"Retry-After": "5"})
+    responses.post(URL, status=201, json={})
+
+    assert client.post(URL, json={}).status_code == 201
+    assert fake_time.sleeps == [1, 5]
+
+
+@responses.activate
+def test_retry_non_idempotent_connection_refused(client, fake_time):
+    refused = urllib3.exceptions.NewConnectionError(None, "Connection refused")
+    responses.post(
+        URL,
+        body=requests.ConnectionError(
+            urllib3.exceptions.MaxRetryError(None, URL, refused)
+        ),
+    )
+    unresolved = urllib3.exceptions.NameResolutionError("api.github.com", None, None)
+    responses.post(URL, body=requests.ConnectionError(unresolved))
+    responses.post(URL, status=201, json={})
+
+    assert client.post(URL, json={}).status_code == 201
+    assert fake_time.sleeps == [1, 2]
+
+
+@responses.activate
+def test_retry_opt_in(client, fake_time):
+    responses.post(URL, status=502)
+    responses.post(URL, body=requests.ReadTimeout("timed out"))
+    responses.post(URL, json={})
+
+    assert client.post(URL, json={}, retry=True).status_code == 200
+    assert fake_time.sleeps == [1, 2]
+
+    responses.get(URL, status=503)
+    assert client.get(URL, retry=False).status_code == 503
+    assert fake_time.sleeps == [1, 2]
+
+
+@responses.activate
+def test_retry_secondary_rate_limit(client, fake_time):
+    responses.get(URL, status=403, headers={"Retry-After": "30"})
+    responses.get(
+        URL,
+        status=403,
+        json={"message": "You have exceeded a secondary rate limit."},
+    )
+    responses.get(URL, json={})
+
+    assert client.get(URL).status_code == 200
+    assert fake_time.sleeps == [30, 60]
+
+
+@responses.activate
+def test_retry_primary_rate_limit(client, fake_time):
+    reset = fake_time.now + 120
+    responses.get(URL, status=403, headers=rate_limit_headers(0, reset))
+    responses.get(URL, json={}, headers=rate_limit_headers(4999, reset + 3600))
+
+    assert client.get(URL).status_code == 200
+    assert fake_time.sleeps == [121]
+
+
+@pytest.mark.parametrize("status", [403, 404, 422])
+@responses.activate
+def test_no_retry_client_error(client, fake_time, status):
+    responses.get(URL, status=status, json={"message": "Forbidden"})
+
+    assert client.get(URL).status_code == status
+    assert len(responses.calls) == 1
+    assert fake_time.sleeps == []
+
+
+@responses.activate
+def test_no_retry_long_retry_after(client, fake_time):
+    responses.get(URL, status=429, headers={"Retry-After": "3600"})
+
+    assert client.get(URL).status_code == 429
+    assert fake_time.sleeps == []
+
+
+def test_rate_limiter_no_pacing(fake_time):
+    limiter = github_client.RateLimiter(fake_time.clock)
+    assert limiter.acquire() == 0
+
+    limiter.update(rate_limit_headers(1000, fake_time.now + 600))
+    assert [limiter.acquire() for _ in range(100)] == [0] * 100
+    assert limiter.remaining == 900
+
+
+def test_rate_limiter_pacing(fake_time):
+    limiter = github_client.RateLimiter(fake_time.clock)
+    limiter.update(rate_limit_headers(100, fake_time.now + 100))
+
+    waits = [limiter.acquire() for _ in range(github_client.PACING_BURST + 3)]
+
+    # The burst is sent at once, the next requests are spread at 1 request/s
+    assert waits[: github_client.PACING_BURST] == [0] * github_client.PACING_BURST
+    assert waits[github_client.PACING_BURST :] == pytest.approx([1, 2, 3], rel=0.1)
+
+
+def test_rate_limiter_exhausted(fake_time):
+    limiter = github_client.RateLimiter(fake_time.clock)
+    limiter.update(rate_limit_headers(0, fake_time.now + 42))
+
+    assert limiter.acquire() == 42
+
+    fake_time.sleep(42)
+    assert limiter.acquire() == 0
+
+
+def test_rate_limiter_out_of_order(fake_time):
+    limiter = github_client.RateLimiter(fake_time.clock)
+    reset = fake_time.now + 600
+    limiter.update(rate_limit_headers(10, reset))
+    limiter.update(rate_limit_headers(12, reset))
+
+    assert limiter.remaining == 10
+
+
+@responses.activate
+def test_metrics(client, tmp_path, monkeypatch):
+    responses.get(URL, status=502)
+    responses.get(URL, json={})
+    responses.post(URL, status=201)
+
+    client.get(URL)
+    client.post(URL, json={})
+
+    text = client.metrics.to_prometheus()
+    assert 'github_requests_total{method="GET",status="200"} 1' in text
+    assert 'github_requests_total{method="GET",status="502"} 1' in text
+    assert 'github_requests_total{method="POST",status="201"} 1' in text
+    assert "github_retries_total 1" in text
+    assert 'github_request_duration_seconds_bucket{le="+Inf"} 3' in text
+    assert "github_request_duration_seconds_count 3" in text
+
+    path = tmp_path / "metrics.prom"
+    monkeypatch.setenv(github_client.METRICS_FILE_ENV, str(path))
+    monkeypatch.setattr(github_client, "metrics", client.metrics)
+    github_client._write_metrics()
+    assert path.read_text() == text
+
+
+def test_get_client(monkeypatch):
+    monkeypatch.setattr(github_client, "_clients", {})
+    monkeypatch.setattr(github_client.atexit, "register", lambda function: None)
+    monkeypatch.setenv(github_client.TOKEN_ENV, "bot")
+
+    client = github_client.get_client()
+    assert client is github_client.get_client("bot")
+    assert client is not github_client.get_client("other")
+    assert client.session.headers["Authorization"] == "Bearer bot"
+
+
+@responses.activate
+def test_graphql_rate_limit(client, fake_time):
+    reset = fake_time.now + 600
+    responses.post(
+        "https://api.github.com/graphql", json={}, headers=rate_limit_headers(0, reset)
+    )
+    responses.get(URL, json={}, headers=rate_limit_headers(4000, reset))
+
+    client.post("graphql", json={"query": "{ viewer { login } }"})
+    client.get(URL)
+
+    # The exhausted GraphQL rate limit doesn't hold back the REST requests
+    assert fake_time.sleeps == []
+    assert client.graphql_rate_limiter.remaining == 0
+    assert client.rate_limiter.remaining == 4000
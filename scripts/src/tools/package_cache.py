@@ -0,0 +1,134 @@
+"""Cache the chart packages built from chart sources, keyed by the content of the sources.
+
+The key of a chart source is a Merkle hash of its directory tree: each file is hashed
+along with its name and mode, each directory is hashed from the sorted hashes of its
+entries. Symbolic links are hashed by their target, as git does, and never descended
+into, so that a link loop can't be followed. As "helm package" follows them, the content
+of the file a link points to is hashed too. The same sources - and the same packaging
+tool, passed as salt - always map to the same key, while any change to a path, a mode,
+a link or a file content yields a new one.
+
+Packages are cached on disk if the PACKAGE_CACHE_DIR environment variable is set, along
+with their SHA-256 digest. A package whose digest doesn't match is never restored.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+
+CACHE_DIR_ENV = "PACKAGE_CACHE_DIR"
+CHUNK_SIZE = 64 * 1024
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_tree_hash(path):
+    """Get the Merkle hash of a directory tree.
+
+    Args:
+        path (str): Path to the directory.
+
+    Returns:
+        str: The hexadecimal SHA-256 hash of the tree.
+    """
+    h = hashlib.sha256()
+    for entry in sorted(os.scandir(path), key=lambda e: e.name):
+        if entry.is_symlink():
+            kind, mode, digest = "l", 0, os.readlink(entry.path)
+            if os.path.isfile(entry.path):
+                digest = f"{digest}\0{_file_digest(entry.path)}"
+        else:
+            if entry.is_dir(follow_symlinks=False):
+                kind, digest = "d", get_tree_hash(entry.path)
+            else:
+                kind, digest = "f", _file_digest(entry.path)
+            mode = stat.S_IMODE(entry.stat(follow_symlinks=False).st_mode)
+        h.update(f"{kind} {mode:o} {entry.name}\0{digest}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_package_key(path, salt=""):
+    """Get the cache key of the package built from the chart source at path.
+
+    Args:
+        path (str): Path to the chart source.
+        salt (str): Identifies the way the package is built, e.g. the helm version.
+
+    Returns:
+        str: The cache key.
+    """
+    h = hashlib.sha256()
+    h.update(salt.encode("utf-8"))
+    h.update(b"\0")
+    h.update(get_tree_hash(path).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _cache_paths(key):
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None, None
+    return os.path.join(directory, f"{key}.tgz"), os.path.join(directory, f"{key}.json")
+
+
+def restore_package(key, dest_path):
+    """Copy the cached package for key to dest_path, if any.
+
+    Args:
+        key (str): Cache key of the package, see get_package_key.
+        dest_path (str): Path to copy the package to.
+
+    Returns:
+        str: The SHA-256 digest of the package, or None if it is not cached.
+    """
+    package_path, metadata_path = _cache_paths(key)
+    if not package_path:
+        return None
+    try:
+        with open(metadata_path) as f:
+            digest = json.load(f)["sha256"]
+        if _file_digest(package_path) != digest:
+            print(f"[WARNING] Ignoring corrupted cached package {package_path}")
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    shutil.copyfile(package_path, dest_path)
+    return digest
+
+
+def store_package(key, path, digest=None):
+    """Store the package at path in the cache.
+
+    Args:
+        key (str): Cache key of the package, see get_package_key.
+        path (str): Path to the package.
+        digest (str): SHA-256 digest of the package, computed if not given.
+    """
+    package_path, metadata_path = _cache_paths(key)
+    if not package_path:
+        return
+    if digest is None:
+        digest = _file_digest(path)
+    directory = os.path.dirname(package_path)
+    os.makedirs(directory, exist_ok=True)
+
+    # The package is stored first, as only packages with metadata are restored
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    shutil.copyfile(path, tmp_path)
+    os.replace(tmp_path, package_path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"sha256": digest}, f)
+    os.replace(tmp_path, metadata_path)
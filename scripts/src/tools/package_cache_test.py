@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from tools import package_cache
+
+
+@pytest.fixture
+def chart_source(tmp_path):
+    src = tmp_path / "src"
+    (src / "templates").mkdir(parents=True)
+    (src / "Chart.yaml").write_text("apiVersion: v2\nname: awesome\nversion: 1.42.0\n")
+    (src / "values.yaml").write_text("replicas: 1\n")
+    (src / "templates" / "configmap.yaml").write_text("kind: ConfigMap\n")
+    return src
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setenv(package_cache.CACHE_DIR_ENV, str(directory))
+    return directory
+
+
+def test_tree_hash(chart_source):
+    key = package_cache.get_tree_hash(chart_source)
+    assert package_cache.get_tree_hash(chart_source) == key
+
+    # Any change to a content, a path or a mode changes the hash
+    (chart_source / "values.yaml").write_text("replicas: 2\n")
+    changed_content = package_cache.get_tree_hash(chart_source)
+    assert changed_content != key
+
+    (chart_source / "values.yaml").rename(chart_source / "templates" / "values.yaml")
+    changed_path = package_cache.get_tree_hash(chart_source)
+    assert changed_path not in (key, changed_content)
+
+    os.chmod(chart_source / "Chart.yaml", 0o600)
+    assert package_cache.get_tree_hash(chart_source) not in (
+        key,
+        changed_content,
+        changed_path,
+    )
+
+
+def test_tree_hash_symlinks(chart_source):
+    # A link loop is not followed
+    (chart_source / "templates" / "loop").symlink_to("..")
+    key = package_cache.get_tree_hash(chart_source)
+
+    (chart_source / "templates" / "loop").unlink()
+    (chart_source / "templates" / "loop").symlink_to(".")
+    assert package_cache.get_tree_hash(chart_source) != key
+
+    # The content of a linked file is hashed, as it is packaged
+    (chart_source / "values-prod.yaml").symlink_to("values.yaml")
+    key = package_cache.get_tree_hash(chart_source)
+    (chart_source / "values.yaml").write_text("replicas: 2\n")
+    assert package_cache.get_tree_hash(chart_source) != key
+
+    # Broken links are hashed by their target
+    (chart_source / "missing").symlink_to("does-not-exist")
+    key = package_cache.get_tree_hash(chart_source)
+    assert package_cache.get_tree_hash(chart_source) == key
+
+
+def test_package_key_salt(chart_source):
+    assert package_cache.get_package_key(
+        chart_source, "v3.14.0"
+    ) != package_cache.get_package_key(chart_source, "v3.15.0")
+
+
+def test_store_and_restore(tmp_path, cache_dir):
+    package = tmp_path / "awesome-1.42.0.tgz"
+    package.write_bytes(b"package")
+    dest = tmp_path / "restored.tgz"
+
+    assert package_cache.restore_package("key", dest) is None
+    package_cache.store_package("key", package, "digest")
+
+    # The digest doesn't match the content: the package is not restored
+    assert package_cache.restore_package("key", dest) is None
+
+    digest = package_cache._file_digest(package)
+    package_cache.store_package("key", package, digest)
+    assert package_cache.restore_package("key", dest) == digest
+    assert dest.read_bytes() == b"package"
+
+
+def test_store_computes_digest(tmp_path, cache_dir):
+    package = tmp_path / "awesome-1.42.0.tgz"
+    package.write_bytes(b"package")
+
+    package_cache.store_package("key", package)
+
+    digest = package_cache._file_digest(package)
+    assert package_cache.restore_package("key", tmp_path / "restored.tgz") == digest
+
+
+def test_no_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv(package_cache.CACHE_DIR_ENV, raising=False)
+    package = tmp_path / "awesome-1.42.0.tgz"
+    package.write_bytes(b"package")
+
+    package_cache.store_package("key", package, "digest")
+    assert package_cache.restore_package("key", tmp_path / "restored.tgz") is None
@@ -0,0 +1,164 @@
+"""Compute the SHA-256 digest of remote chart packages.
+
+The package is streamed in chunks into hashlib instead of being loaded in memory, over
+sessions shared by all the calls of the process. The sessions retry on server errors.
+Callers waiting for a GitHub release asset can also retry on 404, as assets can take
+some time to be available after the release has been created. Packages larger than
+MAX_PACKAGE_SIZE are rejected.
+
+Computed digests are cached, keyed by the URL along with the strong ETag and the
+Content-Length returned for it, so that the same package is only downloaded once per
+process. Responses without a strong ETag are never cached: the size alone doesn't
+identify the content. If the DIGEST_CACHE_DIR environment variable is set, digests are
+also cached on disk in that directory, to be shared with later jobs. Callers checking
+the integrity of a package hosted by a third party should not use the cache at all.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+CACHE_DIR_ENV = "DIGEST_CACHE_DIR"
+MAX_PACKAGE_SIZE = 100 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+REQUEST_TIMEOUT = 30
+
+
+class PackageTooLargeError(Exception):
+    """This exception is raised when the package is larger than the maximum size"""
+
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# Sessions, by whether they retry on 404
+_sessions = {}
+
+# Computed digests, by cache key
+_digests = {}
+
+
+def get_session(retry_missing=False):
+    """Return the retrying HTTP session shared by the process.
+
+    Args:
+        retry_missing (bool): Whether the session also retries on 404.
+    """
+    if retry_missing not in _sessions:
+        retry = Retry(
+            total=4,
+            backoff_factor=3,
+            status_forcelist=RETRY_STATUSES + ([404] if retry_missing else []),
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _sessions[retry_missing] = session
+    return _sessions[retry_missing]
+
+
+def _cache_key(url, headers):
+    """Key of the digest of the package at url, or None if it can't be validated."""
+    etag = headers.get("ETag")
+    content_length = headers.get("Content-Length")
+    if not etag or etag.startswith("W/"):
+        # Weak ETags don't guarantee that the content is the same
+        return None
+    h = hashlib.sha256()
+    for part in (url, etag, content_length):
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _cache_path(key):
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+    return os.path.join(directory, f"{key}.json")
+
+
+def _get_cached(key):
+    if key in _digests:
+        return _digests[key]
+    path = _cache_path(key)
+    if path:
+        try:
+            with open(path) as fd:
+                _digests[key] = json.load(fd)["sha256"]
+                return _digests[key]
+        except (OSError, ValueError, KeyError):
+            pass
+    return None
+
+
+def _put_cached(key, url, digest):
+    _digests[key] = digest
+    path = _cache_path(key)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"url": url, "sha256": digest}, f)
+        os.replace(tmp_path, path)
+
+
+def get_package_digest(
+    url, max_size=MAX_PACKAGE_SIZE, use_cache=True, retry_missing=False
+):
+    """Get the SHA-256 digest of the package at url.
+
+    Args:
+        url (str): URL of the chart package.
+        max_size (int): Maximum size of the package, in bytes.
+        use_cache (bool): Whether the digest can be served from, and stored in, the
+                          cache.
+        retry_missing (bool): Whether to retry if the package is not found (404).
+
+    Returns:
+        str: The hexadecimal SHA-256 digest of the package, or None if the package
+             couldn't be downloaded.
+
+    Raises:
+        PackageTooLargeError: if the package is larger than max_size.
+    """
+    with get_session(retry_missing).get(
+        url, allow_redirects=True, stream=True, timeout=REQUEST_TIMEOUT
+    ) as response:
+        print(f"[DEBUG]: response code get request: {response.status_code}")
+        if response.status_code != 200:
+            return None
+
+        key = _cache_key(url, response.headers) if use_cache else None
+        if key:
+            digest = _get_cached(key)
+            if digest:
+                print(f"[INFO] package digest cache hit: {url}")
+                return digest
+
+        content_length = response.headers.get("Content-Length")
+        if content_length and int(content_length) > max_size:
+            raise PackageTooLargeError(
+                f"Package at {url} is larger than {max_size} bytes: {content_length}"
+            )
+
+        h = hashlib.sha256()
+        size = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise PackageTooLargeError(
+                    f"Package at {url} is larger than {max_size} bytes"
+                )
+            h.update(chunk)
+
+    digest = h.hexdigest()
+    if key:
+        _put_cached(key, url, digest)
+    return digest
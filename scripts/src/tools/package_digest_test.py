@@ -0,0 +1,115 @@
+import hashlib
+
+import pytest
+import responses
+
+from tools import package_digest
+
+PACKAGE_URL = "https://example.com/awesome-1.42.0.tgz"
+PACKAGE_CONTENT = b"not really a tarball" * 10000
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(monkeypatch):
+    monkeypatch.setattr(package_digest, "_digests", {})
+    monkeypatch.delenv(package_digest.CACHE_DIR_ENV, raising=False)
+
+
+@responses.activate
+def test_digest_is_computed_once():
+    responses.get(PACKAGE_URL, body=PACKAGE_CONTENT, headers={"ETag": '"abc"'})
+    expected = hashlib.sha256(PACKAGE_CONTENT).hexdigest()
+
+    assert package_digest.get_package_digest(PACKAGE_URL) == expected
+    assert package_digest.get_package_digest(PACKAGE_URL) == expected
+    assert len(package_digest._digests) == 1
+
+
+@responses.activate
+def test_digest_cache_is_shared_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setenv(package_digest.CACHE_DIR_ENV, str(tmp_path))
+    responses.get(PACKAGE_URL, body=PACKAGE_CONTENT, headers={"ETag": '"abc"'})
+    expected = package_digest.get_package_digest(PACKAGE_URL)
+
+    # Simulate a later job: the cache directory is restored, and the server now
+    # returns the same ETag with different content.
+    monkeypatch.setattr(package_digest, "_digests", {})
+    responses.replace(
+        responses.GET, PACKAGE_URL, body=b"changed", headers={"ETag": '"abc"'}
+    )
+    assert package_digest.get_package_digest(PACKAGE_URL) == expected
+
+    # A different ETag invalidates the cached digest.
+    responses.replace(
+        responses.GET, PACKAGE_URL, body=b"changed", headers={"ETag": '"def"'}
+    )
+    assert (
+        package_digest.get_package_digest(PACKAGE_URL)
+        == hashlib.sha256(b"changed").hexdigest()
+    )
+
+
+@responses.activate
+def test_package_too_large():
+    responses.get(PACKAGE_URL, body=PACKAGE_CONTENT)
+
+    with pytest.raises(package_digest.PackageTooLargeError):
+        package_digest.get_package_digest(PACKAGE_URL, max_size=1000)
+
+
+@responses.activate
+def test_download_error():
+    responses.get(PACKAGE_URL, status=403)
+
+    assert package_digest.get_package_digest(PACKAGE_URL) is None
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"Content-Length": str(len(PACKAGE_CONTENT))},
+        {"ETag": 'W/"abc"', "Content-Length": str(len(PACKAGE_CONTENT))},
+    ],
+)
+@responses.activate
+def test_no_cache_without_strong_etag(headers):
+    responses.get(PACKAGE_URL, body=PACKAGE_CONTENT, headers=headers)
+    package_digest.get_package_digest(PACKAGE_URL)
+
+    # A package replaced with one of the same size is not served from the cache
+    replaced = b"x" * len(PACKAGE_CONTENT)
+    responses.replace(responses.GET, PACKAGE_URL, body=replaced, headers=headers)
+    assert (
+        package_digest.get_package_digest(PACKAGE_URL)
+        == hashlib.sha256(replaced).hexdigest()
+    )
+    assert not package_digest._digests
+
+
+@responses.activate
+def test_no_cache_for_verification():
+    responses.get(PACKAGE_URL, body=PACKAGE_CONTENT, headers={"ETag": '"abc"'})
+    package_digest.get_package_digest(PACKAGE_URL)
+
+    responses.replace(
+        responses.GET, PACKAGE_URL, body=b"changed", headers={"ETag": '"abc"'}
+    )
+    assert (
+        package_digest.get_package_digest(PACKAGE_URL, use_cache=False)
+        == hashlib.sha256(b"changed").hexdigest()
+    )
+
+
+def test_retry_missing():
+    assert (
+        404
+        not in package_digest.get_session()
+        .adapters["https://"]
+        .max_retries.status_forcelist
+    )
+    assert (
+        404
+        in package_digest.get_session(retry_missing=True)
+        .adapters["https://"]
+        .max_retries.status_forcelist
+    )
@@ -0,0 +1,111 @@
+"""Read and write serialized Helm repository index files.
+
+Helpers shared by updateindex and shards, which both update an index file in place
+and only re-serialize the entries that changed.
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import yaml
+
+try:
+    from yaml import CBaseLoader as BaseLoader
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import BaseLoader, SafeLoader
+
+sys.path.append("../")
+from indexfile import index_lookup, index_variants
+
+# Lines of a serialized index starting a top-level key
+TOP_LEVEL_LINE = re.compile(r"^[^\s#].*$", re.MULTILINE)
+# Lines of the entries block starting a chart entry (i.e. not a list item)
+ENTRY_KEY_LINE = re.compile(r"^  [^\s#-].*$", re.MULTILINE)
+# Chart entry names that yaml.dump writes as plain scalars (i.e. the common case)
+PLAIN_ENTRY_KEY = re.compile(r"  ([A-Za-z0-9][A-Za-z0-9_.-]*):(\s|$)")
+
+
+class IndexPatchError(Exception):
+    """This exception is raised when the index file can't be patched in place"""
+
+
+def replace_version(chart_entries, version, chart_entry):
+    """Build the new list of index entries of a chart, with chart_entry replacing any
+    existing entry for the same version."""
+    print("[INFO] Updating the chart entry with new version")
+    crtentries = []
+    for v in chart_entries:
+        if v["version"] == version:
+            continue
+        crtentries.append(v)
+    crtentries.append(chart_entry)
+    return crtentries
+
+
+def write_file(path, content):
+    """Atomically replace the content of the file at path."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    if os.path.exists(path):
+        shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def update_sidecars(
+    index_file, previous_content, content, updated_entries, entry_names=None
+):
+    """Write the JSON twins and derived artifacts of an index that was patched.
+
+    The current JSON twin is updated with the patched entries, instead of parsing the
+    whole index, if it is in sync with the index before the patch (i.e. they have the
+    same generation date). Otherwise, the new content of the index is parsed.
+
+    Args:
+        index_file (str): Path to the index file
+        previous_content (str): Content of the index before the patch
+        content (str): Content of the index after the patch
+        updated_entries (dict): The patched entries, by chart entry name
+        entry_names (set): All the chart entry names of the index after the patch, if
+                           entries may have been removed.
+    """
+    json_path, _ = index_lookup.get_sidecar_paths(index_file)
+    index_data = None
+    try:
+        with open(json_path) as f:
+            previous = json.load(f)
+        if previous.get("generated") == index_lookup.get_generated(previous_content):
+            entries = previous["entries"] | updated_entries
+            if entry_names is not None:
+                entries = {name: entries[name] for name in entry_names}
+            index_data = {
+                "apiVersion": previous.get("apiVersion", "v1"),
+                "entries": dict(sorted(entries.items())),
+                "generated": index_lookup.get_generated(content),
+            }
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if index_data is None:
+        print(f"[INFO] {json_path} is out of sync, parsing {index_file} instead")
+        index_data = yaml.load(content, Loader=SafeLoader)
+    index_lookup.write_sidecars(index_file, index_data)
+    index_variants.write_variants(index_file, index_data)
+
+
+def entry_key(line):
+    """Name of the chart entry defined at this line of the entries block."""
+    if line[2] == "?":
+        raise IndexPatchError(f"Unsupported complex key: {line}")
+    match = PLAIN_ENTRY_KEY.match(line)
+    if match:
+        return match.group(1)
+    try:
+        return list(yaml.load(line, Loader=BaseLoader))[0]
+    except (yaml.YAMLError, TypeError, IndexError) as e:
+        raise IndexPatchError(f"Unexpected line in entries: {line}") from e
@@ -0,0 +1,305 @@
+"""Maintain the Helm repository index as per-provider shards.
+
+The entries of the index are split into shard files, one per provider, e.g.
+index.d/red-hat.yaml, so that publishing a chart only rewrites the small shard of its
+provider. The canonical index.yaml is then generated by merging all the shards.
+
+The merge is incremental: the SHA-256 of each shard is recorded in index.d/shards.json
+along with the entries it holds, and the SHA-256 of the index.yaml that was built. A
+shard that hasn't changed since the previous build is not parsed again, the serialized
+entries are copied from the previous index.yaml. Only the shards that changed are loaded
+and dumped. The result is the same as dumping the whole index with yaml.dump.
+
+The previous index.yaml is only reused if it is the one built from the shards: if it
+has been modified since, e.g. by update-index, all the shards are re-serialized.
+
+Shards are plain YAML documents with the same apiVersion and entries keys as the index,
+and no generated date so that their content only changes with their entries.
+
+The shards are maintained by update-index with the --shards option, in a directory
+named after the index file, e.g. index.d for index.yaml (see get_shards_dir).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from glob import glob
+
+import yaml
+
+try:
+    from yaml import CDumper as Dumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import Dumper, SafeLoader
+
+sys.path.append("../")
+from updateindex import index_text
+
+LOCK_FILE = "shards.json"
+UNKNOWN_PROVIDER = "unknown"
+
+
+class ShardError(Exception):
+    """This exception is raised when the shards can't be merged into an index"""
+
+
+def get_shard_name(chart_entry):
+    """Get the name of the shard holding an index entry, derived from its provider.
+
+    Args:
+        chart_entry (dict): Index entry of a chart version
+
+    Returns:
+        str: The name of the shard, e.g. "red-hat" for the "Red Hat" provider.
+    """
+    provider = chart_entry.get("annotations", {}).get("charts.openshift.io/provider")
+    name = re.sub(r"[^a-z0-9]+", "-", str(provider or "").lower()).strip("-")
+    return name or UNKNOWN_PROVIDER
+
+
+def get_shards_dir(index_file):
+    """Get the directory of the shards of an index file, e.g. index.d for index.yaml."""
+    return f"{os.path.splitext(index_file)[0]}.d"
+
+
+def _shard_path(shards_dir, shard):
+    return os.path.join(shards_dir, f"{shard}.yaml")
+
+
+def _list_shards(shards_dir):
+    paths = sorted(glob(os.path.join(shards_dir, "*.yaml")))
+    return [os.path.basename(path)[: -len(".yaml")] for path in paths]
+
+
+def _read_lock(shards_dir):
+    """Read the lock file, as {"index_sha256": ..., "shards": {shard: info}}.
+
+    Returns:
+        dict: The content of the lock file, or None if it is missing or invalid.
+    """
+    try:
+        with open(os.path.join(shards_dir, LOCK_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_shard(shards_dir, shard):
+    try:
+        with open(_shard_path(shards_dir, shard)) as f:
+            data = yaml.load(f, Loader=SafeLoader)
+    except FileNotFoundError:
+        return {}
+    return data.get("entries") or {}
+
+
+def _write_shard(shards_dir, shard, entries):
+    path = _shard_path(shards_dir, shard)
+    if not entries:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    data = {"apiVersion": "v1", "entries": entries}
+    index_text.write_file(path, yaml.dump(data, Dumper=Dumper))
+
+
+def split_index(index_data, shards_dir):
+    """Write the shards holding all the entries of an index.
+
+    Args:
+        index_data (dict): Content of the Helm repo index
+        shards_dir (str): Directory of the shards
+    """
+    shards = {}
+    for entry_name, chart_entries in index_data["entries"].items():
+        # All the versions of a chart are kept in the shard of its latest version
+        shard = get_shard_name(chart_entries[-1]) if chart_entries else UNKNOWN_PROVIDER
+        shards.setdefault(shard, {})[entry_name] = chart_entries
+
+    os.makedirs(shards_dir, exist_ok=True)
+    for shard, entries in shards.items():
+        _write_shard(shards_dir, shard, entries)
+
+
+def update_shards(shards_dir, entries, chart_entries):
+    """Add index entries to the shards of their provider.
+
+    A chart moved to another provider is removed from its previous shard, found with
+    the lock file, or by loading all the shards if there is no lock file.
+
+    Args:
+        shards_dir (str): Directory of the shards
+        entries (list[dict]): The index entries to add, see
+                              updateindex.read_index_entries
+        chart_entries (list[dict]): The prepared index entries, see
+                                    updateindex.prepare_chart_entries
+
+    Returns:
+        list[str]: The names of the updated shards.
+    """
+    shards = {}
+
+    def get_shard(shard):
+        if shard not in shards:
+            shards[shard] = _load_shard(shards_dir, shard)
+        return shards[shard]
+
+    lock = _read_lock(shards_dir)
+    if lock is None:
+        shard_of_entry = {
+            entry_name: shard
+            for shard in _list_shards(shards_dir)
+            for entry_name in get_shard(shard)
+        }
+    else:
+        shard_of_entry = {
+            entry_name: shard
+            for shard, info in lock["shards"].items()
+            for entry_name in info["entries"]
+        }
+
+    for entry, chart_entry in zip(entries, chart_entries):
+        entry_name = entry["chart_entry_name"]
+        shard = get_shard_name(chart_entry)
+        previous_shard = shard_of_entry.get(entry_name, shard)
+        versions = get_shard(previous_shard).get(entry_name, [])
+        if previous_shard != shard:
+            print(f"[INFO] Moving {entry_name} from {previous_shard} to {shard}")
+            get_shard(previous_shard).pop(entry_name, None)
+            shard_of_entry[entry_name] = shard
+        get_shard(shard)[entry_name] = index_text.replace_version(
+            versions, entry["version"], chart_entry
+        )
+
+    os.makedirs(shards_dir, exist_ok=True)
+    for shard, shard_entries in shards.items():
+        _write_shard(shards_dir, shard, shard_entries)
+    return sorted(shards)
+
+
+def _read_entry_blocks(content):
+    """Get the serialized entries of the content of an index file, by entry name."""
+    starts = [m.start() for m in index_text.TOP_LEVEL_LINE.finditer(content)]
+    for i, start in enumerate(starts):
+        if content.startswith("entries:\n", start):
+            end = starts[i + 1] if i + 1 < len(starts) else len(content)
+            break
+    else:
+        return {}
+
+    try:
+        keys = [
+            (m.start(), index_text.entry_key(m.group()))
+            for m in index_text.ENTRY_KEY_LINE.finditer(
+                content, start + len("entries:\n"), end
+            )
+        ]
+    except index_text.IndexPatchError:
+        return {}
+    return {
+        key: content[offset : keys[n + 1][0] if n + 1 < len(keys) else end]
+        for n, (offset, key) in enumerate(keys)
+    }
+
+
+def _dump_entry_block(entry_name, chart_entries):
+    block = yaml.dump({"entries": {entry_name: chart_entries}}, Dumper=Dumper)
+    return block.split("\n", 1)[1]
+
+
+def build_index(shards_dir, index_file):
+    """Merge the shards into the index file.
+
+    Args:
+        shards_dir (str): Directory of the shards
+        index_file (str): Path to the index file to write. Its current content is
+                          reused for the shards that haven't changed since it was built,
+                          if it hasn't been modified since.
+
+    Returns:
+        list[str]: The names of the shards that were re-serialized.
+
+    Raises:
+        ShardError: if an entry is found in several shards.
+    """
+    lock = _read_lock(shards_dir) or {"index_sha256": None, "shards": {}}
+    try:
+        with open(index_file) as f:
+            previous_content = f.read()
+    except OSError:
+        previous_content = ""
+    previous_sha256 = hashlib.sha256(previous_content.encode("utf-8")).hexdigest()
+    if previous_content and lock["index_sha256"] != previous_sha256:
+        print(f"[INFO] {index_file} was modified since it was built from the shards")
+    lock_shards = lock["shards"] if lock["index_sha256"] == previous_sha256 else {}
+    previous_blocks = None
+    blocks = {}
+    new_lock = {}
+    reserialized = []
+    # Entries of the re-serialized shards, to update the JSON twins of the index
+    updated_entries = {}
+
+    for shard in _list_shards(shards_dir):
+        with open(_shard_path(shards_dir, shard), "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        shard_blocks = None
+        if lock_shards.get(shard, {}).get("sha256") == digest:
+            if previous_blocks is None:
+                previous_blocks = _read_entry_blocks(previous_content)
+            if all(name in previous_blocks for name in lock_shards[shard]["entries"]):
+                shard_blocks = {
+                    name: previous_blocks[name]
+                    for name in lock_shards[shard]["entries"]
+                }
+        if shard_blocks is None:
+            entries = yaml.load(content, Loader=SafeLoader).get("entries") or {}
+            shard_blocks = {
+                name: _dump_entry_block(name, chart_entries)
+                for name, chart_entries in entries.items()
+            }
+            reserialized.append(shard)
+            updated_entries |= entries
+
+        for name in shard_blocks:
+            if name in blocks:
+                raise ShardError(f"Entry {name} found in several shards, incl. {shard}")
+        blocks.update(shard_blocks)
+        new_lock[shard] = {"sha256": digest, "entries": sorted(shard_blocks)}
+
+    now = datetime.now(timezone.utc).astimezone().isoformat()
+    if blocks:
+        out = ["apiVersion: v1\nentries:\n"]
+        out.extend(blocks[name] for name in sorted(blocks))
+    else:
+        out = ["apiVersion: v1\nentries: {}\n"]
+    out.append(yaml.dump({"generated": now}, Dumper=Dumper))
+    content = "".join(out)
+    index_text.write_file(index_file, content)
+    index_text.update_sidecars(
+        index_file, previous_content, content, updated_entries, set(blocks)
+    )
+
+    os.makedirs(shards_dir, exist_ok=True)
+    index_text.write_file(
+        os.path.join(shards_dir, LOCK_FILE),
+        json.dumps(
+            {
+                "index_sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                "shards": new_lock,
+            },
+            indent=2,
+            sort_keys=True,
+        )
+        + "\n",
+    )
+    print(
+        f"[INFO] Built {index_file} from {len(new_lock)} shards, "
+        f"re-serialized: {', '.join(reserialized) or 'none'}"
+    )
+    return reserialized
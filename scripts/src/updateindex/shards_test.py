@@ -0,0 +1,185 @@
+import copy
+import json
+import re
+
+import pytest
+import yaml
+
+from updateindex import shards, updateindex
+from updateindex.updateindex_test import FrozenDatetime, index, make_entry
+
+
+@pytest.fixture(autouse=True)
+def frozen_time(monkeypatch):
+    monkeypatch.setattr(shards, "datetime", FrozenDatetime)
+    monkeypatch.setattr(updateindex, "datetime", FrozenDatetime)
+
+
+def make_index():
+    index_data = copy.deepcopy(index)
+    other = index_data["entries"]["other-chart"][0]
+    other["annotations"]["charts.openshift.io/provider"] = "Red Hat"
+    index_data["generated"] = FrozenDatetime.now().astimezone().isoformat()
+    return index_data
+
+
+@pytest.fixture
+def sharded_index(tmp_path):
+    shards_dir = tmp_path / "index.d"
+    index_file = tmp_path / "index.yaml"
+    shards.split_index(make_index(), str(shards_dir))
+    assert sorted(p.name for p in shards_dir.iterdir()) == [
+        "acme.yaml",
+        "red-hat.yaml",
+        "unknown.yaml",
+    ]
+    assert shards.build_index(str(shards_dir), str(index_file)) == [
+        "acme",
+        "red-hat",
+        "unknown",
+    ]
+    return shards_dir, index_file
+
+
+def test_build_matches_full_dump(sharded_index):
+    _, index_file = sharded_index
+    assert index_file.read_text() == yaml.dump(make_index(), Dumper=updateindex.Dumper)
+
+
+def test_build_is_incremental(sharded_index):
+    shards_dir, index_file = sharded_index
+
+    # Nothing changed: nothing is re-serialized
+    assert shards.build_index(str(shards_dir), str(index_file)) == []
+
+    chart_entry = make_entry("awesome", "1.2.0")
+    entries = [{"chart_entry_name": "acme-awesome", "version": "1.2.0"}]
+    assert shards.update_shards(str(shards_dir), entries, [chart_entry]) == ["acme"]
+    assert shards.build_index(str(shards_dir), str(index_file)) == ["acme"]
+
+    expected = make_index()
+    expected["entries"]["acme-awesome"].append(chart_entry)
+    assert index_file.read_text() == yaml.dump(expected, Dumper=updateindex.Dumper)
+
+    # The JSON twin is updated with the re-serialized shards only
+    json_path, _ = updateindex.index_lookup.get_sidecar_paths(str(index_file))
+    with open(json_path) as f:
+        assert json.load(f) == expected
+
+
+def test_entry_moved_to_other_provider(sharded_index):
+    shards_dir, index_file = sharded_index
+
+    chart_entry = make_entry("chart", "0.2.0")
+    entries = [{"chart_entry_name": "other-chart", "version": "0.2.0"}]
+    assert shards.update_shards(str(shards_dir), entries, [chart_entry]) == [
+        "acme",
+        "red-hat",
+    ]
+    assert not (shards_dir / "red-hat.yaml").exists()
+    shards.build_index(str(shards_dir), str(index_file))
+
+    expected = make_index()
+    expected["entries"]["other-chart"].append(chart_entry)
+    assert yaml.safe_load(index_file.read_text()) == expected
+    lock = json.loads((shards_dir / shards.LOCK_FILE).read_text())
+    assert "other-chart" in lock["shards"]["acme"]["entries"]
+
+
+def test_duplicate_entry(sharded_index):
+    shards_dir, index_file = sharded_index
+    (shards_dir / "other.yaml").write_text(
+        yaml.dump({"apiVersion": "v1", "entries": {"acme-awesome": []}})
+    )
+
+    with pytest.raises(shards.ShardError):
+        shards.build_index(str(shards_dir), str(index_file))
+
+
+def test_build_ignores_modified_index(sharded_index):
+    shards_dir, index_file = sharded_index
+    expected = index_file.read_text()
+
+    # The index is modified outside of the shards, e.g. by update-index
+    tampered = re.sub(r"digest: \S+", "digest: TAMPERED", expected, count=1)
+    assert tampered != expected
+    index_file.write_text(tampered)
+
+    assert shards.build_index(str(shards_dir), str(index_file)) == [
+        "acme",
+        "red-hat",
+        "unknown",
+    ]
+    assert "TAMPERED" not in index_file.read_text()
+    assert index_file.read_text() == yaml.dump(make_index(), Dumper=updateindex.Dumper)
+
+    # The rebuilt index is trusted again
+    assert shards.build_index(str(shards_dir), str(index_file)) == []
+
+
+def test_entry_moved_without_lock(sharded_index):
+    shards_dir, index_file = sharded_index
+    (shards_dir / shards.LOCK_FILE).unlink()
+
+    chart_entry = make_entry("chart", "0.2.0")
+    entries = [{"chart_entry_name": "other-chart", "version": "0.2.0"}]
+    assert shards.update_shards(str(shards_dir), entries, [chart_entry]) == [
+        "acme",
+        "red-hat",
+        "unknown",
+    ]
+    assert not (shards_dir / "red-hat.yaml").exists()
+    shards.build_index(str(shards_dir), str(index_file))
+
+    expected = make_index()
+    expected["entries"]["other-chart"].append(chart_entry)
+    assert yaml.safe_load(index_file.read_text()) == expected
+
+
+def test_entry_moved_from_outdated_lock(sharded_index):
+    shards_dir, index_file = sharded_index
+    # The lock lists the entry in a shard that doesn't hold it anymore
+    (shards_dir / "red-hat.yaml").unlink()
+
+    chart_entry = make_entry("chart", "0.2.0")
+    entries = [{"chart_entry_name": "other-chart", "version": "0.2.0"}]
+    shards.update_shards(str(shards_dir), entries, [chart_entry])
+
+    entries = yaml.safe_load((shards_dir / "acme.yaml").read_text())["entries"]
+    assert entries["other-chart"] == [chart_entry]
+
+
+def test_update_index_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        updateindex, "download_index", lambda *args: copy.deepcopy(make_index())
+    )
+    chart_entry = make_entry("awesome", "1.2.0")
+    entries = [{"chart_entry_name": "acme-awesome", "version": "1.2.0"}]
+
+    # The shards are created from the index the first time
+    updateindex.update_index_shards(
+        "index.yaml", "o/r", "gh-pages", entries, [chart_entry]
+    )
+
+    assert shards.get_shards_dir("index.yaml") == "index.d"
+    assert sorted(p.name for p in (tmp_path / "index.d").iterdir()) == [
+        "acme.yaml",
+        "red-hat.yaml",
+        shards.LOCK_FILE,
+        "unknown.yaml",
+    ]
+    expected = make_index()
+    expected["entries"]["acme-awesome"].append(chart_entry)
+    index_file = tmp_path / "index.yaml"
+    assert index_file.read_text() == yaml.dump(expected, Dumper=updateindex.Dumper)
+
+    # Then the index is only built from the shards
+    monkeypatch.setattr(updateindex, "download_index", None)
+    chart_entry = make_entry("awesome", "1.3.0")
+    entries = [{"chart_entry_name": "acme-awesome", "version": "1.3.0"}]
+    updateindex.update_index_shards(
+        "index.yaml", "o/r", "gh-pages", entries, [chart_entry]
+    )
+    expected["entries"]["acme-awesome"].append(chart_entry)
+    assert index_file.read_text() == yaml.dump(expected, Dumper=updateindex.Dumper)
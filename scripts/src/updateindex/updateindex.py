@@ -2,23 +2,41 @@
 
 import argparse
 import base64
-import hashlib
+import concurrent.futures
 import json
 import os
 import sys
 from datetime import datetime, timezone
 
-import requests
 import yaml
 from environs import Env
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
 
 try:
     from yaml import CDumper as Dumper
-    from yaml import CLoader as Loader
+    from yaml import CSafeLoader as SafeLoader
 except ImportError:
-    from yaml import Dumper, Loader
+    from yaml import Dumper, SafeLoader
+
+sys.path.append("../")
+from indexfile import index_cache, index_lookup, index_variants
+from tools import package_digest
+from updateindex import shards
+from updateindex.index_text import (
+    ENTRY_KEY_LINE,
+    TOP_LEVEL_LINE,
+    IndexPatchError,
+    entry_key,
+    replace_version,
+    update_sidecars,
+    write_file,
+)
+
+# Keys of the records of a JSON lines file of entries to add
+ENTRY_RECORD_KEYS = ["chart_entry_name", "version", "chart_url", "chart_entry"]
+
+
+class IndexUpdateError(Exception):
+    """This exception is raised when a batch of index entries can't be added"""
 
 
 def _decode_chart_entry(chart_entry_encoded):
@@ -49,20 +67,72 @@ def download_index(index_file, repository, branch):
         dict: The current content of the index
     """
     print(f"Downloading {index_file}")
-    r = requests.get(
-        f"https://raw.githubusercontent.com/{repository}/{branch}/{index_file}"
-    )
+    index_url = f"https://raw.githubusercontent.com/{repository}/{branch}/{index_file}"
     now = datetime.now(timezone.utc).astimezone().isoformat()
 
-    if r.status_code == 200:
-        data = yaml.load(r.text, Loader=Loader)
+    try:
+        data = index_cache.get_index(index_url, mutable=True)
         data["generated"] = now
-    else:
+    except index_cache.IndexDownloadError:
         data = {"apiVersion": "v1", "generated": now, "entries": {}}
 
     return data
 
 
+def _get_entry_name():
+    entry_name = os.environ.get("CHART_ENTRY_NAME")
+    if not entry_name:
+        print("[ERROR] Internal error: missing chart entry name")
+        sys.exit(1)
+    return entry_name
+
+
+def _prepare_chart_entry(chart_entry, chart_url, web_catalog_only):
+    """Set the URL, digest and submission timestamp of the index entry to add.
+
+    Args:
+        chart_entry (dict): Index entry to add
+        chart_url (str): URL of the Chart
+        web_catalog_only (bool): Set to True if the provider has chosen the Web Catalog
+                                 Only option.
+
+    Returns:
+        dict: The index entry, updated in place.
+    """
+    now = datetime.now(timezone.utc).astimezone().isoformat()
+
+    chart_entry["urls"] = [chart_url]
+    if not web_catalog_only:
+        set_package_digest(chart_entry, chart_url)
+    chart_entry["annotations"]["charts.openshift.io/submissionTimestamp"] = now
+    return chart_entry
+
+
+def _update_chart_entries(
+    chart_entries,
+    version,
+    chart_url,
+    chart_entry,
+    web_catalog_only,
+):
+    """Build the new list of index entries of a chart, with the given version added.
+
+    Args:
+        chart_entries (list): Current index entries of the chart
+        version (str): The version of the chart (ex: 1.4.0)
+        chart_url (str): URL of the Chart
+        chart_entry (dict): Index entry to add
+        web_catalog_only (bool): Set to True if the provider has chosen the Web Catalog
+                                 Only option.
+
+    Returns:
+        list: The new index entries of the chart. Any existing entry for the same
+              version is replaced.
+    """
+    chart_entry = _prepare_chart_entry(chart_entry, chart_url, web_catalog_only)
+    return replace_version(chart_entries, version, chart_entry)
+
+
 def update_index(
     index_data,
     version,
@@ -81,26 +151,14 @@ def update_index(
                                  Only option.
 
     """
-    now = datetime.now(timezone.utc).astimezone().isoformat()
-
-    print("[INFO] Updating the chart entry with new version")
-    crtentries = []
-    entry_name = os.environ.get("CHART_ENTRY_NAME")
-    if not entry_name:
-        print("[ERROR] Internal error: missing chart entry name")
-        sys.exit(1)
-    d = index_data["entries"].get(entry_name, [])
-    for v in d:
-        if v["version"] == version:
-            continue
-        crtentries.append(v)
-
-    chart_entry["urls"] = [chart_url]
-    if not web_catalog_only:
-        set_package_digest(chart_entry, chart_url)
-    chart_entry["annotations"]["charts.openshift.io/submissionTimestamp"] = now
-    crtentries.append(chart_entry)
-    index_data["entries"][entry_name] = crtentries
+    entry_name = _get_entry_name()
+    index_data["entries"][entry_name] = _update_chart_entries(
+        index_data["entries"].get(entry_name, []),
+        version,
+        chart_url,
+        chart_entry,
+        web_catalog_only,
+    )
 
 
 def set_package_digest(chart_entry, chart_url):
@@ -116,26 +174,11 @@ def set_package_digest(chart_entry, chart_url):
 
     """
     print("[INFO] set package digests.")
-
-    retry = Retry(
-        total=4,
-        backoff_factor=3,
-        status_forcelist=[404, 429, 500, 502, 503, 504],
-        raise_on_status=False,
-    )
-    session = requests.Session()
-    session.mount("https://", HTTPAdapter(max_retries=retry))
-
-    head = session.head(chart_url, allow_redirects=True)
     print(f"[DEBUG]: tgz url : {chart_url}")
-    print(f"[DEBUG]: response code from head request: {head.status_code}")
 
-    target_digest = ""
-    if head.status_code == 200:
-        response = requests.get(chart_url, allow_redirects=True)
-        print(f"[DEBUG]: response code get request: {response.status_code}")
-        target_digest = hashlib.sha256(response.content).hexdigest()
-        print(f"[DEBUG]: calculated digest : {target_digest}")
+    # The release asset can take some time to be available
+    target_digest = package_digest.get_package_digest(chart_url, retry_missing=True)
+    print(f"[DEBUG]: calculated digest : {target_digest}")
 
     pkg_digest = ""
     if "digest" in chart_entry:
@@ -168,8 +211,368 @@ def write_index_file(index_data, index_file):
     """
     out = yaml.dump(index_data, Dumper=Dumper)
     print(f"{index_file} content:\n", out)
-    with open(index_file, "w") as fd:
-        fd.write(out)
+    write_file(index_file, out)
+    index_lookup.write_sidecars(index_file, index_data)
+    index_variants.write_variants(index_file, index_data)
+
+
+class IndexPatch:
+    """Locate the entries of a chart and the generated date in a serialized index.
+
+    The index is expected to be formatted as written by write_index_file (i.e. by
+    yaml.dump): top-level keys at column 0, chart entries sorted and indented by 2
+    spaces under "entries:", and the versions of each chart as a block sequence.
+    Only the lines starting a top-level key or a chart entry are looked at, the
+    content of the other entries is neither parsed nor copied until apply is called.
+
+    """
+
+    def __init__(self, content, entry_name):
+        self.content = content
+        self.entry_name = entry_name
+
+        # Top-level blocks, as (key line, start offset, end offset)
+        starts = [(m.group(), m.start()) for m in TOP_LEVEL_LINE.finditer(content)]
+        blocks = [
+            (line, start, starts[i + 1][1] if i + 1 < len(starts) else len(content))
+            for i, (line, start) in enumerate(starts)
+        ]
+
+        def find_block(key):
+            for block in blocks:
+                if block[0].startswith(f"{key}:"):
+                    return block
+            raise IndexPatchError(f"No top-level {key} key found")
+
+        _, self.generated_start, self.generated_end = find_block("generated")
+
+        entries_line, entries_start, entries_end = find_block("entries")
+        entries_line = entries_line.rstrip()
+        if entries_line == "entries: {}":
+            # Empty index: replace the whole entries block
+            self.start, self.end = entries_start, entries_end
+            self.header = True
+            self.chart_entries = []
+            return
+        if entries_line != "entries:":
+            raise IndexPatchError(f"Unexpected entries line: {entries_line}")
+
+        self.header = False
+        keys = [
+            (m.start(), entry_key(m.group()))
+            for m in ENTRY_KEY_LINE.finditer(
+                content, entries_start + len(entries_line) + 1, entries_end
+            )
+        ]
+
+        # Entries are sorted: the chart is either found or inserted before the first
+        # entry that sorts after it.
+        self.start = self.end = entries_end
+        self.chart_entries = []
+        for n, (offset, key) in enumerate(keys):
+            if key == entry_name:
+                self.start = offset
+                self.end = keys[n + 1][0] if n + 1 < len(keys) else entries_end
+                block = content[self.start : self.end]
+                try:
+                    self.chart_entries = (
+                        yaml.load(block, Loader=SafeLoader)[entry_name] or []
+                    )
+                except (yaml.YAMLError, TypeError, KeyError) as e:
+                    raise IndexPatchError(f"Invalid entries of {entry_name}") from e
+                break
+            if key > entry_name:
+                self.start = self.end = offset
+                break
+
+    def apply(self, chart_entries, generated):
+        """Return the serialized index with the chart entries and generated date
+        replaced.
+
+        Args:
+            chart_entries (list): New index entries of the chart
+            generated (str): New generation date of the index
+
+        Returns:
+            str: The new content of the index
+        """
+        block = yaml.dump({"entries": {self.entry_name: chart_entries}}, Dumper=Dumper)
+        if not self.header:
+            block = block.split("\n", 1)[1]
+        generated_block = yaml.dump({"generated": generated}, Dumper=Dumper)
+
+        splices = sorted(
+            [
+                (self.start, self.end, block),
+                (self.generated_start, self.generated_end, generated_block),
+            ]
+        )
+        out = []
+        offset = 0
+        for start, end, text in splices:
+            out.append(self.content[offset:start])
+            out.append(text)
+            offset = end
+        out.append(self.content[offset:])
+        return "".join(out)
+
+
+def patch_index_file(
+    index_file, repository, branch, version, chart_url, chart_entry, web_catalog_only
+):
+    """Update the index file in place, without loading and dumping the whole index.
+
+    Only the entries of the chart and the generated date are re-serialized and spliced
+    into the current index. The result is the same as with download_index,
+    update_index and write_index_file.
+
+    Args:
+        index_file (str): Path to the index file to update
+        repository (str): Name of the git Repository
+        branch (str): Git branch that hosts the Helm repository index
+        version (str): The version of the chart (ex: 1.4.0)
+        chart_url (str): URL of the Chart
+        chart_entry (dict): Index entry to add
+        web_catalog_only (bool): Set to True if the provider has chosen the Web Catalog
+                                 Only option.
+
+    Raises:
+        IndexPatchError: if the index can't be patched and must be rewritten instead.
+    """
+    print(f"Downloading {index_file}")
+    index_url = f"https://raw.githubusercontent.com/{repository}/{branch}/{index_file}"
+    try:
+        content = index_cache.get_index_content(index_url).decode("utf-8")
+    except index_cache.IndexDownloadError as e:
+        raise IndexPatchError(str(e)) from e
+
+    entry_name = _get_entry_name()
+    patch = IndexPatch(content, entry_name)
+    chart_entries = _update_chart_entries(
+        patch.chart_entries, version, chart_url, chart_entry, web_catalog_only
+    )
+    now = datetime.now(timezone.utc).astimezone().isoformat()
+
+    out = patch.apply(chart_entries, now)
+    print(
+        f"{index_file} entries for {entry_name}:\n",
+        yaml.dump(chart_entries, Dumper=Dumper),
+    )
+    write_file(index_file, out)
+    update_sidecars(index_file, content, out, {entry_name: chart_entries})
+
+
+def read_index_entries(entries_file, web_catalog_only):
+    """Read the index entries to add from a JSON lines file.
+
+    Each line is an object with the chart_entry_name, version, chart_url and
+    chart_entry (the index entry to add) keys, as written by chart-repo-manager in
+    batch mode. Entries with a web_catalog_only value other than the one of the index
+    file being updated belong to the other index file, and are skipped.
+
+    Args:
+        entries_file (str): Path to the JSON lines file
+        web_catalog_only (bool): Whether the index file being updated is the one of the
+                                 Web Catalog Only charts.
+
+    Returns:
+        list[dict]: The index entries to add.
+
+    Raises:
+        IndexUpdateError: if a line is not a valid index entry to add.
+    """
+    entries = []
+    with open(entries_file) as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                missing = [k for k in ENTRY_RECORD_KEYS if k not in entry]
+            except ValueError as e:
+                raise IndexUpdateError(f"{entries_file}:{n}: {e}") from e
+            if missing:
+                raise IndexUpdateError(f"{entries_file}:{n}: missing {missing}")
+            if entry.get("web_catalog_only", web_catalog_only) != web_catalog_only:
+                print(
+                    f"[INFO] Skipping {entry['chart_entry_name']} {entry['version']}: "
+                    "it belongs to the other index file"
+                )
+                continue
+            entries.append(entry)
+    return entries
+
+
+def prepare_chart_entries(entries, web_catalog_only, jobs=8):
+    """Prepare all the index entries to add, verifying their digest in parallel.
+
+    Args:
+        entries (list[dict]): The index entries to add, see read_index_entries
+        web_catalog_only (bool): Set to True if the provider has chosen the Web Catalog
+                                 Only option.
+        jobs (int): Maximum number of packages downloaded in parallel
+
+    Returns:
+        list[dict]: The prepared index entries, in the same order.
+
+    Raises:
+        IndexUpdateError: if any of the entries fails the integrity checks. In that
+                          case, none of the entries must be added.
+    """
+
+    def prepare(entry):
+        return _prepare_chart_entry(
+            entry["chart_entry"], entry["chart_url"], web_catalog_only
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(prepare, entry) for entry in entries]
+        concurrent.futures.wait(futures)
+
+    errors = []
+    for entry, future in zip(entries, futures):
+        if future.exception():
+            errors.append(
+                f"{entry['chart_entry_name']} {entry['version']}: {future.exception()}"
+            )
+    if errors:
+        raise IndexUpdateError(
+            f"{len(errors)} of {len(entries)} entries failed: " + "; ".join(errors)
+        )
+    return [future.result() for future in futures]
+
+
+def update_index_entries(index_data, entries, chart_entries):
+    """Update the Helm repository index with several prepared entries.
+
+    Args:
+        index_data (dict): Content of the Helm repo index
+        entries (list[dict]): The index entries to add, see read_index_entries
+        chart_entries (list[dict]): The prepared index entries, see
+                                    prepare_chart_entries
+    """
+    for entry, chart_entry in zip(entries, chart_entries):
+        entry_name = entry["chart_entry_name"]
+        index_data["entries"][entry_name] = replace_version(
+            index_data["entries"].get(entry_name, []), entry["version"], chart_entry
+        )
+
+
+def patch_index_entries(index_file, repository, branch, entries, chart_entries):
+    """Update the index file in place with several prepared entries.
+
+    As with patch_index_file, only the entries of the updated charts are
+    re-serialized.
+
+    Args:
+        index_file (str): Path to the index file to update
+        repository (str): Name of the git Repository
+        branch (str): Git branch that hosts the Helm repository index
+        entries (list[dict]): The index entries to add, see read_index_entries
+        chart_entries (list[dict]): The prepared index entries, see
+                                    prepare_chart_entries
+
+    Raises:
+        IndexPatchError: if the index can't be patched and must be rewritten instead.
+    """
+    print(f"Downloading {index_file}")
+    index_url = f"https://raw.githubusercontent.com/{repository}/{branch}/{index_file}"
+    try:
+        content = index_cache.get_index_content(index_url).decode("utf-8")
+    except index_cache.IndexDownloadError as e:
+        raise IndexPatchError(str(e)) from e
+
+    now = datetime.now(timezone.utc).astimezone().isoformat()
+    out = content
+    updated_entries = {}
+    for entry, chart_entry in zip(entries, chart_entries):
+        patch = IndexPatch(out, entry["chart_entry_name"])
+        updated_entries[entry["chart_entry_name"]] = replace_version(
+            patch.chart_entries, entry["version"], chart_entry
+        )
+        out = patch.apply(updated_entries[entry["chart_entry_name"]], now)
+    write_file(index_file, out)
+    update_sidecars(index_file, content, out, updated_entries)
+
+
+def update_index_shards(index_file, repository, branch, entries, chart_entries):
+    """Add prepared entries to the shards of the index, then rebuild the index file.
+
+    The shards are created from the current index the first time. See shards.py.
+
+    Args:
+        index_file (str): Path to the index file to update
+        repository (str): Name of the git Repository
+        branch (str): Git branch that hosts the Helm repository index
+        entries (list[dict]): The index entries to add, see read_index_entries
+        chart_entries (list[dict]): The prepared index entries, see
+                                    prepare_chart_entries
+
+    Raises:
+        IndexUpdateError: if the shards can't be merged into the index.
+    """
+    shards_dir = shards.get_shards_dir(index_file)
+    if not os.path.isdir(shards_dir):
+        print(f"[INFO] Creating the shards of {index_file} in {shards_dir}")
+        shards.split_index(download_index(index_file, repository, branch), shards_dir)
+    shards.update_shards(shards_dir, entries, chart_entries)
+    try:
+        shards.build_index(shards_dir, index_file)
+    except shards.ShardError as e:
+        raise IndexUpdateError(str(e)) from e
+
+
+def update_index_file_from_entries(
+    index_file,
+    repository,
+    branch,
+    entries_file,
+    web_catalog_only,
+    patch,
+    jobs,
+    use_shards=False,
+):
+    """Add all the index entries of a JSON lines file to the index, at once.
+
+    Either all the entries are added, or, if any of them fails the integrity checks,
+    the index file is left untouched.
+
+    Args:
+        index_file (str): Path to the index file to update
+        repository (str): Name of the git Repository
+        branch (str): Git branch that hosts the Helm repository index
+        entries_file (str): Path to the JSON lines file, see read_index_entries
+        web_catalog_only (bool): Whether the index file being updated is the one of the
+                                 Web Catalog Only charts.
+        patch (bool): Only re-serialize the entries of the updated charts
+        jobs (int): Maximum number of packages downloaded in parallel
+        use_shards (bool): Add the entries to the shards of the index, then rebuild
+                           the index from them, see update_index_shards
+
+    Raises:
+        IndexUpdateError: if an entry is invalid or fails the integrity checks, or if
+                          the shards can't be merged into the index.
+    """
+    entries = read_index_entries(entries_file, web_catalog_only)
+    print(f"[INFO] Adding {len(entries)} entries to {index_file}")
+    if not entries:
+        return
+    chart_entries = prepare_chart_entries(entries, web_catalog_only, jobs)
+
+    if use_shards:
+        update_index_shards(index_file, repository, branch, entries, chart_entries)
+        return
+
+    if patch:
+        try:
+            patch_index_entries(index_file, repository, branch, entries, chart_entries)
+            return
+        except IndexPatchError as e:
+            print(f"[INFO] Cannot patch {index_file}, rewriting it instead: {e}")
+
+    index_data = download_index(index_file, repository, branch)
+    update_index_entries(index_data, entries, chart_entries)
+    write_index_file(index_data, index_file)
 
 
 def main():
@@ -203,7 +606,6 @@ def main():
         "--chart-url",
         dest="chart_url",
         type=str,
-        required=True,
         help="URL where the Chart is available",
     )
     parser.add_argument(
@@ -211,7 +613,6 @@ def main():
         "--chart-entry",
         dest="chart_entry_encoded",
         type=str,
-        required=True,
         help="Index entry to add",
     )
     parser.add_argument(
@@ -219,16 +620,98 @@ def main():
         "--version",
         dest="version",
         type=str,
-        required=True,
         help="Version of the chart being added",
     )
+    parser.add_argument(
+        "-p",
+        "--patch",
+        dest="patch",
+        action="store_true",
+        help="only re-serialize the entries of the chart instead of the whole index",
+    )
+    parser.add_argument(
+        "--entries-file",
+        dest="entries_file",
+        type=str,
+        help="JSON lines file of index entries to add at once, instead of a single entry",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=8,
+        help="with --entries-file, maximum number of packages downloaded in parallel",
+    )
+    parser.add_argument(
+        "-s",
+        "--shards",
+        dest="shards",
+        action="store_true",
+        help="maintain the index as per-provider shards, in a directory named after "
+        "the index file (e.g. index.d), and rebuild the index from them",
+    )
     args = parser.parse_args()
 
-    chart_entry = _decode_chart_entry(args.chart_entry_encoded)
-
     env = Env()
     web_catalog_only = env.bool("WEB_CATALOG_ONLY", False)
 
+    if args.entries_file:
+        try:
+            update_index_file_from_entries(
+                args.index_file,
+                args.repository,
+                args.index_branch,
+                args.entries_file,
+                web_catalog_only,
+                args.patch,
+                args.jobs,
+                args.shards,
+            )
+        except IndexUpdateError as e:
+            print(f"[ERROR] {args.index_file} not updated: {e}")
+            sys.exit(1)
+        return
+
+    if not (args.chart_url and args.chart_entry_encoded and args.version):
+        parser.error(
+            "--chart-url, --chart-entry and --version are required without --entries-file"
+        )
+    chart_entry = _decode_chart_entry(args.chart_entry_encoded)
+
+    if args.shards:
+        entries = [{"chart_entry_name": _get_entry_name(), "version": args.version}]
+        chart_entries = [
+            _prepare_chart_entry(chart_entry, args.chart_url, web_catalog_only)
+        ]
+        try:
+            update_index_shards(
+                args.index_file,
+                args.repository,
+                args.index_branch,
+                entries,
+                chart_entries,
+            )
+        except IndexUpdateError as e:
+            print(f"[ERROR] {args.index_file} not updated: {e}")
+            sys.exit(1)
+        return
+
+    if args.patch:
+        try:
+            patch_index_file(
+                args.index_file,
+                args.repository,
+                args.index_branch,
+                args.version,
+                args.chart_url,
+                chart_entry,
+                web_catalog_only,
+            )
+            return
+        except IndexPatchError as e:
+            print(f"[INFO] Cannot patch {args.index_file}, rewriting it instead: {e}")
+
     index_data = download_index(args.index_file, args.repository, args.index_branch)
     update_index(
         index_data,
@@ -0,0 +1,302 @@
+import copy
+import json
+from datetime import datetime
+
+import pytest
+import yaml
+
+from updateindex import updateindex
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2024, 5, 17, 9, 30, tzinfo=tz)
+
+
+def make_entry(name, version, **kwargs):
+    entry = {
+        "apiVersion": "v2",
+        "annotations": {
+            "charts.openshift.io/name": name.capitalize(),
+            "charts.openshift.io/provider": "Acme",
+            "charts.openshift.io/providerType": "partner",
+        },
+        "created": "2024-01-01T00:00:00.000000+00:00",
+        "description": f"A {name} chart",
+        "digest": "0123456789abcdef",
+        "name": name,
+        "urls": [f"https://example.com/{name}-{version}.tgz"],
+        "version": version,
+    }
+    entry.update(kwargs)
+    return entry
+
+
+index = {
+    "apiVersion": "v1",
+    "entries": {
+        "acme-awesome": [
+            make_entry("awesome", "1.0.0"),
+            make_entry(
+                "awesome",
+                "1.1.0",
+                description="Ünïcödé description spanning a very long line, long enough "
+                "to be wrapped by the YAML emitter: " + "lorem ipsum " * 20,
+                keywords=["a: b", "- c", "'quoted'"],
+            ),
+        ],
+        "acme-empty": [],
+        "other-chart": [
+            make_entry(
+                "chart",
+                "0.1.0",
+                dependencies=[{"name": "dep", "version": "1.0", "repository": ""}],
+                kubeVersion=">=1.25.0-0",
+                description="multi\nline\n\ndescription\n",
+            ),
+        ],
+        "zzz-last": [make_entry("last", "3.0.0")],
+    },
+    "generated": "2024-01-01T00:00:00.000000+00:00",
+}
+
+scenarios = [
+    # (entry name, version), for existing and new entries, in different positions
+    ("acme-awesome", "1.2.0"),
+    ("acme-awesome", "1.1.0"),
+    ("acme-empty", "1.0.0"),
+    ("aaa-first", "1.0.0"),
+    ("mid-chart", "1.0.0"),
+    ("zzz-last", "3.0.0"),
+    ("zzzz-after-last", "0.0.1"),
+]
+
+
+@pytest.fixture(autouse=True)
+def frozen_time(monkeypatch):
+    monkeypatch.setattr(updateindex, "datetime", FrozenDatetime)
+
+
+def full_rewrite(content, entry_name, version, chart_entry, monkeypatch):
+    """Reference implementation: load the whole index, update it and dump it."""
+    monkeypatch.setenv("CHART_ENTRY_NAME", entry_name)
+    index_data = yaml.load(content, Loader=yaml.SafeLoader)
+    index_data["generated"] = FrozenDatetime.now().astimezone().isoformat()
+    updateindex.update_index(
+        index_data, version, "https://example.com/chart.tgz", chart_entry, True
+    )
+    return yaml.dump(index_data, Dumper=updateindex.Dumper)
+
+
+def patch(content, entry_name, version, chart_entry):
+    p = updateindex.IndexPatch(content, entry_name)
+    chart_entries = updateindex._update_chart_entries(
+        p.chart_entries, version, "https://example.com/chart.tgz", chart_entry, True
+    )
+    return p.apply(chart_entries, FrozenDatetime.now().astimezone().isoformat())
+
+
+@pytest.mark.parametrize("entry_name, version", scenarios)
+def test_patch_matches_full_rewrite(entry_name, version, monkeypatch):
+    content = yaml.dump(index, Dumper=updateindex.Dumper)
+    chart_entry = make_entry(entry_name.split("-")[-1], version)
+
+    expected = full_rewrite(
+        content, entry_name, version, copy.deepcopy(chart_entry), monkeypatch
+    )
+    patched = patch(content, entry_name, version, copy.deepcopy(chart_entry))
+
+    assert yaml.safe_load(patched) == yaml.safe_load(expected)
+    assert patched == expected
+
+
+def test_patch_empty_index(monkeypatch):
+    content = yaml.dump(
+        {"apiVersion": "v1", "entries": {}, "generated": "2024"},
+        Dumper=updateindex.Dumper,
+    )
+    chart_entry = make_entry("awesome", "1.0.0")
+
+    expected = full_rewrite(
+        content, "acme-awesome", "1.0.0", copy.deepcopy(chart_entry), monkeypatch
+    )
+    patched = patch(content, "acme-awesome", "1.0.0", copy.deepcopy(chart_entry))
+
+    assert patched == expected
+
+
+def test_patch_unexpected_format():
+    content = '{"apiVersion": "v1", "entries": {}, "generated": "2024"}'
+
+    with pytest.raises(updateindex.IndexPatchError):
+        updateindex.IndexPatch(content, "acme-awesome")
+
+
+def test_patch_invalid_entry():
+    content = yaml.dump(index, Dumper=updateindex.Dumper).replace(
+        "  acme-awesome:\n", "  acme-awesome:\n  - name: [unclosed\n", 1
+    )
+
+    with pytest.raises(updateindex.IndexPatchError, match="acme-awesome"):
+        updateindex.IndexPatch(content, "acme-awesome")
+
+
+def write_entries_file(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+batch = [
+    ("acme-awesome", "1.2.0"),
+    ("aaa-first", "1.0.0"),
+    ("zzzz-after-last", "0.0.1"),
+    ("acme-awesome", "1.1.0"),
+]
+
+
+def make_record(entry_name, version, **kwargs):
+    record = {
+        "chart_entry_name": entry_name,
+        "version": version,
+        "chart_url": f"https://example.com/{entry_name}-{version}.tgz",
+        "chart_entry": make_entry(entry_name.split("-")[-1], version),
+    }
+    record.update(kwargs)
+    return record
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    """Digests of the packages, by URL. A missing URL can't be downloaded."""
+    digests = {}
+    monkeypatch.setattr(
+        updateindex.package_digest,
+        "get_package_digest",
+        lambda url, **kwargs: digests.get(url),
+    )
+    return digests
+
+
+def test_batch_matches_sequential_updates(tmp_path, digests, monkeypatch):
+    entries_file = tmp_path / "entries.jsonl"
+    records = [make_record(*e) for e in batch]
+    write_entries_file(entries_file, records)
+    for record in records:
+        digests[record["chart_url"]] = record["chart_entry"]["digest"]
+
+    expected = copy.deepcopy(index)
+    for record in copy.deepcopy(records):
+        monkeypatch.setenv("CHART_ENTRY_NAME", record["chart_entry_name"])
+        updateindex.update_index(
+            expected,
+            record["version"],
+            record["chart_url"],
+            record["chart_entry"],
+            False,
+        )
+
+    entries = updateindex.read_index_entries(entries_file, False)
+    chart_entries = updateindex.prepare_chart_entries(entries, False)
+    index_data = copy.deepcopy(index)
+    updateindex.update_index_entries(index_data, entries, chart_entries)
+    assert index_data == expected
+
+    # Patching the serialized index yields the same result
+    content = yaml.dump(index, Dumper=updateindex.Dumper)
+    monkeypatch.setattr(
+        updateindex.index_cache,
+        "get_index_content",
+        lambda url: content.encode("utf-8"),
+    )
+    index_file = tmp_path / "index.yaml"
+    updateindex.patch_index_entries(
+        str(index_file), "o/r", "gh-pages", entries, chart_entries
+    )
+    patched = yaml.safe_load(index_file.read_text())
+    expected["generated"] = patched["generated"]
+    assert patched == expected
+
+
+def test_batch_is_atomic(tmp_path, digests):
+    entries_file = tmp_path / "entries.jsonl"
+    records = [make_record(*e) for e in batch]
+    write_entries_file(entries_file, records)
+    for record in records[:-1]:
+        digests[record["chart_url"]] = record["chart_entry"]["digest"]
+    # The package of the last entry doesn't match its digest
+    digests[records[-1]["chart_url"]] = "fedcba9876543210"
+
+    index_file = tmp_path / "index.yaml"
+    index_file.write_text("untouched")
+    with pytest.raises(updateindex.IndexUpdateError, match="awesome 1.1.0"):
+        updateindex.update_index_file_from_entries(
+            str(index_file), "o/r", "gh-pages", str(entries_file), False, True, 4
+        )
+    assert index_file.read_text() == "untouched"
+
+
+def test_read_index_entries(tmp_path):
+    entries_file = tmp_path / "entries.jsonl"
+    write_entries_file(
+        entries_file,
+        [
+            make_record("acme-awesome", "1.2.0"),
+            make_record("acme-other", "1.0.0", web_catalog_only=True),
+        ],
+    )
+    entries = updateindex.read_index_entries(entries_file, False)
+    assert [e["chart_entry_name"] for e in entries] == ["acme-awesome"]
+
+    write_entries_file(entries_file, [{"chart_entry_name": "acme-awesome"}])
+    with pytest.raises(updateindex.IndexUpdateError, match="missing"):
+        updateindex.read_index_entries(entries_file, False)
+
+
+def read_json_twin(index_file):
+    json_path, lookup_path = updateindex.index_lookup.get_sidecar_paths(index_file)
+    with open(json_path) as f, open(lookup_path) as g:
+        return json.load(f), json.load(g)
+
+
+@pytest.mark.parametrize("in_sync", [True, False])
+def test_patch_updates_sidecars(tmp_path, digests, monkeypatch, in_sync):
+    entries_file = tmp_path / "entries.jsonl"
+    records = [make_record(*e) for e in batch]
+    write_entries_file(entries_file, records)
+    for record in records:
+        digests[record["chart_url"]] = record["chart_entry"]["digest"]
+    entries = updateindex.read_index_entries(entries_file, False)
+    chart_entries = updateindex.prepare_chart_entries(entries, False)
+
+    content = yaml.dump(index, Dumper=updateindex.Dumper)
+    monkeypatch.setattr(
+        updateindex.index_cache,
+        "get_index_content",
+        lambda url: content.encode("utf-8"),
+    )
+    index_file = str(tmp_path / "index.yaml")
+    # The JSON twin of the previous index, updated in place when it is in sync
+    previous = copy.deepcopy(index)
+    if not in_sync:
+        previous["generated"] = "2023-01-01T00:00:00+00:00"
+    updateindex.index_lookup.write_sidecars(index_file, previous)
+
+    updateindex.patch_index_entries(
+        index_file, "o/r", "gh-pages", entries, chart_entries
+    )
+
+    with open(index_file) as f:
+        expected = json.loads(json.dumps(yaml.safe_load(f), default=str))
+    expected["generated"] = datetime.fromisoformat(
+        expected["generated"].replace(" ", "T")
+    ).isoformat()
+    twin, lookup = read_json_twin(index_file)
+    assert twin == expected
+    assert lookup == updateindex.index_lookup.build_lookup(expected)
+
+    latest_path, _ = updateindex.index_variants.get_variant_paths(index_file)
+    with open(latest_path) as f:
+        latest = json.load(f)
+    assert latest["entries"]["acme-awesome"][0]["version"] == "1.2.0"
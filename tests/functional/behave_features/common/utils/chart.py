@@ -6,9 +6,13 @@ import tarfile
 import yaml
 import shutil
 import json
+import sys
 from enum import Enum
 from dataclasses import dataclass
 
+sys.path.append("../../../../../scripts/src")
+from tools import chart_archive
+
 
 class Chart_Type(Enum):
     SRC = 1
@@ -82,19 +86,11 @@ def get_name_and_version_from_chart_tar(path):
     str: chart name
     str: chart version
     """
-    tar = tarfile.open(path)
-    for member in tar.getmembers():
-        if member.name.split("/")[-1] == "Chart.yaml":
-            chart = tar.extractfile(member)
-            if chart is not None:
-                content = chart.read()
-                try:
-                    chart_yaml = yaml.safe_load(content)
-                    return chart_yaml["name"], chart_yaml["version"]
-                except yaml.YAMLError as err:
-                    raise AssertionError(f"error parsing '{path}': {err}")
-    else:
-        raise AssertionError(f"Chart.yaml not in {path}")
+    try:
+        metadata = chart_archive.read_chart_archive(path).get_chart_metadata()
+    except (chart_archive.ChartArchiveError, tarfile.TarError) as err:
+        raise AssertionError(f"error parsing '{path}': {err}")
+    return metadata["name"], metadata["version"]
 
 
 def get_name_and_version_from_chart_src(path):
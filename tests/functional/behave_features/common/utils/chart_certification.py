@@ -410,27 +410,26 @@ vendor:
 
         Releases might be left behind if check_index_yam() ran before check_release_result() and fails the test.
         """
+        self.cleanup_releases([expected_tag])
+
+    def cleanup_releases(self, expected_tags):
+        """Cleanup the releases and release tags, deleted concurrently."""
         r = github_api(
             "get", f"repos/{self.secrets.test_repo}/releases", self.secrets.bot_token
         )
         releases = json.loads(r.text)
         logging.debug(f"List of releases: {releases}")
+        endpoints = []
         for release in releases:
-            if release["tag_name"] == expected_tag:
-                release_id = release["id"]
-                logging.info(f"Delete release '{expected_tag}'")
-                github_api(
-                    "delete",
-                    f"repos/{self.secrets.test_repo}/releases/{release_id}",
-                    self.secrets.bot_token,
+            if release["tag_name"] in expected_tags:
+                logging.info(f"Delete release and release tag '{release['tag_name']}'")
+                endpoints.append(
+                    f"repos/{self.secrets.test_repo}/releases/{release['id']}"
                 )
-
-                logging.info(f"Delete release tag '{expected_tag}'")
-                github_api(
-                    "delete",
-                    f"repos/{self.secrets.test_repo}/git/refs/tags/{expected_tag}",
-                    self.secrets.bot_token,
+                endpoints.append(
+                    f"repos/{self.secrets.test_repo}/git/refs/tags/{release['tag_name']}"
                 )
+        github_api_all("delete", endpoints, self.secrets.bot_token)
 
     def check_pull_request_labels(self, pr_number):
         r = github_api(
@@ -536,33 +535,19 @@ class ChartCertificationE2ETestSingle(ChartCertificationE2ETest):
         self.repo.git.worktree("prune")
 
         current_branch = f"{self.head_sha}-{self.uuid}"
-        logging.info(f"Delete remote '{current_branch}' branch")
-        github_api(
-            "delete",
-            f"repos/{self.secrets.test_repo}/git/refs/heads/{current_branch}",
-            self.secrets.bot_token,
-        )
-
-        logging.info(f"Delete '{self.secrets.test_repo}:{self.secrets.base_branch}'")
-        github_api(
-            "delete",
-            f"repos/{self.secrets.test_repo}/git/refs/heads/{self.secrets.base_branch}",
-            self.secrets.bot_token,
-        )
-
-        logging.info(
-            f"Delete '{self.secrets.test_repo}:{self.secrets.base_branch}-gh-pages'"
-        )
-        github_api(
-            "delete",
-            f"repos/{self.secrets.test_repo}/git/refs/heads/{self.secrets.base_branch}-gh-pages",
-            self.secrets.bot_token,
-        )
-
-        logging.info(f"Delete '{self.secrets.test_repo}:{self.secrets.pr_branch}'")
-        github_api(
+        branches = [
+            current_branch,
+            self.secrets.base_branch,
+            f"{self.secrets.base_branch}-gh-pages",
+            self.secrets.pr_branch,
+        ]
+        logging.info(f"Delete remote branches {branches} of {self.secrets.test_repo}")
+        github_api_all(
             "delete",
-            f"repos/{self.secrets.test_repo}/git/refs/heads/{self.secrets.pr_branch}",
+            [
+                f"repos/{self.secrets.test_repo}/git/refs/heads/{branch}"
+                for branch in branches
+            ],
             self.secrets.bot_token,
         )
 
@@ -741,7 +726,9 @@ class ChartCertificationE2ETestSingle(ChartCertificationE2ETest):
                         with open(path, "w") as fd:
                             fd.write(yaml.dump(chart))
                     except Exception as e:
-                        raise AssertionError(f"Failed to update version in yaml file: {e}")
+                        raise AssertionError(
+                            f"Failed to update version in yaml file: {e}"
+                        )
 
     def remove_readme_file(self):
         with SetDirectory(Path(self.temp_dir.name)):
@@ -955,8 +942,9 @@ class ChartCertificationE2ETestSingle(ChartCertificationE2ETest):
             )
 
     def cleanup_release(self):
-        for chart in self.test_charts:
-            expected_tag = (
+        super().cleanup_releases(
+            [
                 f"{self.secrets.vendor}-{chart.chart_name}-{chart.chart_version}"
-            )
-            super().cleanup_release(expected_tag)
\ No newline at end of file
+                for chart in self.test_charts
+            ]
+        )
@@ -2,13 +2,16 @@
 """Utility class for setting up and manipulating GitHub operations."""
 
 import json
-import requests
 import logging
+import sys
 from retrying import retry
 from urllib import parse
 
 from common.utils.setttings import *
 
+sys.path.append("../../../../../scripts/src")
+from tools import github_async, github_client
+
 
 @retry(stop_max_delay=30_000, wait_fixed=1000)
 def get_run_id(secrets, workflow_name: str, pr_number: str = None):
@@ -71,13 +74,18 @@ def check_release_assets(secrets, release_id, required_assets):
 @retry(stop_max_delay=15_000, wait_fixed=1000)
 def get_release_by_tag(secrets, release_tag):
     url_encoded_release_tag = parse.quote(release_tag)
-    r = github_api("get", f"repos/{secrets.test_repo}/releases/tags/{url_encoded_release_tag}", secrets.bot_token)
+    r = github_api(
+        "get",
+        f"repos/{secrets.test_repo}/releases/tags/{url_encoded_release_tag}",
+        secrets.bot_token,
+    )
     release = json.loads(r.text)
     # soft-check that we got an expected key in the response release.
     if release.get("id"):
         return release
     raise Exception("Release not published")
 
+
 def get_pr(secrets, pr_number=None):
     pr_number = secrets.pr_number if pr_number is None else pr_number
     r = github_api(
@@ -93,7 +101,9 @@ def github_api_get(endpoint, bot_token, headers={}):
             "Accept": "application/vnd.github.v3+json",
             "Authorization": f"Bearer {bot_token}",
         }
-    r = requests.get(f"{GITHUB_BASE_URL}/{endpoint}", headers=headers)
+    r = github_client.get_client(bot_token).get(
+        f"{GITHUB_BASE_URL}/{endpoint}", headers=headers
+    )
 
     return r
 
@@ -104,7 +114,9 @@ def github_api_delete(endpoint, bot_token, headers={}):
             "Accept": "application/vnd.github.v3+json",
             "Authorization": f"Bearer {bot_token}",
         }
-    r = requests.delete(f"{GITHUB_BASE_URL}/{endpoint}", headers=headers)
+    r = github_client.get_client(bot_token).delete(
+        f"{GITHUB_BASE_URL}/{endpoint}", headers=headers
+    )
 
     return r
 
@@ -115,11 +127,33 @@ def github_api_post(endpoint, bot_token, headers={}, json={}):
             "Accept": "application/vnd.github.v3+json",
             "Authorization": f"Bearer {bot_token}",
         }
-    r = requests.post(f"{GITHUB_BASE_URL}/{endpoint}", headers=headers, json=json)
+    r = github_client.get_client(bot_token).post(
+        f"{GITHUB_BASE_URL}/{endpoint}", headers=headers, json=json
+    )
 
     return r
 
 
+def github_api_all(method, endpoints, bot_token):
+    """Send the same request to several endpoints concurrently.
+
+    Args:
+        method: HTTP method, e.g. "delete".
+        endpoints: The endpoints, relative to the GitHub API URL.
+        bot_token: Token used to authenticate the requests.
+
+    Returns:
+        The JSON bodies of the responses, or the errors
+        (github_async.GitHubAPIError), in the order of the endpoints.
+    """
+    return github_async.request_all(
+        method,
+        [f"{GITHUB_BASE_URL}/{endpoint}" for endpoint in endpoints],
+        token=bot_token,
+        return_exceptions=True,
+    )
+
+
 def github_api(method, endpoint, bot_token, headers={}, json={}):
     if method == "get":
         return github_api_get(endpoint, bot_token, headers=headers)
@@ -128,4 +162,6 @@ def github_api(method, endpoint, bot_token, headers={}, json={}):
     elif method == "delete":
         return github_api_delete(endpoint, bot_token, headers=headers)
     else:
-        raise ValueError(f"Github API method '{method}' not implemented in helper function")
+        raise ValueError(
+            f"Github API method '{method}' not implemented in helper function"
+        )
@@ -7,8 +7,17 @@ from chartrepomanager import indexannotations
 from indexfile import index
 
 
+def _is_supported(compatibility, chart, ocp_version):
+    """Check the precomputed compatibility of the chart, if the table covers ocp_version."""
+    minor = f"{ocp_version.major}.{ocp_version.minor}"
+    if chart["ocpVersions"] is not None and minor in compatibility["ocpVersions"]:
+        return minor in chart["ocpVersions"]
+    return ocp_version in semantic_version.NpmSpec(chart["supportedOCP"])
+
+
 def check_index_entries(ocpVersion):
-    all_chart_list = index.get_latest_charts()
+    compatibility = index.get_ocp_compatibility()
+    all_chart_list = list(compatibility["charts"].values())
     failed_chart_list = []
 
     OCP_VERSION = semantic_version.Version.coerce(ocpVersion)
@@ -17,9 +26,9 @@ def check_index_entries(ocpVersion):
         if (
             "supportedOCP" in chart
             and chart["supportedOCP"] != "N/A"
-            and chart["supportedOCP"] != ""
+            and chart["supportedOCP"]
         ):
-            if OCP_VERSION in semantic_version.NpmSpec(chart["supportedOCP"]):
+            if _is_supported(compatibility, chart, OCP_VERSION):
                 logging.info(
                     f'PASS: Chart {chart["name"]} {chart["version"]} supported OCP version {chart["supportedOCP"]} includes: {OCP_VERSION}'
                 )
@@ -5,10 +5,11 @@ import json
 import os
 import sys
 
-import requests
-
 from common.utils.setttings import *
 
+sys.path.append("../../../../../scripts/src")
+from tools import github_client
+
 endpoint_data = {}
 
 CHECKS_FAILED = "checks failed"
@@ -41,15 +42,8 @@ def _make_gihub_request(method, uri, body=None, params={}, headers={}, verbose=F
     url = f'{GITHUB_BASE_URL}/repos/{endpoint_data["organization"]}/{endpoint_data["repo"]}/{uri}'
 
     print(f"API url: {url}")
-    method_map = {
-        "get": requests.get,
-        "post": requests.post,
-        "put": requests.put,
-        "delete": requests.delete,
-        "patch": requests.patch,
-    }
-    request_method = method_map[method]
-    response = request_method(url, params=params, headers=headers, json=body)
+    client = github_client.get_client(endpoint_data["access_token"])
+    response = client.request(method, url, params=params, headers=headers, json=body)
     if verbose:
         print(json.dumps(headers, indent=4, sort_keys=True))
         print(json.dumps(body, indent=4, sort_keys=True))